@@ -1,21 +1,36 @@
 from flask import Flask
 from .config import config
-from .extensions import db, migrate, jwt, bcrypt, cors, ma
+from .extensions import db, migrate, jwt, bcrypt, cors, ma, cache, user_cache, count_cache, password_hasher
+from .utils.json_provider import JSONProvider
 
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     app.config['JSON_AS_ASCII'] = False
+    app.json = JSONProvider(app)
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     bcrypt.init_app(app)
+    password_hasher.init_app(app)
     cors.init_app(app)
     ma.init_app(app)
+    cache.init_app(app)
+    user_cache.configure(maxsize=app.config['USER_CACHE_MAXSIZE'], ttl=app.config['USER_CACHE_TTL'])
+    count_cache.configure(maxsize=app.config['PAGINATION_COUNT_CACHE_MAXSIZE'])
+    
+    from app.utils import search, etag, response_cache, agenda
+    search.init_app(app)
+    etag.init_app(app)
+    response_cache.init_app(app)
+    agenda.init_app(app)
     
     with app.app_context():
         from app import models
+    
+    from app import cli
+    cli.init_app(app)
 
     # JWT callbacks
     @jwt.expired_token_loader
@@ -54,4 +69,8 @@ def create_app(config_name='default'):
     from app.api.billing import bp as billing_bp
     app.register_blueprint(billing_bp, url_prefix='/api/billing')
     
+    # Búsqueda global
+    from app.api.search import bp as search_bp
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+    
     return app
\ No newline at end of file
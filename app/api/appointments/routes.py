@@ -1,21 +1,94 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required
 from app.api.appointments import bp
 from app.models.appointment import Cita
 from app.models.client import Cliente
 from app.models.pet import Mascota
-from app.models.medical import Veterinario
-from app.schemas.appointment_schemas import CitaSchema, CitaUpdateSchema
+from app.models.medical import Veterinario, HistoriaClinica, TipoServicio
+from app.schemas.appointment_schemas import CitaSchema, CitaUpdateSchema, CitaSerieSchema
 from app.extensions import db
 from app.utils.pagination import paginate_query
+from app.utils.fields import requested_fields
 from app.utils.responses import success_response, error_response
+from app.utils.etag import conditional
+from app.utils.response_cache import cached_response
+from app.utils import availability, agenda
+from app.utils.availability import Grilla
+from app.utils.exceptions import PaginationError
 from app.auth.decorators import role_required, get_current_user
 from marshmallow import ValidationError
-from datetime import datetime, timedelta
+from sqlalchemy import func
+from dateutil.relativedelta import relativedelta
+from datetime import date, datetime, timedelta
+
+# Tablas que leen las respuestas de citas (cliente, mascota y veterinario anidados)
+TABLAS_CITAS = (Cita, Cliente, Mascota, Veterinario, HistoriaClinica)
+
+VISTAS_CALENDARIO = ('semana', 'mes')
+# Citas compactas (calendario, series): solo columnas de la cita, sin relaciones
+CAMPOS_COMPACTOS = frozenset((
+    'cita_id', 'fecha_cita', 'hora_cita', 'duracion', 'estado',
+    'veterinario_id', 'cliente_id', 'mascota_id', 'motivo'
+))
 
 cita_schema = CitaSchema()
 citas_schema = CitaSchema(many=True)
 cita_update_schema = CitaUpdateSchema()
+cita_serie_schema = CitaSerieSchema()
+
+# Unidades de repetición de una serie de citas
+UNIDADES_SERIE = {'dias': 'days', 'semanas': 'weeks', 'meses': 'months'}
+
+def _duracion_servicio(servicio_id):
+    """Duración estimada del servicio o ``CITA_DURACION_DEFAULT``; ``None`` si el servicio no existe"""
+    default = current_app.config.get('CITA_DURACION_DEFAULT', 30)
+    if not servicio_id:
+        return default
+    servicio = db.session.get(TipoServicio, servicio_id)
+    if not servicio or not servicio.activo:
+        return None
+    return min(servicio.duracion_estimada or default, Cita.DURACION_MAXIMA)
+
+def _verificar_cita(validated_data):
+    """Cliente, mascota, duración y veterinario de una cita nueva; respuesta de error o ``None``
+    
+    Completa ``duracion`` si no se indicó.
+    """
+    # Verificar que el cliente existe
+    cliente = Cliente.query.get(validated_data['cliente_id'])
+    if not cliente:
+        return error_response('Cliente no encontrado', None, 404)
+    
+    # Verificar que la mascota existe y pertenece al cliente
+    mascota = Mascota.query.get(validated_data['mascota_id'])
+    if not mascota:
+        return error_response('Mascota no encontrada', None, 404)
+    if mascota.cliente_id != validated_data['cliente_id']:
+        return error_response('La mascota no pertenece a este cliente', None, 400)
+    
+    # Duración: la indicada, la estimada del servicio o la por defecto
+    if 'duracion' not in validated_data:
+        validated_data['duracion'] = _duracion_servicio(validated_data.get('servicio_id'))
+    if validated_data['duracion'] is None:
+        return error_response('Servicio no encontrado', None, 404)
+    
+    # Verificar disponibilidad del veterinario si se especifica
+    if validated_data.get('veterinario_id'):
+        veterinario = Veterinario.query.get(validated_data['veterinario_id'])
+        if not veterinario or not veterinario.activo:
+            return error_response('Veterinario no disponible', None, 400)
+    
+    return None
+
+def _describir_conflictos(conflictos):
+    return [
+        {
+            'cita_id': c.cita_id,
+            'hora_cita': c.hora_cita.strftime('%H:%M'),
+            'duracion': c.duracion
+        }
+        for c in conflictos
+    ]
 
 @bp.route('', methods=['POST'])
 @jwt_required()
@@ -25,41 +98,29 @@ def create_cita():
         data = request.get_json()
         validated_data = cita_schema.load(data)
         
-        # Verificar que el cliente existe
-        cliente = Cliente.query.get(validated_data['cliente_id'])
-        if not cliente:
-            return error_response('Cliente no encontrado', None, 404)
-        
-        # Verificar que la mascota existe y pertenece al cliente
-        mascota = Mascota.query.get(validated_data['mascota_id'])
-        if not mascota:
-            return error_response('Mascota no encontrada', None, 404)
-        if mascota.cliente_id != validated_data['cliente_id']:
-            return error_response('La mascota no pertenece a este cliente', None, 400)
+        error = _verificar_cita(validated_data)
+        if error:
+            return error
         
-        # Verificar disponibilidad del veterinario si se especifica
         if validated_data.get('veterinario_id'):
-            veterinario = Veterinario.query.get(validated_data['veterinario_id'])
-            if not veterinario or not veterinario.activo:
-                return error_response('Veterinario no disponible', None, 400)
+            # Verificar solapamiento de horarios (con la agenda del día bloqueada)
+            Cita.bloquear_agenda(validated_data['veterinario_id'], validated_data['fecha_cita'])
+            conflictos = Cita.conflictos(
+                validated_data['veterinario_id'],
+                validated_data['fecha_cita'],
+                validated_data['hora_cita'],
+                validated_data['duracion']
+            )
             
-            # Verificar conflicto de horarios
-            conflicto = Cita.query.filter(
-                Cita.veterinario_id == validated_data['veterinario_id'],
-                Cita.fecha_cita == validated_data['fecha_cita'],
-                Cita.hora_cita == validated_data['hora_cita'],
-                Cita.estado.in_(['Programada', 'Confirmada']),
-                Cita.activa == True
-            ).first()
-            
-            if conflicto:
+            if conflictos:
                 return error_response(
                     'Ya existe una cita programada para este veterinario en ese horario',
-                    None, 400
+                    _describir_conflictos(conflictos), 400
                 )
         
         cita = Cita(**validated_data)
         cita.save()
+        agenda.refrescar([cita.cita_id])
         
         return success_response(
             'Cita creada exitosamente',
@@ -73,8 +134,90 @@ def create_cita():
         db.session.rollback()
         return error_response('Error al crear cita', str(e), 500)
 
+def _fechas_serie(validated_data):
+    """Fechas de una serie (quita de ``validated_data`` los campos de la serie)"""
+    fecha_inicio = validated_data.pop('fecha_cita', None)
+    repeticiones = validated_data.pop('repeticiones', None)
+    intervalo = validated_data.pop('intervalo')
+    unidad = UNIDADES_SERIE[validated_data.pop('unidad')]
+    fechas = validated_data.pop('fechas', None)
+    
+    if fechas:
+        return sorted(set(fechas))
+    # Cada fecha se calcula desde el inicio: 31/01 + 1 mes = 28/02, + 2 meses = 31/03
+    return [fecha_inicio + relativedelta(**{unidad: intervalo * i}) for i in range(repeticiones)]
+
+@bp.route('/serie', methods=['POST'])
+@jwt_required()
+def create_serie_citas():
+    """Crear una serie de citas (recurrente o en fechas dadas) en una sola transacción
+    
+    Todas las fechas se verifican contra la agenda del veterinario con una
+    consulta. Si alguna se solapa se informan todos los conflictos y no se
+    crea ninguna; con ``parcial`` se crean las que no chocan.
+    """
+    try:
+        validated_data = cita_serie_schema.load(request.get_json())
+        parcial = validated_data.pop('parcial')
+        fechas = _fechas_serie(validated_data)
+        
+        error = _verificar_cita(validated_data)
+        if error:
+            return error
+        
+        veterinario_id = validated_data.get('veterinario_id')
+        existentes = {}
+        if veterinario_id:
+            for fecha in fechas:
+                Cita.bloquear_agenda(veterinario_id, fecha)
+            existentes = Cita.agenda(veterinario_id, fechas)
+        
+        citas = []
+        conflictos = []
+        for fecha in fechas:
+            choques = [
+                c for c in existentes.get(fecha, [])
+                if c.solapa(validated_data['hora_cita'], validated_data['duracion'])
+            ]
+            if choques:
+                conflictos.append({
+                    'fecha_cita': fecha.isoformat(),
+                    'conflictos': _describir_conflictos(choques)
+                })
+            else:
+                citas.append(Cita(fecha_cita=fecha, **validated_data))
+        
+        if conflictos and (not parcial or not citas):
+            db.session.rollback()
+            return error_response(
+                'Las citas de la serie se solapan con otras del veterinario',
+                {'conflictos': conflictos}, 400
+            )
+        
+        db.session.add_all(citas)
+        db.session.flush()
+        creadas = [cita.serialize_fields(CAMPOS_COMPACTOS) for cita in citas]
+        db.session.commit()
+        agenda.refrescar([cita['cita_id'] for cita in creadas])
+        
+        return success_response(
+            f'{len(creadas)} citas creadas exitosamente',
+            {
+                'creadas': creadas,
+                'conflictos': conflictos
+            },
+            201
+        )
+        
+    except ValidationError as e:
+        return error_response('Errores de validación', e.messages, 400)
+    except Exception as e:
+        db.session.rollback()
+        return error_response('Error al crear la serie de citas', str(e), 500)
+
 @bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_CITAS)
 def list_citas():
     """Listar citas con filtros"""
     try:
@@ -86,6 +229,7 @@ def list_citas():
         mascota_id = request.args.get('mascota_id', type=int)
         veterinario_id = request.args.get('veterinario_id', type=int)
         estado = request.args.get('estado')
+        fields = requested_fields()
         
         query = Cita.query.filter_by(activa=True)
         
@@ -112,65 +256,171 @@ def list_citas():
             query = query.filter_by(estado=estado)
         
         # Ordenar por fecha y hora
-        query = query.order_by(Cita.fecha_cita.desc(), Cita.hora_cita.desc())
+        orden = (Cita.fecha_cita.desc(), Cita.hora_cita.desc(), Cita.cita_id.desc())
+        serializer = Cita.row_serializer(fields)
+        query = serializer.select(query, Cita.fecha_cita, Cita.hora_cita).order_by(*orden)
         
-        pagination = paginate_query(query)
+        pagination = paginate_query(query, cursor_keys=orden)
         
         return success_response(
             'Citas obtenidas exitosamente',
             {
-                'citas': [c.to_dict() for c in pagination.items],
+                'citas': serializer.serialize_many(pagination.items),
                 'pagination': pagination.to_dict()
             }
         )
         
+    except PaginationError as e:
+        return error_response(e.message, None, 400)
     except Exception as e:
         return error_response('Error al obtener citas', str(e), 500)
 
 @bp.route('/hoy', methods=['GET'])
 @jwt_required()
 def get_citas_hoy():
-    """Obtener citas del día"""
+    """Obtener citas del día (opcionalmente de un veterinario), desde la agenda en caché"""
     try:
         hoy = datetime.now().date()
+        dias = agenda.dias(hoy, hoy)
         
-        citas = Cita.query.filter(
-            Cita.fecha_cita == hoy,
-            Cita.activa == True
-        ).order_by(Cita.hora_cita).all()
+        no_modificada = agenda.no_modificada(dias)
+        if no_modificada:
+            return no_modificada
         
-        return success_response(
-            'Citas de hoy obtenidas exitosamente',
-            [c.to_dict() for c in citas]
+        citas = agenda.citas(
+            dias,
+            veterinario_id=request.args.get('veterinario_id', type=int),
+            fields=requested_fields()
         )
         
+        return success_response('Citas de hoy obtenidas exitosamente', citas)
+        
     except Exception as e:
         return error_response('Error al obtener citas', str(e), 500)
 
 @bp.route('/proximas', methods=['GET'])
 @jwt_required()
 def get_citas_proximas():
-    """Obtener próximas citas (próximos 7 días)"""
+    """Obtener próximas citas (próximos 7 días), desde la agenda en caché"""
     try:
         hoy = datetime.now().date()
         fecha_limite = hoy + timedelta(days=7)
+        dias = agenda.dias(hoy, fecha_limite)
         
-        citas = Cita.query.filter(
-            Cita.fecha_cita.between(hoy, fecha_limite),
-            Cita.estado.in_(['Programada', 'Confirmada']),
-            Cita.activa == True
-        ).order_by(Cita.fecha_cita, Cita.hora_cita).all()
+        no_modificada = agenda.no_modificada(dias)
+        if no_modificada:
+            return no_modificada
         
-        return success_response(
-            'Próximas citas obtenidas exitosamente',
-            [c.to_dict() for c in citas]
+        citas = agenda.citas(
+            dias,
+            veterinario_id=request.args.get('veterinario_id', type=int),
+            estados=('Programada', 'Confirmada'),
+            fields=requested_fields()
         )
         
+        return success_response('Próximas citas obtenidas exitosamente', citas)
+        
     except Exception as e:
         return error_response('Error al obtener citas', str(e), 500)
 
+@bp.route('/calendario', methods=['GET'])
+@jwt_required()
+@conditional(Cita)
+@cached_response(Cita, ttl=300)
+def get_calendario():
+    """Conteos de citas por día, veterinario y estado para la vista semanal o mensual
+    
+    ``?fecha=`` elige la semana (lunes a domingo) o el mes; con ``?citas=1``
+    se agregan las citas del periodo sin relaciones anidadas.
+    """
+    try:
+        vista = request.args.get('vista', 'mes')
+        if vista not in VISTAS_CALENDARIO:
+            return error_response(f"Vista inválida: use {' o '.join(VISTAS_CALENDARIO)}", None, 400)
+        
+        try:
+            fecha = date.fromisoformat(request.args['fecha']) if 'fecha' in request.args else date.today()
+        except ValueError:
+            return error_response('Fecha inválida', None, 400)
+        
+        if vista == 'semana':
+            fecha_desde = fecha - timedelta(days=fecha.weekday())
+            fecha_hasta = fecha_desde + timedelta(days=6)
+        else:
+            fecha_desde = fecha.replace(day=1)
+            fecha_hasta = (fecha_desde + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        
+        filtros = [Cita.fecha_cita.between(fecha_desde, fecha_hasta), Cita.activa == True]
+        veterinario_ids = request.args.getlist('veterinario_id', type=int)
+        if veterinario_ids:
+            filtros.append(Cita.veterinario_id.in_(veterinario_ids))
+        
+        # Una fila por (día, veterinario, estado)
+        conteos = db.session.query(
+            Cita.fecha_cita,
+            Cita.veterinario_id,
+            Cita.estado,
+            func.count(Cita.cita_id).label('cantidad')
+        ).filter(*filtros).group_by(
+            Cita.fecha_cita,
+            Cita.veterinario_id,
+            Cita.estado
+        ).all()
+        
+        dias = {}
+        totales = {}
+        for fila in conteos:
+            dia = dias.setdefault(fila.fecha_cita, {})
+            veterinario = dia.setdefault(fila.veterinario_id, {})
+            veterinario[fila.estado] = fila.cantidad
+            totales[fila.estado] = totales.get(fila.estado, 0) + fila.cantidad
+        
+        calendario = []
+        dia = fecha_desde
+        while dia <= fecha_hasta:
+            veterinarios = dias.get(dia, {})
+            calendario.append({
+                'fecha': dia.isoformat(),
+                'total': sum(sum(estados.values()) for estados in veterinarios.values()),
+                'veterinarios': [
+                    {
+                        'veterinario_id': veterinario_id,
+                        'total': sum(estados.values()),
+                        'estados': estados
+                    }
+                    for veterinario_id, estados in sorted(
+                        veterinarios.items(), key=lambda item: (item[0] is None, item[0] or 0)
+                    )
+                ]
+            })
+            dia += timedelta(days=1)
+        
+        data = {
+            'vista': vista,
+            'fecha_desde': fecha_desde.isoformat(),
+            'fecha_hasta': fecha_hasta.isoformat(),
+            'total': sum(totales.values()),
+            'estados': totales,
+            'dias': calendario
+        }
+        
+        if request.args.get('citas', type=int):
+            # Solo campos compactos: la respuesta se cachea etiquetada únicamente con Cita
+            fields = requested_fields()
+            serializer = Cita.row_serializer(CAMPOS_COMPACTOS & fields if fields else CAMPOS_COMPACTOS)
+            citas = serializer.select(Cita.query).filter(*filtros).order_by(
+                Cita.fecha_cita, Cita.hora_cita, Cita.cita_id
+            ).all()
+            data['citas'] = serializer.serialize_many(citas)
+        
+        return success_response('Calendario obtenido exitosamente', data)
+        
+    except Exception as e:
+        return error_response('Error al obtener calendario', str(e), 500)
+
 @bp.route('/<int:cita_id>', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_CITAS)
 def get_cita(cita_id):
     """Obtener cita por ID"""
     try:
@@ -178,7 +428,7 @@ def get_cita(cita_id):
         
         return success_response(
             'Cita obtenida exitosamente',
-            cita.to_dict()
+            cita.to_dict(fields=requested_fields())
         )
         
     except Exception as e:
@@ -194,29 +444,38 @@ def update_cita(cita_id):
         
         validated_data = cita_update_schema.load(data)
         
-        # Verificar conflicto de horarios si se cambia veterinario, fecha u hora
-        if any(k in validated_data for k in ['veterinario_id', 'fecha_cita', 'hora_cita']):
+        # Un servicio nuevo sin duración explícita trae su duración estimada
+        if validated_data.get('servicio_id') and 'duracion' not in validated_data:
+            validated_data['duracion'] = _duracion_servicio(validated_data['servicio_id'])
+            if validated_data['duracion'] is None:
+                return error_response('Servicio no encontrado', None, 404)
+        
+        # Verificar solapamiento si cambia el horario o la cita vuelve a ocupar la agenda
+        if any(k in validated_data for k in ['veterinario_id', 'fecha_cita', 'hora_cita', 'duracion', 'estado', 'activa']):
             veterinario_id = validated_data.get('veterinario_id', cita.veterinario_id)
             fecha_cita = validated_data.get('fecha_cita', cita.fecha_cita)
             hora_cita = validated_data.get('hora_cita', cita.hora_cita)
+            duracion = validated_data.get('duracion', cita.duracion)
+            ocupa = (
+                validated_data.get('estado', cita.estado) in Cita.ESTADOS_OCUPAN
+                and validated_data.get('activa', cita.activa)
+            )
             
-            if veterinario_id:
-                conflicto = Cita.query.filter(
-                    Cita.cita_id != cita_id,
-                    Cita.veterinario_id == veterinario_id,
-                    Cita.fecha_cita == fecha_cita,
-                    Cita.hora_cita == hora_cita,
-                    Cita.estado.in_(['Programada', 'Confirmada']),
-                    Cita.activa == True
-                ).first()
+            if veterinario_id and ocupa:
+                Cita.bloquear_agenda(veterinario_id, fecha_cita)
+                conflictos = Cita.conflictos(
+                    veterinario_id, fecha_cita, hora_cita, duracion, excluir_id=cita_id
+                )
                 
-                if conflicto:
+                if conflictos:
                     return error_response(
                         'Ya existe una cita en ese horario para este veterinario',
-                        None, 400
+                        _describir_conflictos(conflictos), 400
                     )
         
+        fecha_anterior = cita.fecha_cita
         cita.update(**validated_data)
+        agenda.refrescar([cita_id], [fecha_anterior])
         
         return success_response(
             'Cita actualizada exitosamente',
@@ -240,6 +499,7 @@ def cancel_cita(cita_id):
             return error_response('No se puede cancelar esta cita', None, 400)
         
         cita.update(estado='Cancelada')
+        agenda.refrescar([cita_id])
         
         return success_response('Cita cancelada exitosamente', cita.to_dict())
         
@@ -258,6 +518,7 @@ def confirm_cita(cita_id):
             return error_response('Solo se pueden confirmar citas programadas', None, 400)
         
         cita.update(estado='Confirmada')
+        agenda.refrescar([cita_id])
         
         return success_response('Cita confirmada exitosamente', cita.to_dict())
         
@@ -276,6 +537,7 @@ def complete_cita(cita_id, current_user):
             return error_response('No se puede completar esta cita', None, 400)
         
         cita.update(estado='Completada')
+        agenda.refrescar([cita_id])
         
         return success_response('Cita completada exitosamente', cita.to_dict())
         
@@ -285,6 +547,7 @@ def complete_cita(cita_id, current_user):
 
 @bp.route('/disponibilidad', methods=['GET'])
 @jwt_required()
+@conditional(Cita)
 def check_disponibilidad():
     """Verificar disponibilidad de horarios"""
     try:
@@ -294,37 +557,122 @@ def check_disponibilidad():
         if not fecha:
             return error_response('Fecha es requerida', None, 400)
         
-        # Obtener citas ocupadas
-        query = Cita.query.filter(
-            Cita.fecha_cita == fecha,
-            Cita.estado.in_(['Programada', 'Confirmada', 'En curso']),
-            Cita.activa == True
+        try:
+            dia = date.fromisoformat(fecha)
+        except ValueError:
+            return error_response('Fecha inválida', None, 400)
+        
+        # Sin veterinario, un horario está ocupado si lo está para cualquiera;
+        # una cita ocupa todos los horarios que se solapan con su duración
+        grilla = Grilla.desde_config()
+        citas_ocupadas = availability.citas_ocupadas(
+            dia, dia, [veterinario_id] if veterinario_id else None
+        ).all()
+        ocupado = 0
+        for _, _, hora, duracion in citas_ocupadas:
+            ocupado |= grilla.bits(hora, duracion)
+        
+        return success_response(
+            'Disponibilidad obtenida exitosamente',
+            {
+                'fecha': fecha,
+                'veterinario_id': veterinario_id,
+                'horarios_disponibles': grilla.texto(grilla.libres(ocupado)),
+                'horarios_ocupados': [hora.strftime('%H:%M') for _, _, hora, _ in citas_ocupadas]
+            }
         )
         
-        if veterinario_id:
-            query = query.filter_by(veterinario_id=veterinario_id)
+    except Exception as e:
+        return error_response('Error al verificar disponibilidad', str(e), 500)
+
+def _veterinarios_consultados():
+    """``?veterinario_id=`` (repetible) o todos los veterinarios activos"""
+    return request.args.getlist('veterinario_id', type=int) or availability.veterinarios_activos()
+
+@bp.route('/disponibilidad/rango', methods=['GET'])
+@jwt_required()
+@conditional(Cita, Veterinario)
+def disponibilidad_rango():
+    """Horarios disponibles por veterinario y día en un rango de fechas"""
+    try:
+        try:
+            fecha_desde = date.fromisoformat(request.args.get('fecha_desde', ''))
+            fecha_hasta = date.fromisoformat(request.args.get('fecha_hasta', request.args.get('fecha_desde', '')))
+        except ValueError:
+            return error_response('fecha_desde y fecha_hasta (YYYY-MM-DD) son requeridas', None, 400)
         
-        citas_ocupadas = query.all()
-        horarios_ocupados = [c.hora_cita.strftime('%H:%M') for c in citas_ocupadas]
+        max_dias = current_app.config.get('AGENDA_MAX_DIAS', 31)
+        if fecha_hasta < fecha_desde or (fecha_hasta - fecha_desde).days >= max_dias:
+            return error_response(f'El rango debe tener entre 1 y {max_dias} días', None, 400)
         
-        # Generar horarios disponibles (8:00 AM - 6:00 PM, cada 30 min)
-        from datetime import time
-        horarios_disponibles = []
-        for hora in range(8, 18):
-            for minuto in [0, 30]:
-                horario = time(hora, minuto).strftime('%H:%M')
-                if horario not in horarios_ocupados:
-                    horarios_disponibles.append(horario)
+        grilla = Grilla.desde_config()
+        libres = availability.disponibilidad(grilla, fecha_desde, fecha_hasta, _veterinarios_consultados())
         
         return success_response(
             'Disponibilidad obtenida exitosamente',
             {
-                'fecha': fecha,
-                'veterinario_id': veterinario_id,
-                'horarios_disponibles': horarios_disponibles,
-                'horarios_ocupados': horarios_ocupados
+                'fecha_desde': fecha_desde.isoformat(),
+                'fecha_hasta': fecha_hasta.isoformat(),
+                'intervalo': grilla.intervalo,
+                'veterinarios': [
+                    {
+                        'veterinario_id': veterinario_id,
+                        'dias': [
+                            {
+                                'fecha': fecha.isoformat(),
+                                'horarios_disponibles': grilla.texto(indices),
+                                'total_disponibles': len(indices)
+                            }
+                            for fecha, indices in dias.items()
+                        ]
+                    }
+                    for veterinario_id, dias in libres.items()
+                ]
             }
         )
         
     except Exception as e:
         return error_response('Error al verificar disponibilidad', str(e), 500)
+
+def _horario_actual():
+    """Sin ``?desde=`` la respuesta cambia con la hora: el ETag incluye el primer horario aún no iniciado"""
+    if 'desde' in request.args:
+        return None
+    return Grilla.desde_config().primer_horario(datetime.now().time())
+
+@bp.route('/disponibilidad/proximos', methods=['GET'])
+@jwt_required()
+@conditional(Cita, Veterinario, vigencia=_horario_actual)
+def proximos_horarios_libres():
+    """Primeros horarios libres desde ``?desde=`` (por defecto ahora), de cualquier veterinario"""
+    try:
+        try:
+            desde = datetime.fromisoformat(request.args['desde']) if 'desde' in request.args else datetime.now()
+        except ValueError:
+            return error_response('desde inválido (YYYY-MM-DD o YYYY-MM-DDTHH:MM)', None, 400)
+        
+        n = min(max(request.args.get('n', 5, type=int), 1), 100)
+        dias = min(max(request.args.get('dias', 7, type=int), 1), current_app.config.get('AGENDA_MAX_DIAS', 31))
+        hasta = desde.date() + timedelta(days=dias - 1)
+        
+        grilla = Grilla.desde_config()
+        horarios = availability.proximos_libres(grilla, desde, hasta, _veterinarios_consultados(), n)
+        
+        return success_response(
+            'Horarios disponibles obtenidos exitosamente',
+            {
+                'desde': desde.isoformat(timespec='minutes'),
+                'hasta': hasta.isoformat(),
+                'horarios': [
+                    {
+                        'fecha': fecha.isoformat(),
+                        'hora': hora.strftime('%H:%M'),
+                        'veterinario_id': veterinario_id
+                    }
+                    for fecha, hora, veterinario_id in horarios
+                ]
+            }
+        )
+        
+    except Exception as e:
+        return error_response('Error al buscar horarios disponibles', str(e), 500)
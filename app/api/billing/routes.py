@@ -1,37 +1,35 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required
 from app.api.billing import bp
-from app.models.billing import Factura, DetalleFactura
+from app.models.billing import Factura, DetalleFactura, SerieFactura, VentaDiaria, ProductoVendidoDiario
 from app.models.client import Cliente
+from app.models.pet import Mascota
 from app.models.inventory import Producto, MovimientoInventario
 from app.schemas.billing_schemas import FacturaSchema, FacturaUpdateSchema
 from app.extensions import db
 from app.utils.pagination import paginate_query
+from app.utils.export import stream_export, EXPORT_FORMATS
+from app.utils.fields import requested_fields, apply_fields
 from app.utils.responses import success_response, error_response
+from app.utils.etag import conditional
+from app.utils.response_cache import cached_response
+from app.utils.exceptions import PaginationError
 from app.auth.decorators import role_required, get_current_user
 from marshmallow import ValidationError
-from datetime import datetime
-from decimal import Decimal
+from sqlalchemy import insert, func
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+# Tablas que leen las respuestas de facturas (detalles y cliente anidados)
+TABLAS_FACTURAS = (Factura, DetalleFactura, Cliente, Mascota)
 
 factura_schema = FacturaSchema()
 facturas_schema = FacturaSchema(many=True)
 factura_update_schema = FacturaUpdateSchema()
 
-def generar_numero_factura():
-    """Generar número de factura consecutivo"""
-    ultima_factura = Factura.query.order_by(Factura.factura_id.desc()).first()
-    
-    if ultima_factura:
-        # Extraer número de la última factura
-        try:
-            ultimo_numero = int(ultima_factura.numero_factura.split('-')[1])
-            nuevo_numero = ultimo_numero + 1
-        except:
-            nuevo_numero = 1
-    else:
-        nuevo_numero = 1
-    
-    return f"FAC-{nuevo_numero:06d}"
+def generar_numero_factura(serie='FAC'):
+    """Generar número de factura consecutivo (dentro de la transacción actual)"""
+    return SerieFactura.allocate(serie)
 
 @bp.route('', methods=['POST'])
 @role_required('Administrador', 'Recepcionista')
@@ -49,6 +47,43 @@ def create_factura(current_user):
         if not data.get('detalles') or len(data['detalles']) == 0:
             return error_response('La factura debe tener al menos un detalle', None, 400)
         
+        try:
+            fecha_factura = date.fromisoformat(data['fecha_factura'])
+        except (KeyError, TypeError, ValueError):
+            return error_response('Fecha de factura inválida', None, 400)
+        
+        # Cargar en una sola consulta (y bloquear hasta el commit) los productos facturados
+        cantidades_por_producto = {}
+        for detalle in data['detalles']:
+            if detalle.get('tipo_item') == 'Producto' and detalle.get('producto_id'):
+                producto_id = detalle['producto_id']
+                cantidades_por_producto[producto_id] = (
+                    cantidades_por_producto.get(producto_id, 0) + detalle['cantidad']
+                )
+        
+        productos = {}
+        if cantidades_por_producto:
+            productos = {
+                p.producto_id: p
+                for p in Producto.query.filter(
+                    Producto.producto_id.in_(cantidades_por_producto.keys())
+                ).with_for_update().all()
+            }
+        
+        # Validar stock por producto (sumando todas sus líneas)
+        for producto_id, cantidad in cantidades_por_producto.items():
+            producto = productos.get(producto_id)
+            if not producto:
+                db.session.rollback()
+                return error_response(f"Producto ID {producto_id} no encontrado", None, 404)
+            
+            if producto.stock_actual < cantidad:
+                db.session.rollback()
+                return error_response(
+                    f"Stock insuficiente para {producto.nombre}. Stock actual: {producto.stock_actual}",
+                    None, 400
+                )
+        
         # Calcular totales
         subtotal = Decimal('0.00')
         detalles_validados = []
@@ -60,30 +95,22 @@ def create_factura(current_user):
             
             detalle['subtotal'] = subtotal_item
             subtotal += subtotal_item
-            
-            # Validar stock si es producto
-            if detalle.get('tipo_item') == 'Producto' and detalle.get('producto_id'):
-                producto = Producto.query.get(detalle['producto_id'])
-                if not producto:
-                    return error_response(f"Producto ID {detalle['producto_id']} no encontrado", None, 404)
-                
-                if producto.stock_actual < cantidad:
-                    return error_response(
-                        f"Stock insuficiente para {producto.nombre}. Stock actual: {producto.stock_actual}",
-                        None, 400
-                    )
-            
             detalles_validados.append(detalle)
         
+        serie = data.get('serie', 'FAC')
+        if serie not in current_app.config['SERIES_FACTURA']:
+            db.session.rollback()
+            return error_response(f'Serie de factura inválida: {serie}', None, 400)
+        
         # Calcular impuestos (19% IVA)
-        impuestos = subtotal * Decimal('0.19')
+        impuestos = (subtotal * Decimal('0.19')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
         total = subtotal + impuestos
         
         # Crear factura
         factura = Factura(
             cliente_id=data['cliente_id'],
-            numero_factura=generar_numero_factura(),
-            fecha_factura=data['fecha_factura'],
+            numero_factura=generar_numero_factura(serie),
+            fecha_factura=fecha_factura,
             subtotal=subtotal,
             impuestos=impuestos,
             total=total,
@@ -91,35 +118,47 @@ def create_factura(current_user):
             estado=data.get('estado', 'Pendiente'),
             observaciones=data.get('observaciones')
         )
-        factura.save()
+        db.session.add(factura)
+        db.session.flush()
         
-        # Crear detalles
+        # Crear detalles y movimientos de inventario con inserciones masivas
+        detalles_rows = []
+        movimientos_rows = []
         for detalle_data in detalles_validados:
-            detalle = DetalleFactura(
-                factura_id=factura.factura_id,
-                producto_id=detalle_data.get('producto_id'),
-                consulta_id=detalle_data.get('consulta_id'),
-                vacunacion_id=detalle_data.get('vacunacion_id'),
-                tipo_item=detalle_data['tipo_item'],
-                descripcion=detalle_data['descripcion'],
-                cantidad=detalle_data['cantidad'],
-                precio_unitario=detalle_data['precio_unitario'],
-                subtotal=detalle_data['subtotal']
-            )
-            detalle.save()
+            detalles_rows.append({
+                'factura_id': factura.factura_id,
+                'producto_id': detalle_data.get('producto_id'),
+                'consulta_id': detalle_data.get('consulta_id'),
+                'vacunacion_id': detalle_data.get('vacunacion_id'),
+                'tipo_item': detalle_data['tipo_item'],
+                'descripcion': detalle_data['descripcion'],
+                'cantidad': detalle_data['cantidad'],
+                'precio_unitario': detalle_data['precio_unitario'],
+                'subtotal': detalle_data['subtotal']
+            })
             
             # Registrar movimiento de inventario si es producto
             if detalle_data['tipo_item'] == 'Producto' and detalle_data.get('producto_id'):
-                movimiento = MovimientoInventario(
-                    producto_id=detalle_data['producto_id'],
-                    tipo_movimiento='Salida',
-                    cantidad=detalle_data['cantidad'],
-                    precio_unitario=detalle_data['precio_unitario'],
-                    motivo='Venta',
-                    documento_referencia=factura.numero_factura,
-                    usuario_id=current_user.usuario_id
-                )
-                movimiento.save()
+                movimientos_rows.append({
+                    'producto_id': detalle_data['producto_id'],
+                    'tipo_movimiento': 'Salida',
+                    'cantidad': detalle_data['cantidad'],
+                    'precio_unitario': detalle_data['precio_unitario'],
+                    'motivo': 'Venta',
+                    'documento_referencia': factura.numero_factura,
+                    'usuario_id': current_user.usuario_id
+                })
+        
+        db.session.execute(insert(DetalleFactura), detalles_rows)
+        if movimientos_rows:
+            db.session.execute(insert(MovimientoInventario), movimientos_rows)
+        
+        VentaDiaria.registrar(factura)
+        if factura.estado != 'Anulada':
+            ProductoVendidoDiario.registrar(factura)
+        
+        # Único commit: la factura se guarda completa o no se guarda
+        db.session.commit()
         
         return success_response(
             'Factura creada exitosamente',
@@ -134,52 +173,85 @@ def create_factura(current_user):
         db.session.rollback()
         return error_response('Error al crear factura', str(e), 500)
 
+ORDEN_FACTURAS = (Factura.fecha_factura.desc(), Factura.factura_id.desc())
+
+def filtrar_facturas(query):
+    """Aplicar los filtros de la petición (listado y exportación de facturas)"""
+    cliente_id = request.args.get('cliente_id', type=int)
+    estado = request.args.get('estado')
+    fecha_desde = request.args.get('fecha_desde')
+    fecha_hasta = request.args.get('fecha_hasta')
+    numero_factura = request.args.get('numero_factura')
+    
+    if cliente_id:
+        query = query.filter_by(cliente_id=cliente_id)
+    
+    if estado:
+        query = query.filter_by(estado=estado)
+    
+    if fecha_desde:
+        query = query.filter(Factura.fecha_factura >= fecha_desde)
+    
+    if fecha_hasta:
+        query = query.filter(Factura.fecha_factura <= fecha_hasta)
+    
+    if numero_factura:
+        query = query.filter(Factura.numero_factura.ilike(f"%{numero_factura}%"))
+    
+    return query
+
 @bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_FACTURAS)
 def list_facturas():
     """Listar facturas con filtros"""
     try:
-        # Filtros
-        cliente_id = request.args.get('cliente_id', type=int)
-        estado = request.args.get('estado')
-        fecha_desde = request.args.get('fecha_desde')
-        fecha_hasta = request.args.get('fecha_hasta')
-        numero_factura = request.args.get('numero_factura')
-        
-        query = Factura.query
-        
-        if cliente_id:
-            query = query.filter_by(cliente_id=cliente_id)
-        
-        if estado:
-            query = query.filter_by(estado=estado)
-        
-        if fecha_desde:
-            query = query.filter(Factura.fecha_factura >= fecha_desde)
-        
-        if fecha_hasta:
-            query = query.filter(Factura.fecha_factura <= fecha_hasta)
+        orden = ORDEN_FACTURAS
+        fields = requested_fields()
+        query = apply_fields(filtrar_facturas(Factura.query), Factura, fields, Factura.fecha_factura)
+        query = query.order_by(*orden)
         
-        if numero_factura:
-            query = query.filter(Factura.numero_factura.ilike(f"%{numero_factura}%"))
-        
-        query = query.order_by(Factura.fecha_factura.desc())
-        
-        pagination = paginate_query(query)
+        pagination = paginate_query(query, cursor_keys=orden)
         
         return success_response(
             'Facturas obtenidas exitosamente',
             {
-                'facturas': [f.to_dict(include_detalles=False) for f in pagination.items],
+                'facturas': [f.to_dict(include_detalles=False, fields=fields) for f in pagination.items],
                 'pagination': pagination.to_dict()
             }
         )
         
+    except PaginationError as e:
+        return error_response(e.message, None, 400)
     except Exception as e:
         return error_response('Error al obtener facturas', str(e), 500)
 
+@bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_facturas():
+    """Exportar facturas (CSV o NDJSON) con los mismos filtros del listado"""
+    try:
+        formato = request.args.get('format', 'csv')
+        if formato not in EXPORT_FORMATS:
+            return error_response(f'Formato de exportación inválido: {formato}', None, 400)
+        
+        fields = requested_fields()
+        query = apply_fields(filtrar_facturas(Factura.query), Factura, fields).order_by(*ORDEN_FACTURAS)
+        
+        return stream_export(
+            query,
+            lambda f: f.to_dict(include_detalles=False, fields=fields),
+            formato,
+            'facturas',
+            Factura.field_keys(fields)
+        )
+        
+    except Exception as e:
+        return error_response('Error al exportar facturas', str(e), 500)
+
 @bp.route('/<int:factura_id>', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_FACTURAS)
 def get_factura(factura_id):
     """Obtener factura por ID"""
     try:
@@ -187,7 +259,7 @@ def get_factura(factura_id):
         
         return success_response(
             'Factura obtenida exitosamente',
-            factura.to_dict(include_detalles=True)
+            factura.to_dict(include_detalles=True, fields=requested_fields())
         )
         
     except Exception as e:
@@ -195,6 +267,7 @@ def get_factura(factura_id):
 
 @bp.route('/numero/<numero_factura>', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_FACTURAS)
 def get_factura_by_numero(numero_factura):
     """Obtener factura por número"""
     try:
@@ -202,7 +275,7 @@ def get_factura_by_numero(numero_factura):
         
         return success_response(
             'Factura obtenida exitosamente',
-            factura.to_dict(include_detalles=True)
+            factura.to_dict(include_detalles=True, fields=requested_fields())
         )
         
     except Exception as e:
@@ -213,7 +286,7 @@ def get_factura_by_numero(numero_factura):
 def update_factura(factura_id, current_user):
     """Actualizar factura"""
     try:
-        factura = Factura.query.get_or_404(factura_id)
+        factura = Factura.query.with_for_update().get_or_404(factura_id)
         data = request.get_json()
         
         # No permitir cambios si está anulada
@@ -221,7 +294,15 @@ def update_factura(factura_id, current_user):
             return error_response('No se puede modificar una factura anulada', None, 400)
         
         validated_data = factura_update_schema.load(data)
-        factura.update(**validated_data)
+        
+        # Mover la factura en los resúmenes diarios dentro de la misma transacción
+        VentaDiaria.retirar(factura)
+        if validated_data.get('estado') == 'Anulada':
+            ProductoVendidoDiario.retirar(factura)
+        for key, value in validated_data.items():
+            setattr(factura, key, value)
+        VentaDiaria.registrar(factura)
+        db.session.commit()
         
         return success_response(
             'Factura actualizada exitosamente',
@@ -239,7 +320,7 @@ def update_factura(factura_id, current_user):
 def anular_factura(factura_id, current_user):
     """Anular factura"""
     try:
-        factura = Factura.query.get_or_404(factura_id)
+        factura = Factura.query.with_for_update().get_or_404(factura_id)
         
         if factura.estado == 'Anulada':
             return error_response('La factura ya está anulada', None, 400)
@@ -257,9 +338,13 @@ def anular_factura(factura_id, current_user):
                     documento_referencia=factura.numero_factura,
                     usuario_id=current_user.usuario_id
                 )
-                movimiento.save()
+                db.session.add(movimiento)
         
-        factura.update(estado='Anulada')
+        VentaDiaria.retirar(factura)
+        ProductoVendidoDiario.retirar(factura)
+        factura.estado = 'Anulada'
+        VentaDiaria.registrar(factura)
+        db.session.commit()
         
         return success_response(
             'Factura anulada exitosamente',
@@ -275,7 +360,7 @@ def anular_factura(factura_id, current_user):
 def pagar_factura(factura_id, current_user):
     """Marcar factura como pagada"""
     try:
-        factura = Factura.query.get_or_404(factura_id)
+        factura = Factura.query.with_for_update().get_or_404(factura_id)
         
         if factura.estado == 'Anulada':
             return error_response('No se puede pagar una factura anulada', None, 400)
@@ -283,7 +368,10 @@ def pagar_factura(factura_id, current_user):
         if factura.estado == 'Pagada':
             return error_response('La factura ya está pagada', None, 400)
         
-        factura.update(estado='Pagada')
+        VentaDiaria.retirar(factura)
+        factura.estado = 'Pagada'
+        VentaDiaria.registrar(factura)
+        db.session.commit()
         
         return success_response(
             'Factura marcada como pagada',
@@ -296,6 +384,8 @@ def pagar_factura(factura_id, current_user):
 
 @bp.route('/reportes/ventas', methods=['GET'])
 @role_required('Administrador')
+@conditional(VentaDiaria)
+@cached_response(VentaDiaria, ttl=300)
 def reporte_ventas(current_user):
     """Reporte de ventas"""
     try:
@@ -305,26 +395,44 @@ def reporte_ventas(current_user):
         if not fecha_desde or not fecha_hasta:
             return error_response('Fechas son requeridas', None, 400)
         
-        # Obtener facturas del período
-        facturas = Factura.query.filter(
-            Factura.fecha_factura.between(fecha_desde, fecha_hasta),
-            Factura.estado != 'Anulada'
+        # Sumar el resumen diario: una fila por (método de pago, estado)
+        resumen = db.session.query(
+            VentaDiaria.metodo_pago,
+            VentaDiaria.estado,
+            func.sum(VentaDiaria.cantidad).label('cantidad'),
+            func.sum(VentaDiaria.total).label('total')
+        ).filter(
+            VentaDiaria.fecha.between(fecha_desde, fecha_hasta),
+            VentaDiaria.estado != 'Anulada',
+            VentaDiaria.cantidad > 0
+        ).group_by(
+            VentaDiaria.metodo_pago,
+            VentaDiaria.estado
+        ).order_by(
+            VentaDiaria.metodo_pago
         ).all()
         
         # Calcular totales
-        total_ventas = sum(f.total for f in facturas)
-        total_facturas = len(facturas)
-        facturas_pagadas = sum(1 for f in facturas if f.estado == 'Pagada')
-        facturas_pendientes = sum(1 for f in facturas if f.estado == 'Pendiente')
+        total_ventas = Decimal('0.00')
+        total_facturas = 0
+        facturas_pagadas = 0
+        facturas_pendientes = 0
         
         # Ventas por método de pago
         ventas_por_metodo = {}
-        for factura in facturas:
-            metodo = factura.metodo_pago
+        for fila in resumen:
+            total_ventas += fila.total
+            total_facturas += fila.cantidad
+            if fila.estado == 'Pagada':
+                facturas_pagadas += fila.cantidad
+            elif fila.estado == 'Pendiente':
+                facturas_pendientes += fila.cantidad
+            
+            metodo = fila.metodo_pago
             if metodo not in ventas_por_metodo:
                 ventas_por_metodo[metodo] = {'cantidad': 0, 'total': Decimal('0.00')}
-            ventas_por_metodo[metodo]['cantidad'] += 1
-            ventas_por_metodo[metodo]['total'] += factura.total
+            ventas_por_metodo[metodo]['cantidad'] += fila.cantidad
+            ventas_por_metodo[metodo]['total'] += fila.total
         
         # Convertir Decimal a float para JSON
         for metodo in ventas_por_metodo:
@@ -353,6 +461,8 @@ def reporte_ventas(current_user):
 
 @bp.route('/reportes/productos-vendidos', methods=['GET'])
 @role_required('Administrador')
+@conditional(ProductoVendidoDiario, Producto)
+@cached_response(ProductoVendidoDiario, Producto, ttl=300)
 def reporte_productos_vendidos(current_user):
     """Reporte de productos más vendidos"""
     try:
@@ -363,37 +473,23 @@ def reporte_productos_vendidos(current_user):
         if not fecha_desde or not fecha_hasta:
             return error_response('Fechas son requeridas', None, 400)
         
-        # Consulta de productos vendidos
-        from sqlalchemy import func
-        
-        productos_vendidos = db.session.query(
-            DetalleFactura.producto_id,
-            Producto.nombre,
-            func.sum(DetalleFactura.cantidad).label('cantidad_total'),
-            func.sum(DetalleFactura.subtotal).label('monto_total')
-        ).join(
-            Factura, DetalleFactura.factura_id == Factura.factura_id
-        ).join(
-            Producto, DetalleFactura.producto_id == Producto.producto_id
-        ).filter(
-            DetalleFactura.tipo_item == 'Producto',
-            Factura.fecha_factura.between(fecha_desde, fecha_hasta),
-            Factura.estado != 'Anulada'
-        ).group_by(
-            DetalleFactura.producto_id,
-            Producto.nombre
-        ).order_by(
-            func.sum(DetalleFactura.cantidad).desc()
-        ).limit(limite).all()
+        # Top-N desde el resumen diario por producto
+        productos_vendidos = ProductoVendidoDiario.top(fecha_desde, fecha_hasta, limite)
+        
+        nombres = dict(
+            db.session.query(Producto.producto_id, Producto.nombre).filter(
+                Producto.producto_id.in_([p[0] for p in productos_vendidos])
+            ).all()
+        ) if productos_vendidos else {}
         
         productos_data = [
             {
-                'producto_id': p.producto_id,
-                'nombre': p.nombre,
-                'cantidad_vendida': int(p.cantidad_total),
-                'monto_total': float(p.monto_total)
+                'producto_id': producto_id,
+                'nombre': nombres.get(producto_id),
+                'cantidad_vendida': int(cantidad_total),
+                'monto_total': float(monto_total)
             }
-            for p in productos_vendidos
+            for producto_id, cantidad_total, monto_total in productos_vendidos
         ]
         
         return success_response(
@@ -4,13 +4,21 @@ import traceback
 
 from app.api.clients import bp
 from app.models.client import Cliente
+from app.models.pet import Mascota
+from app.models.medical import HistoriaClinica
 from app.schemas.client_schemas import ClienteSchema, ClienteUpdateSchema
 from app.extensions import db
 from app.utils.pagination import paginate_query
 from app.utils.responses import success_response, error_response
+from app.utils.etag import conditional
+from app.utils.fields import requested_fields, apply_fields
+from app.utils.exceptions import PaginationError
 from app.auth.decorators import role_required
 from marshmallow import ValidationError
 
+# Tablas que leen las respuestas de clientes (mascotas anidadas)
+TABLAS_CLIENTES = (Cliente, Mascota, HistoriaClinica)
+
 cliente_schema = ClienteSchema()
 clientes_schema = ClienteSchema(many=True)
 cliente_update_schema = ClienteUpdateSchema()
@@ -40,38 +48,46 @@ def create_cliente():
 
 @bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_CLIENTES)
 def list_clientes():
     """Listar clientes con paginación y búsqueda"""
     try:
         search = request.args.get('search', '')
+        search_mode = request.args.get('search_mode', 'ranked')
         activo = request.args.get('activo', type=lambda x: x.lower() == 'true')
+        include_mascotas = request.args.get('include_mascotas', 'false').lower() == 'true'
+        fields = requested_fields()
         
         query = Cliente.query
         
         if search:
-            query = Cliente.search(search)
+            query = Cliente.search(search, ranked=search_mode != 'contains')
         
         if activo is not None:
             query = query.filter_by(activo=activo)
         
-        query = query.order_by(Cliente.fecha_registro.desc())
+        query = apply_fields(query, Cliente, fields, Cliente.fecha_registro)
+        query = query.order_by(Cliente.fecha_registro.desc(), Cliente.cliente_id.desc())
         
         pagination = paginate_query(query)
         
         return success_response(
             'Clientes obtenidos exitosamente',
             {
-                'clientes': [c.to_dict() for c in pagination.items],
+                'clientes': Cliente.serialize_many(pagination.items, include_mascotas, fields),
                 'pagination': pagination.to_dict()
             }
         )
         
+    except PaginationError as e:
+        return error_response(e.message, None, 400)
     except Exception as e:
         print(traceback.format_exc())
         return error_response('Error al obtener clientes', str(e), 500)
 
 @bp.route('/<int:cliente_id>', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_CLIENTES)
 def get_cliente(cliente_id):
     """Obtener cliente por ID"""
     try:
@@ -80,7 +96,7 @@ def get_cliente(cliente_id):
         
         return success_response(
             'Cliente obtenido exitosamente',
-            cliente.to_dict(include_mascotas=include_mascotas)
+            cliente.to_dict(include_mascotas=include_mascotas, fields=requested_fields())
         )
         
     except Exception as e:
@@ -134,15 +150,17 @@ def delete_cliente(cliente_id, current_user):
 
 @bp.route('/<int:cliente_id>/mascotas', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_CLIENTES)
 def get_cliente_mascotas(cliente_id):
     """Obtener mascotas de un cliente"""
     try:
         cliente = Cliente.query.get_or_404(cliente_id)
-        mascotas = cliente.mascotas.filter_by(activo=True).all()
+        fields = requested_fields()
+        mascotas = apply_fields(cliente.mascotas, Mascota, fields).filter_by(activo=True).all()
         
         return success_response(
             'Mascotas obtenidas exitosamente',
-            [m.to_dict() for m in mascotas]
+            [m.to_dict(fields=fields) for m in mascotas]
         )
         
     except Exception as e:
@@ -150,6 +168,7 @@ def get_cliente_mascotas(cliente_id):
 
 @bp.route('/documento/<documento>', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_CLIENTES)
 def get_cliente_by_documento(documento):
     """Buscar cliente por documento"""
     try:
@@ -160,7 +179,7 @@ def get_cliente_by_documento(documento):
         
         return success_response(
             'Cliente encontrado',
-            cliente.to_dict(include_mascotas=True)
+            Cliente.serialize_many([cliente], include_mascotas=True, fields=requested_fields())[0]
         )
         
     except Exception as e:
@@ -2,15 +2,23 @@ from flask import request, jsonify
 from flask_jwt_extended import jwt_required
 from app.api.inventory import bp
 from app.models.inventory import Producto, CategoriaProducto, MovimientoInventario
+from app.models.user import User
 from app.schemas.inventory_schemas import (
     ProductoSchema, ProductoUpdateSchema, 
     CategoriaProductoSchema, MovimientoInventarioSchema
 )
 from app.extensions import db
 from app.utils.pagination import paginate_query
+from app.utils.export import stream_export, EXPORT_FORMATS
+from app.utils.fields import requested_fields, apply_fields
 from app.utils.responses import success_response, error_response
+from app.utils.etag import conditional
+from app.utils.response_cache import cached_response
+from app.utils.exceptions import PaginationError
 from app.auth.decorators import role_required, get_current_user
 from marshmallow import ValidationError
+from sqlalchemy.orm import joinedload
+from app.models.base import wants_field
 from datetime import datetime, timedelta
 
 producto_schema = ProductoSchema()
@@ -23,14 +31,17 @@ movimiento_schema = MovimientoInventarioSchema()
 
 @bp.route('/categorias', methods=['GET'])
 @jwt_required()
+@conditional(CategoriaProducto)
+@cached_response(CategoriaProducto, ttl=300)
 def list_categorias():
     """Listar categorías de productos"""
     try:
-        categorias = CategoriaProducto.query.filter_by(activa=True).all()
+        fields = requested_fields()
+        categorias = apply_fields(CategoriaProducto.query, CategoriaProducto, fields).filter_by(activa=True).all()
         
         return success_response(
             'Categorías obtenidas exitosamente',
-            [c.to_dict() for c in categorias]
+            [c.to_dict(fields=fields) for c in categorias]
         )
         
     except Exception as e:
@@ -94,6 +105,7 @@ def create_producto(current_user):
 
 @bp.route('/productos', methods=['GET'])
 @jwt_required()
+@conditional(Producto, CategoriaProducto)
 def list_productos():
     """Listar productos con filtros"""
     try:
@@ -103,8 +115,9 @@ def list_productos():
         stock_bajo = request.args.get('stock_bajo', type=lambda x: x.lower() == 'true')
         por_vencer = request.args.get('por_vencer', type=lambda x: x.lower() == 'true')
         activo = request.args.get('activo', type=lambda x: x.lower() == 'true')
+        serializer = Producto.row_serializer(requested_fields())
         
-        query = Producto.query
+        query = serializer.select(Producto.query)
         
         # Búsqueda
         if search:
@@ -142,16 +155,19 @@ def list_productos():
         return success_response(
             'Productos obtenidos exitosamente',
             {
-                'productos': [p.to_dict() for p in pagination.items],
+                'productos': serializer.serialize_many(pagination.items),
                 'pagination': pagination.to_dict()
             }
         )
         
+    except PaginationError as e:
+        return error_response(e.message, None, 400)
     except Exception as e:
         return error_response('Error al obtener productos', str(e), 500)
 
 @bp.route('/productos/<int:producto_id>', methods=['GET'])
 @jwt_required()
+@conditional(Producto, CategoriaProducto)
 def get_producto(producto_id):
     """Obtener producto por ID"""
     try:
@@ -159,7 +175,7 @@ def get_producto(producto_id):
         
         return success_response(
             'Producto obtenido exitosamente',
-            producto.to_dict()
+            producto.to_dict(fields=requested_fields())
         )
         
     except Exception as e:
@@ -247,59 +263,106 @@ def create_movimiento():
         db.session.rollback()
         return error_response('Error al registrar movimiento', str(e), 500)
 
+ORDEN_MOVIMIENTOS = (
+    MovimientoInventario.fecha_movimiento.desc(),
+    MovimientoInventario.movimiento_id.desc()
+)
+
+def filtrar_movimientos(query):
+    """Aplicar los filtros de la petición (listado y exportación de movimientos)"""
+    producto_id = request.args.get('producto_id', type=int)
+    tipo_movimiento = request.args.get('tipo_movimiento')
+    fecha_desde = request.args.get('fecha_desde')
+    fecha_hasta = request.args.get('fecha_hasta')
+    
+    if producto_id:
+        query = query.filter_by(producto_id=producto_id)
+    
+    if tipo_movimiento:
+        query = query.filter_by(tipo_movimiento=tipo_movimiento)
+    
+    if fecha_desde:
+        query = query.filter(MovimientoInventario.fecha_movimiento >= fecha_desde)
+    
+    if fecha_hasta:
+        query = query.filter(MovimientoInventario.fecha_movimiento <= fecha_hasta)
+    
+    return query
+
 @bp.route('/movimientos', methods=['GET'])
 @jwt_required()
+@conditional(MovimientoInventario, Producto, User)
 def list_movimientos():
     """Listar movimientos de inventario"""
     try:
-        producto_id = request.args.get('producto_id', type=int)
-        tipo_movimiento = request.args.get('tipo_movimiento')
-        fecha_desde = request.args.get('fecha_desde')
-        fecha_hasta = request.args.get('fecha_hasta')
-        
-        query = MovimientoInventario.query
-        
-        if producto_id:
-            query = query.filter_by(producto_id=producto_id)
-        
-        if tipo_movimiento:
-            query = query.filter_by(tipo_movimiento=tipo_movimiento)
-        
-        if fecha_desde:
-            query = query.filter(MovimientoInventario.fecha_movimiento >= fecha_desde)
-        
-        if fecha_hasta:
-            query = query.filter(MovimientoInventario.fecha_movimiento <= fecha_hasta)
+        orden = ORDEN_MOVIMIENTOS
+        fields = requested_fields()
+        query = apply_fields(
+            filtrar_movimientos(MovimientoInventario.query), MovimientoInventario, fields,
+            MovimientoInventario.fecha_movimiento
+        ).order_by(*orden)
         
-        query = query.order_by(MovimientoInventario.fecha_movimiento.desc())
-        
-        pagination = paginate_query(query)
+        pagination = paginate_query(query, cursor_keys=orden)
         
         return success_response(
             'Movimientos obtenidos exitosamente',
             {
-                'movimientos': [m.to_dict() for m in pagination.items],
+                'movimientos': [m.to_dict(fields=fields) for m in pagination.items],
                 'pagination': pagination.to_dict()
             }
         )
         
+    except PaginationError as e:
+        return error_response(e.message, None, 400)
     except Exception as e:
         return error_response('Error al obtener movimientos', str(e), 500)
 
+@bp.route('/movimientos/export', methods=['GET'])
+@jwt_required()
+def export_movimientos():
+    """Exportar movimientos (CSV o NDJSON) con los mismos filtros del listado"""
+    try:
+        formato = request.args.get('format', 'csv')
+        if formato not in EXPORT_FORMATS:
+            return error_response(f'Formato de exportación inválido: {formato}', None, 400)
+        
+        fields = requested_fields()
+        query = apply_fields(filtrar_movimientos(MovimientoInventario.query), MovimientoInventario, fields)
+        
+        # Producto y usuario en la misma consulta: to_dict incluye sus nombres
+        if wants_field(fields, 'producto'):
+            query = query.options(joinedload(MovimientoInventario.producto))
+        if wants_field(fields, 'usuario'):
+            query = query.options(joinedload(MovimientoInventario.usuario))
+        query = query.order_by(*ORDEN_MOVIMIENTOS)
+        
+        return stream_export(
+            query, lambda m: m.to_dict(fields=fields), formato, 'movimientos',
+            MovimientoInventario.field_keys(fields)
+        )
+        
+    except Exception as e:
+        return error_response('Error al exportar movimientos', str(e), 500)
+
 @bp.route('/alertas', methods=['GET'])
 @jwt_required()
+@conditional(Producto, CategoriaProducto)
+@cached_response(Producto, CategoriaProducto, ttl=60)
 def get_alertas_inventario():
     """Obtener alertas de inventario (stock bajo y vencimientos)"""
     try:
+        fields = requested_fields()
+        productos = apply_fields(Producto.query, Producto, fields)
+        
         # Stock bajo
-        productos_stock_bajo = Producto.query.filter(
+        productos_stock_bajo = productos.filter(
             Producto.stock_actual <= Producto.stock_minimo,
             Producto.activo == True
         ).all()
         
         # Por vencer (próximos 30 días)
         fecha_limite = datetime.now().date() + timedelta(days=30)
-        productos_por_vencer = Producto.query.filter(
+        productos_por_vencer = productos.filter(
             Producto.fecha_vencimiento.isnot(None),
             Producto.fecha_vencimiento <= fecha_limite,
             Producto.fecha_vencimiento >= datetime.now().date(),
@@ -307,7 +370,7 @@ def get_alertas_inventario():
         ).all()
         
         # Vencidos
-        productos_vencidos = Producto.query.filter(
+        productos_vencidos = productos.filter(
             Producto.fecha_vencimiento.isnot(None),
             Producto.fecha_vencimiento < datetime.now().date(),
             Producto.activo == True
@@ -318,15 +381,15 @@ def get_alertas_inventario():
             {
                 'stock_bajo': {
                     'total': len(productos_stock_bajo),
-                    'productos': [p.to_dict() for p in productos_stock_bajo]
+                    'productos': [p.to_dict(fields=fields) for p in productos_stock_bajo]
                 },
                 'por_vencer': {
                     'total': len(productos_por_vencer),
-                    'productos': [p.to_dict() for p in productos_por_vencer]
+                    'productos': [p.to_dict(fields=fields) for p in productos_por_vencer]
                 },
                 'vencidos': {
                     'total': len(productos_vencidos),
-                    'productos': [p.to_dict() for p in productos_vencidos]
+                    'productos': [p.to_dict(fields=fields) for p in productos_vencidos]
                 }
             }
         )
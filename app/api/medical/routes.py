@@ -3,27 +3,38 @@ from flask_jwt_extended import jwt_required
 from app.api.medical import bp
 from app.models.medical import HistoriaClinica, Consulta, Veterinario, SeguimientoPaciente
 from app.models.pet import Mascota
+from app.models.client import Cliente
 from app.schemas.medical_schemas import (
     HistoriaClinicaSchema, ConsultaSchema, SeguimientoSchema
 )
 from app.extensions import db
 from app.utils.pagination import paginate_query
+from app.utils.export import stream_export, EXPORT_FORMATS
+from app.utils.fields import requested_fields, apply_fields
 from app.utils.responses import success_response, error_response
+from app.utils.etag import conditional
+from app.utils.response_cache import cached_response
+from app.utils.exceptions import PaginationError
 from app.auth.decorators import role_required
 from marshmallow import ValidationError
 
+# Tablas que leen las respuestas de historias (consultas y mascota con propietario anidados)
+TABLAS_HISTORIAS = (HistoriaClinica, Consulta, Mascota, Cliente)
+
 historia_schema = HistoriaClinicaSchema()
 consulta_schema = ConsultaSchema()
 seguimiento_schema = SeguimientoSchema()
 
 @bp.route('/historias', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_HISTORIAS)
 def list_historias():
     """Listar historias clínicas"""
     try:
         mascota_id = request.args.get('mascota_id', type=int)
+        fields = requested_fields()
         
-        query = HistoriaClinica.query
+        query = apply_fields(HistoriaClinica.query, HistoriaClinica, fields)
         
         if mascota_id:
             query = query.filter_by(mascota_id=mascota_id)
@@ -33,16 +44,19 @@ def list_historias():
         return success_response(
             'Historias clínicas obtenidas exitosamente',
             {
-                'historias': [h.to_dict(include_consultas=True) for h in pagination.items],
+                'historias': [h.to_dict(include_consultas=True, fields=fields) for h in pagination.items],
                 'pagination': pagination.to_dict()
             }
         )
         
+    except PaginationError as e:
+        return error_response(e.message, None, 400)
     except Exception as e:
         return error_response('Error al obtener historias', str(e), 500)
 
 @bp.route('/historias/<int:historia_id>', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_HISTORIAS)
 def get_historia(historia_id):
     """Obtener historia clínica por ID"""
     try:
@@ -50,7 +64,7 @@ def get_historia(historia_id):
         
         return success_response(
             'Historia clínica obtenida exitosamente',
-            historia.to_dict(include_consultas=True)
+            historia.to_dict(include_consultas=True, fields=requested_fields())
         )
         
     except Exception as e:
@@ -114,51 +128,79 @@ def create_consulta(current_user):
         db.session.rollback()
         return error_response('Error al crear consulta', str(e), 500)
 
+ORDEN_CONSULTAS = (Consulta.fecha_consulta.desc(), Consulta.hora_consulta.desc())
+
+def filtrar_consultas(query):
+    """Aplicar los filtros de la petición (listado y exportación de consultas)"""
+    historia_id = request.args.get('historia_id', type=int)
+    mascota_id = request.args.get('mascota_id', type=int)
+    veterinario_id = request.args.get('veterinario_id', type=int)
+    fecha_desde = request.args.get('fecha_desde')
+    fecha_hasta = request.args.get('fecha_hasta')
+    
+    if historia_id:
+        query = query.filter_by(historia_id=historia_id)
+    
+    if mascota_id:
+        query = query.join(HistoriaClinica).filter(HistoriaClinica.mascota_id == mascota_id)
+    
+    if veterinario_id:
+        query = query.filter(Consulta.veterinario_id == veterinario_id)
+    
+    if fecha_desde:
+        query = query.filter(Consulta.fecha_consulta >= fecha_desde)
+    
+    if fecha_hasta:
+        query = query.filter(Consulta.fecha_consulta <= fecha_hasta)
+    
+    return query
+
 @bp.route('/consultas', methods=['GET'])
 @jwt_required()
+@conditional(Consulta)
 def list_consultas():
     """Listar consultas con filtros"""
     try:
-        historia_id = request.args.get('historia_id', type=int)
-        mascota_id = request.args.get('mascota_id', type=int)
-        veterinario_id = request.args.get('veterinario_id', type=int)
-        fecha_desde = request.args.get('fecha_desde')
-        fecha_hasta = request.args.get('fecha_hasta')
-        
-        query = Consulta.query
-        
-        if historia_id:
-            query = query.filter_by(historia_id=historia_id)
-        
-        if mascota_id:
-            query = query.join(HistoriaClinica).filter(HistoriaClinica.mascota_id == mascota_id)
-        
-        if veterinario_id:
-            query = query.filter_by(veterinario_id=veterinario_id)
-        
-        if fecha_desde:
-            query = query.filter(Consulta.fecha_consulta >= fecha_desde)
-        
-        if fecha_hasta:
-            query = query.filter(Consulta.fecha_consulta <= fecha_hasta)
-        
-        query = query.order_by(Consulta.fecha_consulta.desc(), Consulta.hora_consulta.desc())
+        serializer = Consulta.row_serializer(requested_fields())
+        query = serializer.select(filtrar_consultas(Consulta.query)).order_by(*ORDEN_CONSULTAS)
         
         pagination = paginate_query(query)
         
         return success_response(
             'Consultas obtenidas exitosamente',
             {
-                'consultas': [c.to_dict() for c in pagination.items],
+                'consultas': serializer.serialize_many(pagination.items),
                 'pagination': pagination.to_dict()
             }
         )
         
+    except PaginationError as e:
+        return error_response(e.message, None, 400)
     except Exception as e:
         return error_response('Error al obtener consultas', str(e), 500)
 
+@bp.route('/consultas/export', methods=['GET'])
+@jwt_required()
+def export_consultas():
+    """Exportar consultas (CSV o NDJSON) con los mismos filtros del listado"""
+    try:
+        formato = request.args.get('format', 'csv')
+        if formato not in EXPORT_FORMATS:
+            return error_response(f'Formato de exportación inválido: {formato}', None, 400)
+        
+        serializer = Consulta.row_serializer(requested_fields())
+        query = serializer.select(filtrar_consultas(Consulta.query)).order_by(
+            *ORDEN_CONSULTAS, Consulta.consulta_id.desc()
+        )
+        
+        return stream_export(query, serializer, formato, 'consultas', serializer.keys)
+        
+    except Exception as e:
+        return error_response('Error al exportar consultas', str(e), 500)
+
 @bp.route('/consultas/<int:consulta_id>', methods=['GET'])
 @jwt_required()
+@conditional(Consulta)
 def get_consulta(consulta_id):
     """Obtener consulta por ID"""
     try:
@@ -166,7 +208,7 @@ def get_consulta(consulta_id):
         
         return success_response(
             'Consulta obtenida exitosamente',
-            consulta.to_dict()
+            consulta.to_dict(fields=requested_fields())
         )
         
     except Exception as e:
@@ -231,15 +273,18 @@ def create_seguimiento(current_user):
 
 @bp.route('/seguimientos/<int:consulta_id>', methods=['GET'])
 @jwt_required()
+@conditional(SeguimientoPaciente)
 def list_seguimientos(consulta_id):
     """Listar seguimientos de una consulta"""
     try:
-        seguimientos = SeguimientoPaciente.query.filter_by(consulta_id=consulta_id)\
+        fields = requested_fields()
+        seguimientos = apply_fields(SeguimientoPaciente.query, SeguimientoPaciente, fields)\
+            .filter_by(consulta_id=consulta_id)\
             .order_by(SeguimientoPaciente.fecha_seguimiento.desc()).all()
         
         return success_response(
             'Seguimientos obtenidos exitosamente',
-            [s.to_dict() for s in seguimientos]
+            [s.to_dict(fields=fields) for s in seguimientos]
         )
         
     except Exception as e:
@@ -247,14 +292,17 @@ def list_seguimientos(consulta_id):
 
 @bp.route('/veterinarios', methods=['GET'])
 @jwt_required()
+@conditional(Veterinario)
+@cached_response(Veterinario, ttl=300)
 def list_veterinarios():
     """Listar veterinarios activos"""
     try:
-        veterinarios = Veterinario.query.filter_by(activo=True).all()
+        serializer = Veterinario.row_serializer(requested_fields())
+        veterinarios = serializer.select(Veterinario.query).filter_by(activo=True).all()
         
         return success_response(
             'Veterinarios obtenidos exitosamente',
-            [v.to_dict() for v in veterinarios]
+            serializer.serialize_many(veterinarios)
         )
         
     except Exception as e:
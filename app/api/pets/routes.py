@@ -5,12 +5,19 @@ import traceback
 from app.api.pets import bp
 from app.models.pet import Mascota
 from app.models.medical import HistoriaClinica
+from app.models.client import Cliente
 from app.schemas.pet_schemas import MascotaSchema, MascotaUpdateSchema
 from app.extensions import db
 from app.utils.pagination import paginate_query
 from app.utils.responses import success_response, error_response
+from app.utils.etag import conditional
+from app.utils.fields import requested_fields
+from app.utils.exceptions import PaginationError
 from marshmallow import ValidationError
 
+# Tablas que leen las respuestas de mascotas (propietario anidado)
+TABLAS_MASCOTAS = (Mascota, Cliente, HistoriaClinica)
+
 mascota_schema = MascotaSchema()
 mascotas_schema = MascotaSchema(many=True)
 mascota_update_schema = MascotaUpdateSchema()
@@ -47,18 +54,21 @@ def create_mascota():
 
 @bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_MASCOTAS)
 def list_mascotas():
     """Listar mascotas con paginación y filtros"""
     try:
         search = request.args.get('search', '')
+        search_mode = request.args.get('search_mode', 'ranked')
         cliente_id = request.args.get('cliente_id', type=int)
         especie = request.args.get('especie', '')
         activo = request.args.get('activo', type=lambda x: x.lower() == 'true')
+        serializer = Mascota.row_serializer(requested_fields())
         
         query = Mascota.query
         
         if search:
-            query = Mascota.search(search)
+            query = Mascota.search(search, ranked=search_mode != 'contains')
         
         if cliente_id:
             query = query.filter_by(cliente_id=cliente_id)
@@ -69,24 +79,27 @@ def list_mascotas():
         if activo is not None:
             query = query.filter_by(activo=activo)
         
-        query = query.order_by(Mascota.fecha_registro.desc())
+        query = serializer.select(query).order_by(Mascota.fecha_registro.desc(), Mascota.mascota_id.desc())
         
         pagination = paginate_query(query)
         
         return success_response(
             'Mascotas obtenidas exitosamente',
             {
-                'mascotas': [m.to_dict() for m in pagination.items],
+                'mascotas': serializer.serialize_many(pagination.items),
                 'pagination': pagination.to_dict()
             }
         )
         
+    except PaginationError as e:
+        return error_response(e.message, None, 400)
     except Exception as e:
         print(traceback.print_exc())
         return error_response('Error al obtener mascotas', str(e), 500)
 
 @bp.route('/<int:mascota_id>', methods=['GET'])
 @jwt_required()
+@conditional(*TABLAS_MASCOTAS)
 def get_mascota(mascota_id):
     """Obtener mascota por ID"""
     try:
@@ -94,7 +107,7 @@ def get_mascota(mascota_id):
         
         return success_response(
             'Mascota obtenida exitosamente',
-            mascota.to_dict()
+            mascota.to_dict(fields=requested_fields())
         )
         
     except Exception as e:
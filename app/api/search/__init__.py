@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+bp = Blueprint('search', __name__)
+
+from app.api.search import routes
\ No newline at end of file
@@ -0,0 +1,189 @@
+from flask import request, current_app
+from flask_jwt_extended import jwt_required
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import BoundedSemaphore
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+import time
+
+from app.api.search import bp
+from app.models.client import Cliente
+from app.models.pet import Mascota
+from app.models.inventory import Producto
+from app.models.billing import Factura
+from app.extensions import db
+from app.utils.responses import success_response, error_response
+from app.utils.search import ranked_search, word_similarity
+
+# Puntaje mínimo para coincidencias exactas por subcadena
+SUBSTRING_SCORE = 0.8
+
+BUSQUEDA_WORKERS = 8
+
+_executor = ThreadPoolExecutor(max_workers=BUSQUEDA_WORKERS, thread_name_prefix='global-search')
+# Un cupo por worker: sin cupo libre no se encola trabajo nuevo en el pool
+_cupos = BoundedSemaphore(BUSQUEDA_WORKERS)
+
+def _score(term, *values):
+    """Relevancia de un resultado: mejor similitud entre el término y sus campos"""
+    term_lower = term.lower()
+    score = 0.0
+    for value in values:
+        if not value:
+            continue
+        value = str(value)
+        score = max(score, word_similarity(term, value))
+        if term_lower in value.lower():
+            score = max(score, SUBSTRING_SCORE)
+    return round(score, 4)
+
+def _buscar_clientes(term, limite):
+    clientes = Cliente.search(term, ranked=True).limit(limite).all()
+    return [
+        {
+            'tipo': 'cliente',
+            'id': c.cliente_id,
+            'titulo': c.nombre_completo,
+            'subtitulo': c.documento_identidad,
+            'score': _score(term, c.nombre, c.apellidos, c.documento_identidad, c.telefono, c.email),
+            'data': data
+        }
+        for c, data in zip(clientes, Cliente.serialize_many(clientes))
+    ]
+
+def _buscar_mascotas(term, limite):
+    mascotas = Mascota.search(term, ranked=True).limit(limite).all()
+    return [
+        {
+            'tipo': 'mascota',
+            'id': m.mascota_id,
+            'titulo': m.nombre,
+            'subtitulo': m.especie,
+            'score': _score(term, m.nombre, m.microchip),
+            'data': m.to_dict(include_relations=False)
+        }
+        for m in mascotas
+    ]
+
+def _buscar_productos(term, limite):
+    columns = (Producto.nombre, Producto.codigo_producto, Producto.laboratorio)
+    query = Producto.query.options(joinedload(Producto.categoria)).filter(Producto.activo == True)
+    productos = ranked_search(query, columns, term).limit(limite).all()
+    return [
+        {
+            'tipo': 'producto',
+            'id': p.producto_id,
+            'titulo': p.nombre,
+            'subtitulo': p.codigo_producto,
+            'score': _score(term, p.nombre, p.codigo_producto, p.laboratorio),
+            'data': p.to_dict()
+        }
+        for p in productos
+    ]
+
+def _buscar_facturas(term, limite):
+    facturas = Factura.query.filter(
+        Factura.numero_factura.ilike(f'%{term}%')
+    ).order_by(Factura.fecha_factura.desc(), Factura.factura_id.desc()).limit(limite).all()
+    return [
+        {
+            'tipo': 'factura',
+            'id': f.factura_id,
+            'titulo': f.numero_factura,
+            'subtitulo': f.fecha_factura.isoformat(),
+            'score': _score(term, f.numero_factura),
+            'data': f.to_dict()
+        }
+        for f in facturas
+    ]
+
+FUENTES = {
+    'cliente': _buscar_clientes,
+    'mascota': _buscar_mascotas,
+    'producto': _buscar_productos,
+    'factura': _buscar_facturas,
+}
+
+def _ejecutar_fuente(app, fuente, term, limite, timeout_ms):
+    """Ejecutar una fuente en su propio contexto (y sesión) de aplicación"""
+    try:
+        return _consultar_fuente(app, fuente, term, limite, timeout_ms)
+    finally:
+        _cupos.release()
+
+def _consultar_fuente(app, fuente, term, limite, timeout_ms):
+    with app.app_context():
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # Cancelar en el servidor las consultas que excedan el presupuesto
+            db.session.execute(
+                text("SELECT set_config('statement_timeout', :ms, true)"),
+                {'ms': str(timeout_ms)}
+            )
+        inicio = time.perf_counter()
+        resultados = FUENTES[fuente](term, limite)
+        return resultados, (time.perf_counter() - inicio) * 1000
+
+@bp.route('', methods=['GET'])
+@jwt_required()
+def global_search():
+    """Búsqueda global en clientes, mascotas, productos y facturas"""
+    try:
+        term = request.args.get('q', '').strip()
+        if not term:
+            return error_response('El parámetro q es requerido', None, 400)
+        
+        config = current_app.config
+        limite = min(
+            request.args.get('limite', config.get('SEARCH_LIMIT_PER_TYPE', 5), type=int),
+            20
+        )
+        timeout_ms = config.get('SEARCH_TIMEOUT_MS', 500)
+        tipos = request.args.get('tipos')
+        tipos = [t for t in tipos.split(',') if t in FUENTES] if tipos else list(FUENTES)
+        
+        app = current_app._get_current_object()
+        fuentes = {}
+        futures = {}
+        for tipo in tipos:
+            # Con el pool saturado la fuente se omite en vez de esperar turno
+            if not _cupos.acquire(blocking=False):
+                fuentes[tipo] = {'estado': 'ocupado', 'total': 0}
+                continue
+            try:
+                futures[_executor.submit(_ejecutar_fuente, app, tipo, term, limite, timeout_ms)] = tipo
+            except Exception:
+                _cupos.release()
+                raise
+        done, pendientes = wait(futures, timeout=timeout_ms / 1000)
+        for future in pendientes:
+            # Las que no empezaron se descartan; las que corren terminan en su statement_timeout
+            if future.cancel():
+                _cupos.release()
+        
+        resultados = []
+        for future, tipo in futures.items():
+            if future not in done:
+                fuentes[tipo] = {'estado': 'timeout', 'total': 0}
+                continue
+            try:
+                items, ms = future.result()
+            except Exception as e:
+                current_app.logger.warning('Búsqueda global: fuente %s falló: %s', tipo, e)
+                fuentes[tipo] = {'estado': 'error', 'total': 0}
+                continue
+            resultados.extend(items)
+            fuentes[tipo] = {'estado': 'ok', 'total': len(items), 'ms': round(ms, 1)}
+        
+        resultados.sort(key=lambda r: r['score'], reverse=True)
+        
+        return success_response(
+            'Búsqueda realizada exitosamente',
+            {
+                'q': term,
+                'resultados': resultados,
+                'fuentes': fuentes
+            }
+        )
+    
+    except Exception as e:
+        return error_response('Error al realizar búsqueda', str(e), 500)
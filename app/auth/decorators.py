@@ -10,7 +10,7 @@ def role_required(*allowed_roles):
         @jwt_required()
         def decorated_function(*args, **kwargs):
             current_user_id = get_jwt_identity()
-            current_user = User.query.get(current_user_id)
+            current_user = User.get_cached(current_user_id)
             
             if not current_user or not current_user.activo:
                 return jsonify({'message': 'Usuario inactivo o no encontrado'}), 403
@@ -25,4 +25,4 @@ def role_required(*allowed_roles):
 def get_current_user():
     """Obtener el usuario actual desde el token JWT"""
     current_user_id = get_jwt_identity()
-    return User.query.get(current_user_id) if current_user_id else None
\ No newline at end of file
+    return User.get_cached(current_user_id) if current_user_id else None
\ No newline at end of file
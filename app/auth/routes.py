@@ -4,8 +4,8 @@ from app.auth import bp
 from app.auth.utils import validate_user_data
 from app.auth.decorators import get_current_user, role_required
 from app.models.user import User, UserRole
-from app.extensions import db
-from datetime import datetime
+from app.extensions import db, user_cache, response_cache, password_hasher
+from app.utils.exceptions import RateLimitError
 
 @bp.route('/register', methods=['POST'])
 def register():
@@ -26,7 +26,7 @@ def register():
             nombre=data['nombre'],
             apellidos=data['apellidos'],
             telefono=data.get('telefono'),
-            rol=UserRole(data.get('rol', 'asistente'))
+            rol=data.get('rol', UserRole.ASISTENTE.value)
         )
         
         user.save()
@@ -39,6 +39,9 @@ def register():
             'data': tokens
         }), 201
         
+    except RateLimitError as e:
+        db.session.rollback()
+        return jsonify({'message': e.message}), e.status_code, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
@@ -62,7 +65,7 @@ def login():
             return jsonify({'message': 'Usuario inactivo'}), 401
         
         # Actualizar último acceso
-        user.update(ultimo_acceso=datetime.utcnow())
+        user.registrar_acceso()
         
         # Generar tokens
         tokens = user.generate_tokens()
@@ -72,6 +75,8 @@ def login():
             'data': tokens
         }), 200
         
+    except RateLimitError as e:
+        return jsonify({'message': e.message}), e.status_code, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
 
@@ -198,3 +203,30 @@ def list_users(current_user):
         
     except Exception as e:
         return jsonify({'message': 'Error interno del servidor', 'error': str(e)}), 500
+
+@bp.route('/cache/stats', methods=['GET'])
+@role_required('Administrador')
+def user_cache_stats(current_user):
+    """Estadísticas de la caché de usuarios (solo admin)"""
+    return jsonify({
+        'message': 'Estadísticas obtenidas exitosamente',
+        'data': user_cache.stats()
+    }), 200
+
+@bp.route('/cache/responses/stats', methods=['GET'])
+@role_required('Administrador')
+def response_cache_stats(current_user):
+    """Estadísticas de la caché de respuestas (solo admin)"""
+    return jsonify({
+        'message': 'Estadísticas obtenidas exitosamente',
+        'data': response_cache.stats()
+    }), 200
+
+@bp.route('/hashing/stats', methods=['GET'])
+@role_required('Administrador')
+def password_hashing_stats(current_user):
+    """Métricas de la cola de bcrypt (solo admin)"""
+    return jsonify({
+        'message': 'Estadísticas obtenidas exitosamente',
+        'data': password_hasher.stats()
+    }), 200
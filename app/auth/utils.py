@@ -1,5 +1,5 @@
 import re
-from app.models.user import User
+from app.models.user import User, UserRole
 
 def validate_email(email):
     """Validar formato de email"""
@@ -43,6 +43,9 @@ def validate_user_data(data, is_update=False):
         if not is_valid:
             errors.append(message)
     
+    if not is_update and 'rol' in data and data['rol'] not in [r.value for r in UserRole]:
+        errors.append("Rol inválido")
+    
     required_fields = ['nombre', 'apellidos'] if not is_update else []
     for field in required_fields:
         if not data.get(field):
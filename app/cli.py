@@ -2,6 +2,7 @@ import click
 from flask.cli import with_appcontext
 from .extensions import db
 from .models.user import User, UserRole
+from .models.billing import VentaDiaria, ProductoVendidoDiario
 
 @click.command()
 @with_appcontext
@@ -43,7 +44,44 @@ def create_admin(username, email, password):
     except Exception as e:
         click.echo(f'Error al crear administrador: {str(e)}')
 
+@click.command('ventas-diarias')
+@click.option('--check', is_flag=True, help='Solo verificar diferencias, sin reconstruir')
+@with_appcontext
+def ventas_diarias(check):
+    """Reconstruir los resúmenes de ventas diarias desde las facturas"""
+    try:
+        con_diferencias = False
+        for resumen in (VentaDiaria, ProductoVendidoDiario):
+            tabla = resumen.__tablename__
+            diferencias = resumen.verificar()
+            if diferencias:
+                con_diferencias = True
+                click.echo(f'{tabla}: {len(diferencias)} filas no coinciden con las facturas:')
+                for d in diferencias[:20]:
+                    llave = ' '.join(d[k] for k in resumen.LLAVES)
+                    click.echo(f"  {llave}: esperado {d['esperado']} actual {d['actual']}")
+            else:
+                click.echo(f'{tabla}: al día.')
+            
+            if not check:
+                filas = resumen.reconstruir()
+                click.echo(f'{tabla}: reconstruido con {filas} filas.')
+        
+        if check:
+            if con_diferencias:
+                raise SystemExit(1)
+            return
+        
+        db.session.commit()
+        
+    except SystemExit:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f'Error al reconstruir ventas diarias: {str(e)}')
+
 def init_app(app):
     """Registrar comandos CLI"""
     app.cli.add_command(init_db)
-    app.cli.add_command(create_admin)
\ No newline at end of file
+    app.cli.add_command(create_admin)
+    app.cli.add_command(ventas_diarias)
\ No newline at end of file
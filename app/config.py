@@ -35,9 +35,53 @@ class Config:
     
     # Pagination
     POSTS_PER_PAGE = 20
+    PAGINATION_COUNT_CAP = 1000
+    PAGINATION_COUNT_CACHE_TTL = 30  # segundos
+    PAGINATION_COUNT_CACHE_MAXSIZE = 1024
+    
+    # Búsqueda por similitud (pg_trgm)
+    SEARCH_SIMILARITY_THRESHOLD = 0.5
+    SEARCH_LIMIT_PER_TYPE = 5
+    SEARCH_TIMEOUT_MS = 500  # presupuesto de latencia por fuente en /api/search
+    
+    # Facturación: prefijos de numeración permitidos (FAC-000001, ...)
+    SERIES_FACTURA = ('FAC',)
+    
+    # Agenda: horarios de atención para la disponibilidad de citas
+    AGENDA_HORA_INICIO = '08:00'
+    AGENDA_HORA_FIN = '18:00'
+    AGENDA_INTERVALO = 30  # minutos
+    AGENDA_MAX_DIAS = 31  # días por consulta de disponibilidad
+    CITA_DURACION_DEFAULT = 30  # minutos, si no se indica ni la trae el servicio
+    
+    # Exportaciones CSV/NDJSON: filas leídas por lote del cursor
+    EXPORT_BATCH_SIZE = 1000
     
     # Security
     BCRYPT_LOG_ROUNDS = 12
+    BCRYPT_MAX_WORKERS = 2  # hashes bcrypt simultáneos por proceso
+    BCRYPT_MAX_PENDING = 8  # en cola antes de responder 429
+    BCRYPT_TIMEOUT = 10  # segundos
+    
+    # Backend de las cachés: memory (por proceso), sqlite (archivo compartido por
+    # los workers de un host) o redis; CACHE_URL es la ruta o redis://host:6379/0
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_URL = os.environ.get('CACHE_URL')
+    CACHE_KEY_PREFIX = 'zoopecas'
+    
+    # Caché de usuarios activos (role_required / get_current_user)
+    USER_CACHE_TTL = 60  # segundos
+    USER_CACHE_MAXSIZE = 1024
+    
+    # Caché de respuestas GET (cached_response); cada ruta puede fijar su TTL
+    RESPONSE_CACHE_TTL = 60  # segundos
+    RESPONSE_CACHE_MAXSIZE = 512
+    RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    
+    # Agenda por día (citas de hoy y próximas), actualizada por las rutas de citas;
+    # el TTL acota el desfase entre workers con CACHE_BACKEND=memory
+    AGENDA_CACHE_TTL = 60  # segundos
+    AGENDA_CACHE_MAXSIZE = 128  # entradas (dos por día: agenda y generación)
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
@@ -53,6 +97,8 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    BCRYPT_LOG_ROUNDS = 4  # hashes rápidos en las pruebas
 
 config = {
     'development': DevelopmentConfig,
@@ -4,10 +4,25 @@ from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 from flask_marshmallow import Marshmallow
+from app.utils.cache import ResponseCache
+from app.utils.cache_backends import CacheManager
+from app.utils.hashing import PasswordHasher
 
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
 bcrypt = Bcrypt()
 cors = CORS()
-ma = Marshmallow()
\ No newline at end of file
+ma = Marshmallow()
+password_hasher = PasswordHasher(bcrypt)
+
+# Cachés de la aplicación: en memoria del proceso o compartidas entre workers (CACHE_BACKEND)
+cache = CacheManager()
+user_cache = cache.namespace('usuarios', maxsize=1024, ttl=60)
+count_cache = cache.namespace('conteos', maxsize=1024, ttl=30)
+# Agenda materializada por día de /api/appointments/hoy y /proximas
+agenda_cache = cache.namespace('agenda', maxsize=128, ttl=60)
+response_cache = ResponseCache(
+    cache.namespace('respuestas', maxsize=512, ttl=60, sizeof=lambda entry: len(entry[0])),
+    cache.namespace('generaciones', maxsize=4096, ttl=None)
+)
\ No newline at end of file
@@ -15,8 +15,9 @@ from .medical import (
 from .vaccination import VacunaCatalogo, Vacunacion
 from .inventory import CategoriaProducto, Producto, MovimientoInventario
 from .appointment import Cita
-from .billing import Factura, DetalleFactura
+from .billing import Factura, DetalleFactura, SerieFactura, VentaDiaria, ProductoVendidoDiario
 from .alert import AlertaSistema
+from .version import VersionTabla
 
 __all__ = [
     'BaseModel', 'TimestampMixin',
@@ -25,6 +26,7 @@ __all__ = [
     'SeguimientoPaciente', 'TipoServicio', 'ServicioConsulta',
     'VacunaCatalogo', 'Vacunacion',
     'CategoriaProducto', 'Producto', 'MovimientoInventario',
-    'Cita', 'Factura', 'DetalleFactura',
-    'AlertaSistema'
+    'Cita', 'Factura', 'DetalleFactura', 'SerieFactura', 'VentaDiaria',
+    'ProductoVendidoDiario',
+    'AlertaSistema', 'VersionTabla'
 ]
\ No newline at end of file
@@ -1,7 +1,8 @@
 from app.extensions import db
+from app.models.base import SerializerMixin, isoformat
 from sqlalchemy import Index, CheckConstraint
 
-class AlertaSistema(db.Model):
+class AlertaSistema(SerializerMixin, db.Model):
     __tablename__ = 'alertas_sistema'
     
     alerta_id = db.Column('alerta_id', db.Integer, primary_key=True)
@@ -21,14 +22,16 @@ class AlertaSistema(db.Model):
         Index('idx_alertas_fecha', 'fecha_creacion'),
     )
     
-    def to_dict(self):
-        return {
-            'alerta_id': self.alerta_id,
-            'tipo_alerta': self.tipo_alerta,
-            'titulo': self.titulo,
-            'mensaje': self.mensaje,
-            'fecha_creacion': self.fecha_creacion.isoformat(),
-            'leida': self.leida,
-            'usuario_destinatario': self.usuario_destinatario
-        }
+    __fields__ = {
+        'alerta_id': 'alerta_id',
+        'tipo_alerta': 'tipo_alerta',
+        'titulo': 'titulo',
+        'mensaje': 'mensaje',
+        'fecha_creacion': ('fecha_creacion', isoformat),
+        'leida': 'leida',
+        'usuario_destinatario': 'usuario_destinatario'
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
 
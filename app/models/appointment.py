@@ -1,6 +1,13 @@
+from datetime import time
 from app.extensions import db
-from app.models.base import BaseModel
-from sqlalchemy import Index, CheckConstraint
+from app.models.base import BaseModel, RowField, isoformat, wants_field
+from sqlalchemy import Index, CheckConstraint, func, select
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+def _hora(minutos):
+    return time(minutos // 60, minutos % 60)
 
 class Cita(BaseModel):
     __tablename__ = 'citas'
@@ -11,6 +18,8 @@ class Cita(BaseModel):
     veterinario_id = db.Column(db.Integer, db.ForeignKey('veterinarios.veterinario_id'))
     fecha_cita = db.Column(db.Date, nullable=False)
     hora_cita = db.Column(db.Time, nullable=False)
+    servicio_id = db.Column(db.Integer, db.ForeignKey('tipos_servicios.servicio_id'))
+    duracion = db.Column(db.Integer, nullable=False, default=30, server_default='30')  # minutos
     motivo = db.Column(db.String(255), nullable=False)
     estado = db.Column(db.String(20), default='Programada')
     observaciones = db.Column(db.Text)
@@ -20,39 +29,118 @@ class Cita(BaseModel):
     cliente = db.relationship('Cliente', back_populates='citas')
     mascota = db.relationship('Mascota', back_populates='citas')
     veterinario = db.relationship('Veterinario', back_populates='citas')
-
+    
     __table_args__ = (
         CheckConstraint("estado IN ('Programada', 'Confirmada', 'En curso', 'Completada', 'Cancelada', 'No asistió')", 
                        name='check_estado_cita'),
+        CheckConstraint('duracion BETWEEN 1 AND 480', name='check_duracion_cita'),
         Index('idx_citas_fecha', 'fecha_cita', 'hora_cita'),
+        Index('idx_citas_fecha_id', 'fecha_cita', 'hora_cita', 'cita_id'),
         Index('idx_citas_cliente', 'cliente_id'),
         Index('idx_citas_mascota', 'mascota_id'),
-        Index('idx_citas_veterinario', 'veterinario_id'),
+        # Agenda de un veterinario por día (solapamientos y disponibilidad)
+        Index('idx_citas_veterinario_fecha', 'veterinario_id', 'fecha_cita', 'hora_cita'),
         Index('idx_citas_estado', 'estado'),
     )
     
+    # Estados en los que la cita ocupa la agenda del veterinario
+    ESTADOS_OCUPAN = ('Programada', 'Confirmada', 'En curso')
+    # Duración máxima en minutos; acota la búsqueda de solapamientos
+    DURACION_MAXIMA = 480
+    
     @property
     def id(self):
         return self.cita_id
     
-    def to_dict(self, include_relations=True):
-        data = {
-            'cita_id': self.cita_id,
-            'cliente_id': self.cliente_id,
-            'mascota_id': self.mascota_id,
-            'veterinario_id': self.veterinario_id,
-            'fecha_cita': self.fecha_cita.isoformat(),
-            'hora_cita': self.hora_cita.isoformat(),
-            'motivo': self.motivo,
-            'estado': self.estado,
-            'observaciones': self.observaciones,
-            'fecha_creacion': self.fecha_creacion.isoformat(),
-            'activa': self.activa
-        }
+    @classmethod
+    def bloquear_agenda(cls, veterinario_id, fecha):
+        """Serializar las reservas de un veterinario en un día hasta el fin de la transacción.
+        
+        En PostgreSQL toma un advisory lock transaccional (veterinario, día):
+        dos reservas simultáneas para la misma agenda verifican solapamientos
+        una después de la otra. En otros motores no hace nada.
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            db.session.execute(select(func.pg_advisory_xact_lock(veterinario_id, fecha.toordinal())))
+    
+    def solapa(self, hora, duracion):
+        """La cita ocupa parte de [hora, hora + duracion)"""
+        inicio = _minutos(hora)
+        propio = _minutos(self.hora_cita)
+        return propio < inicio + duracion and inicio < propio + self.duracion
+    
+    @classmethod
+    def agenda(cls, veterinario_id, fechas):
+        """Citas que ocupan la agenda del veterinario en ``fechas``, por día (una consulta)"""
+        dias = {fecha: [] for fecha in fechas}
+        citas = cls.query.filter(
+            cls.veterinario_id == veterinario_id,
+            cls.fecha_cita.in_(list(dias)),
+            cls.estado.in_(cls.ESTADOS_OCUPAN),
+            cls.activa == True
+        ).order_by(cls.fecha_cita, cls.hora_cita)
+        for cita in citas:
+            dias[cita.fecha_cita].append(cita)
+        return dias
+    
+    @classmethod
+    def conflictos(cls, veterinario_id, fecha, hora, duracion, excluir_id=None):
+        """Citas activas del veterinario que se solapan con [hora, hora + duracion) ese día"""
+        inicio = _minutos(hora)
+        fin = inicio + duracion
+        
+        query = cls.query.filter(
+            cls.veterinario_id == veterinario_id,
+            cls.fecha_cita == fecha,
+            cls.estado.in_(cls.ESTADOS_OCUPAN),
+            cls.activa == True
+        )
+        # Solo pueden solaparse las que empiezan menos de DURACION_MAXIMA antes
+        # y antes del fin: rango sobre idx_citas_veterinario_fecha
+        if inicio > cls.DURACION_MAXIMA:
+            query = query.filter(cls.hora_cita > _hora(inicio - cls.DURACION_MAXIMA))
+        if fin < 24 * 60:
+            query = query.filter(cls.hora_cita < _hora(fin))
+        if excluir_id is not None:
+            query = query.filter(cls.cita_id != excluir_id)
+        
+        return [cita for cita in query.order_by(cls.hora_cita) if cita.solapa(hora, duracion)]
+    
+    __fields__ = {
+        'cita_id': 'cita_id',
+        'cliente_id': 'cliente_id',
+        'mascota_id': 'mascota_id',
+        'veterinario_id': 'veterinario_id',
+        'fecha_cita': ('fecha_cita', isoformat),
+        'hora_cita': ('hora_cita', isoformat),
+        'servicio_id': 'servicio_id',
+        'duracion': 'duracion',
+        'motivo': 'motivo',
+        'estado': 'estado',
+        'observaciones': 'observaciones',
+        'fecha_creacion': ('fecha_creacion', isoformat),
+        'activa': 'activa'
+    }
+    __field_columns__ = {
+        'cliente': ('cliente_id',),
+        'mascota': ('mascota_id',),
+        'veterinario': ('veterinario_id',)
+    }
+    __row_fields__ = {
+        'cliente': RowField(relation='cliente'),
+        'mascota': RowField(relation='mascota'),
+        'veterinario': RowField(relation='veterinario')
+    }
+    
+    def to_dict(self, include_relations=True, fields=None):
+        data = self.serialize_fields(fields)
         
         if include_relations:
-            data['cliente'] = self.cliente.to_dict() if self.cliente else None
-            data['mascota'] = self.mascota.to_dict() if self.mascota else None
-            data['veterinario'] = self.veterinario.to_dict() if self.veterinario else None
+            if wants_field(fields, 'cliente'):
+                data['cliente'] = self.cliente.to_dict() if self.cliente else None
+            if wants_field(fields, 'mascota'):
+                data['mascota'] = self.mascota.to_dict() if self.mascota else None
+            if wants_field(fields, 'veterinario'):
+                data['veterinario'] = self.veterinario.to_dict() if self.veterinario else None
         
         return data
\ No newline at end of file
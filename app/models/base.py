@@ -1,13 +1,217 @@
 # -*- coding: utf-8 -*-
 from app.extensions import db
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+def isoformat(value):
+    """Fecha/hora en ISO 8601 (None si no hay valor)"""
+    return value.isoformat() if value else None
+
+def float_or_none(value):
+    """Decimal a float (None si no hay valor o es cero, como en los to_dict originales)"""
+    return float(value) if value else None
+
+def wants_field(fields, key):
+    """La llave se serializa: no se pidieron campos o está entre los pedidos"""
+    return fields is None or key in fields
+
+class RowField:
+    """Llave de ``to_dict`` que no es una columna, calculada sobre tuplas (``row_serializer``).
+    
+    - ``columns`` + ``compute``: función de los valores de esas columnas.
+    - ``sql``: función ``(modelo) -> expresión SQL`` que se selecciona con la fila.
+    - ``relation``: relación cuyo registro se anida completo (``to_dict()``).
+    
+    ``omit_none`` omite la llave cuando el valor es None, como los ``to_dict``
+    que solo la agregan si existe.
+    """
+    
+    def __init__(self, columns=(), compute=None, sql=None, relation=None, omit_none=False):
+        self.columns = columns
+        self.compute = compute
+        self.sql = sql
+        self.relation = relation
+        self.omit_none = omit_none
+
+class RowSerializer:
+    """Serializador compilado de un modelo para un conjunto de campos.
+    
+    Selecciona tuplas con solo las columnas necesarias en lugar de objetos
+    ORM y arma cada diccionario con conversiones precalculadas por llave; el
+    resultado es el mismo de ``to_dict()``. Las relaciones anidadas se
+    cargan con una consulta por relación para toda la lista.
+    """
+    
+    def __init__(self, model, fields=None):
+        mapper = inspect(model)
+        self.model = model
+        self.columns = []
+        self._positions = {}
+        self._plan = []
+        self._optional = []
+        self._relations = []
+        
+        pk = mapper.primary_key[0]
+        self._pk = getattr(model, pk.key)
+        self._pk_position = self._column(pk.key)
+        
+        keys = list(model.__fields__) + [k for k in model.__row_fields__ if k not in model.__fields__]
+        for key in keys:
+            if fields is not None and key not in fields:
+                continue
+            spec = model.__row_fields__.get(key, model.__fields__.get(key))
+            convert = None
+            if isinstance(spec, RowField):
+                if spec.relation:
+                    relation = mapper.relationships[spec.relation]
+                    (local,) = relation.local_columns
+                    self._relations.append((key, self._column(local.key), relation.mapper.class_))
+                    continue
+                if spec.sql:
+                    getter = itemgetter(len(self.columns))
+                    self.columns.append(spec.sql(model).label(key))
+                else:
+                    getter = itemgetter(*(self._column(c) for c in spec.columns))
+                    convert = spec.compute
+                    if len(spec.columns) > 1:
+                        convert = lambda values, compute=spec.compute: compute(*values)
+                if spec.omit_none:
+                    self._optional.append(key)
+            elif isinstance(spec, str) and spec in mapper.column_attrs:
+                getter = itemgetter(self._column(spec))
+            elif isinstance(spec, tuple) and spec[0] in mapper.column_attrs:
+                getter = itemgetter(self._column(spec[0]))
+                convert = spec[1]
+            else:
+                raise ValueError(f'{model.__name__}.{key} no se puede serializar por filas')
+            self._plan.append((key, getter, convert))
+    
+    def _column(self, name):
+        """Posición de una columna del modelo en la tupla (agregándola si falta)"""
+        if name not in self._positions:
+            self._positions[name] = len(self.columns)
+            self.columns.append(getattr(self.model, name))
+        return self._positions[name]
+    
+    def select(self, query, *columns):
+        """``query`` (con sus filtros y orden) seleccionando solo las columnas necesarias.
+        
+        ``columns`` son columnas adicionales que la ruta necesita aunque no se
+        serialicen (p. ej. las llaves del cursor de paginación).
+        """
+        extra = [c for c in columns if c.key not in self._positions]
+        return query.with_entities(*self.columns, *extra)
+    
+    @property
+    def keys(self):
+        """Llaves de los diccionarios serializados, en orden"""
+        return [key for key, _, _ in self._plan] + [key for key, _, _ in self._relations]
+    
+    def __call__(self, row):
+        """Diccionario de una fila (sin relaciones anidadas)"""
+        data = {
+            key: getter(row) if convert is None else convert(getter(row))
+            for key, getter, convert in self._plan
+        }
+        for key in self._optional:
+            if data[key] is None:
+                del data[key]
+        return data
+    
+    def serialize_many(self, rows):
+        """Diccionarios de varias filas, con sus relaciones anidadas"""
+        items = [self(row) for row in rows]
+        for key, position, related in self._relations:
+            ids = {row[position] for row in rows}
+            ids.discard(None)
+            nested = related.row_serializer().fetch(ids)
+            for item, row in zip(items, rows):
+                item[key] = nested.get(row[position])
+        return items
+    
+    def fetch(self, ids):
+        """Diccionarios de los registros con esas llaves primarias, por llave"""
+        if not ids:
+            return {}
+        rows = db.session.query(*self.columns).filter(self._pk.in_(ids)).all()
+        return {
+            row[self._pk_position]: item
+            for row, item in zip(rows, self.serialize_many(rows))
+        }
+
+@lru_cache(maxsize=256)
+def _row_serializer(model, fields):
+    return RowSerializer(model, fields)
+
+class SerializerMixin:
+    """Serialización declarativa con campos parciales (``?fields=``).
+    
+    ``__fields__`` define, en orden, cada llave de ``to_dict``: el nombre de un
+    atributo, una tupla ``(atributo, conversión)`` o una función que recibe la
+    instancia. ``__field_columns__`` indica qué columnas necesitan las llaves
+    que no son una columna (propiedades y relaciones), para que
+    ``load_only_fields`` pueda diferir en SQL todas las demás.
+    ``__row_fields__`` da la versión ``RowField`` de esas llaves (y de las
+    relaciones que ``to_dict()`` anida) para ``row_serializer``.
+    """
+    __fields__ = {}
+    __field_columns__ = {}
+    __row_fields__ = {}
+    
+    def serialize_fields(self, fields=None):
+        """Diccionario con las llaves de ``__fields__`` pedidas (todas si ``fields`` es None)"""
+        data = {}
+        for key, spec in self.__fields__.items():
+            if fields is not None and key not in fields:
+                continue
+            if isinstance(spec, str):
+                data[key] = getattr(self, spec)
+            elif isinstance(spec, tuple):
+                attr, convert = spec
+                data[key] = convert(getattr(self, attr))
+            else:
+                data[key] = spec(self)
+        return data
+    
+    @classmethod
+    def field_keys(cls, fields=None):
+        """Llaves de ``serialize_fields(fields)``, en orden"""
+        return [key for key in cls.__fields__ if fields is None or key in fields]
+    
+    @classmethod
+    def field_columns(cls, fields):
+        """Nombres de las columnas necesarias para serializar ``fields``"""
+        mapper = inspect(cls)
+        columns = {attr.key for attr in mapper.column_attrs if attr.columns[0].primary_key}
+        for key in fields:
+            if key in cls.__field_columns__:
+                columns.update(cls.__field_columns__[key])
+                continue
+            spec = cls.__fields__.get(key)
+            attr = spec if isinstance(spec, str) else spec[0] if isinstance(spec, tuple) else None
+            if attr in mapper.column_attrs:
+                columns.add(attr)
+        return columns
+    
+    @classmethod
+    def load_only_fields(cls, fields):
+        """Opción de carga que solo trae de la base las columnas de ``fields``"""
+        return load_only(*(getattr(cls, c) for c in sorted(cls.field_columns(fields))))
+    
+    @classmethod
+    def row_serializer(cls, fields=None):
+        """``RowSerializer`` compilado (y reutilizado) para ``fields``"""
+        return _row_serializer(cls, fields)
 
 class TimestampMixin:
     """Mixin para agregar timestamps a los modelos"""
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
-class BaseModel(db.Model):
+class BaseModel(SerializerMixin, db.Model):
     """Modelo base con métodos comunes"""
     __abstract__ = True
     
@@ -1,6 +1,9 @@
 from app.extensions import db
-from app.models.base import BaseModel
-from sqlalchemy import Index, CheckConstraint
+from app.models.base import BaseModel, SerializerMixin, isoformat, wants_field
+from sqlalchemy import Index, CheckConstraint, Integer, cast, func, update, delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from decimal import Decimal, ROUND_HALF_UP
+import heapq
 
 class Factura(BaseModel):
     __tablename__ = 'facturas'
@@ -27,36 +30,46 @@ class Factura(BaseModel):
                        name='check_estado_factura'),
         Index('idx_facturas_numero', 'numero_factura'),
         Index('idx_facturas_fecha', 'fecha_factura'),
+        Index('idx_facturas_fecha_id', 'fecha_factura', 'factura_id'),
         Index('idx_facturas_cliente', 'cliente_id'),
         Index('idx_facturas_estado', 'estado'),
+        Index('idx_facturas_numero_trgm', 'numero_factura', postgresql_using='gin',
+              postgresql_ops={'numero_factura': 'gin_trgm_ops'}),
     )
     
     @property
     def id(self):
         return self.factura_id
     
-    def to_dict(self, include_detalles=False):
-        data = {
-            'factura_id': self.factura_id,
-            'cliente_id': self.cliente_id,
-            'numero_factura': self.numero_factura,
-            'fecha_factura': self.fecha_factura.isoformat(),
-            'subtotal': float(self.subtotal),
-            'impuestos': float(self.impuestos),
-            'total': float(self.total),
-            'metodo_pago': self.metodo_pago,
-            'estado': self.estado,
-            'observaciones': self.observaciones
-        }
+    __fields__ = {
+        'factura_id': 'factura_id',
+        'cliente_id': 'cliente_id',
+        'numero_factura': 'numero_factura',
+        'fecha_factura': ('fecha_factura', isoformat),
+        'subtotal': ('subtotal', float),
+        'impuestos': ('impuestos', float),
+        'total': ('total', float),
+        'metodo_pago': 'metodo_pago',
+        'estado': 'estado',
+        'observaciones': 'observaciones'
+    }
+    __field_columns__ = {
+        'cliente': ('cliente_id',)
+    }
+    
+    def to_dict(self, include_detalles=False, fields=None):
+        data = self.serialize_fields(fields)
         
         if include_detalles:
-            data['cliente'] = self.cliente.to_dict() if self.cliente else None
-            data['detalles'] = [d.to_dict() for d in self.detalles.all()]
+            if wants_field(fields, 'cliente'):
+                data['cliente'] = self.cliente.to_dict() if self.cliente else None
+            if wants_field(fields, 'detalles'):
+                data['detalles'] = [d.to_dict() for d in self.detalles.all()]
         
         return data
 
 
-class DetalleFactura(db.Model):
+class DetalleFactura(SerializerMixin, db.Model):
     __tablename__ = 'detalles_factura'
     
     detalle_id = db.Column('detalle_id', db.Integer, primary_key=True)
@@ -82,16 +95,321 @@ class DetalleFactura(db.Model):
         Index('idx_detalles_factura', 'factura_id'),
     )
     
-    def to_dict(self):
-        return {
-            'detalle_id': self.detalle_id,
-            'factura_id': self.factura_id,
-            'producto_id': self.producto_id,
-            'consulta_id': self.consulta_id,
-            'vacunacion_id': self.vacunacion_id,
-            'tipo_item': self.tipo_item,
-            'descripcion': self.descripcion,
-            'cantidad': self.cantidad,
-            'precio_unitario': float(self.precio_unitario),
-            'subtotal': float(self.subtotal)
+    __fields__ = {
+        'detalle_id': 'detalle_id',
+        'factura_id': 'factura_id',
+        'producto_id': 'producto_id',
+        'consulta_id': 'consulta_id',
+        'vacunacion_id': 'vacunacion_id',
+        'tipo_item': 'tipo_item',
+        'descripcion': 'descripcion',
+        'cantidad': 'cantidad',
+        'precio_unitario': ('precio_unitario', float),
+        'subtotal': ('subtotal', float)
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
+
+
+class SerieFactura(SerializerMixin, db.Model):
+    __tablename__ = 'series_factura'
+    
+    prefijo = db.Column(db.String(10), primary_key=True)
+    ultimo_numero = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def allocate(cls, prefijo='FAC'):
+        """Asignar el siguiente número de factura de la serie.
+        
+        El contador se incrementa con un UPDATE que bloquea la fila de la serie
+        hasta el commit de la transacción actual: facturas concurrentes de la
+        misma serie esperan su turno y, si la transacción se revierte, el número
+        se libera. Así la numeración no tiene huecos entre facturas confirmadas.
+        """
+        numero = cls._increment(prefijo)
+        if numero is None:
+            cls._create(prefijo)
+            numero = cls._increment(prefijo)
+        return f"{prefijo}-{numero:06d}"
+    
+    @classmethod
+    def _increment(cls, prefijo):
+        return db.session.execute(
+            update(cls)
+            .where(cls.prefijo == prefijo)
+            .values(ultimo_numero=cls.ultimo_numero + 1)
+            .returning(cls.ultimo_numero)
+        ).scalar()
+    
+    @classmethod
+    def _create(cls, prefijo):
+        """Crear la serie continuando desde la última factura existente con ese prefijo"""
+        ultimo = db.session.query(
+            func.max(cast(func.substr(Factura.numero_factura, len(prefijo) + 2), Integer))
+        ).filter(Factura.numero_factura.like(f'{prefijo}-%')).scalar() or 0
+        
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(prefijo=prefijo, ultimo_numero=ultimo))
+        except IntegrityError:
+            # Otra transacción creó la serie al mismo tiempo
+            pass
+    
+    __fields__ = {
+        'prefijo': 'prefijo',
+        'ultimo_numero': 'ultimo_numero'
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
+
+
+class ResumenDiarioMixin:
+    """Operaciones comunes de las tablas de resumen mantenidas incrementalmente.
+    
+    Cada tabla define sus columnas ``LLAVES`` (llave primaria), sus ``MEDIDAS``
+    acumuladas y ``_agregado_fuente()``, el SELECT agrupado que la reconstruye.
+    """
+    LLAVES = ()
+    MEDIDAS = ()
+    
+    @staticmethod
+    def _redondear(valor):
+        # Mismo redondeo que aplican las columnas Numeric(10, 2) de origen
+        return Decimal(str(valor or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    
+    @classmethod
+    def _sumar(cls, llave, valores):
+        """Sumar ``valores`` a la fila ``llave``, creándola si no existe. No hace commit."""
+        if not cls._acumular(llave, valores):
+            cls._create(llave)
+            cls._acumular(llave, valores)
+    
+    @classmethod
+    def _acumular(cls, llave, valores):
+        result = db.session.execute(
+            update(cls)
+            .where(*[getattr(cls, k) == v for k, v in llave.items()])
+            .values({m: getattr(cls, m) + valores[m] for m in cls.MEDIDAS})
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+    
+    @classmethod
+    def _create(cls, llave):
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(cls).values(**llave, **{m: 0 for m in cls.MEDIDAS}))
+        except IntegrityError:
+            # Otra transacción creó la fila al mismo tiempo
+            pass
+    
+    @classmethod
+    def _agregado_fuente(cls):
+        raise NotImplementedError
+    
+    @classmethod
+    def reconstruir(cls):
+        """Regenerar el resumen completo desde las tablas de origen (en la transacción actual)"""
+        db.session.execute(delete(cls))
+        db.session.execute(
+            insert(cls).from_select(list(cls.LLAVES + cls.MEDIDAS), cls._agregado_fuente())
+        )
+        return db.session.query(func.count()).select_from(cls).scalar()
+    
+    @classmethod
+    def verificar(cls):
+        """Diferencias entre el resumen y las tablas de origen; lista vacía si están al día"""
+        n = len(cls.LLAVES)
+        esperado = {
+            tuple(fila[:n]): tuple(fila[n:])
+            for fila in db.session.execute(cls._agregado_fuente())
+        }
+        actual = {
+            tuple(getattr(f, k) for k in cls.LLAVES): tuple(getattr(f, m) for m in cls.MEDIDAS)
+            for f in cls.query.filter(cls.cantidad != 0).all()
         }
+        
+        def normalizar(valores):
+            return tuple(
+                int(v) if isinstance(cls.__table__.c[m].type, Integer) else cls._redondear(v)
+                for m, v in zip(cls.MEDIDAS, valores)
+            )
+        
+        cero = (0,) * len(cls.MEDIDAS)
+        diferencias = []
+        for llave in sorted(set(esperado) | set(actual), key=lambda k: tuple(str(v) for v in k)):
+            esp = normalizar(esperado.get(llave, cero))
+            act = normalizar(actual.get(llave, cero))
+            if esp != act:
+                diferencias.append({
+                    **{k: str(v) for k, v in zip(cls.LLAVES, llave)},
+                    'esperado': dict(zip(cls.MEDIDAS, esp)),
+                    'actual': dict(zip(cls.MEDIDAS, act))
+                })
+        return diferencias
+
+
+class VentaDiaria(ResumenDiarioMixin, SerializerMixin, db.Model):
+    """Resumen de ventas por día, método de pago y estado.
+    
+    Se mantiene en la misma transacción que los cambios de ``Factura`` para
+    que los reportes sumen unas pocas filas por día en lugar de todas las facturas.
+    """
+    __tablename__ = 'ventas_diarias'
+    
+    fecha = db.Column(db.Date, primary_key=True)
+    metodo_pago = db.Column(db.String(20), primary_key=True)
+    estado = db.Column(db.String(20), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    subtotal = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    impuestos = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    
+    LLAVES = ('fecha', 'metodo_pago', 'estado')
+    MEDIDAS = ('cantidad', 'subtotal', 'impuestos', 'total')
+    
+    @classmethod
+    def registrar(cls, factura, signo=1):
+        """Sumar (``signo=1``) o restar (``signo=-1``) una factura en su fila del día.
+        
+        No hace commit: el cambio queda en la transacción de la factura.
+        """
+        cls._sumar(
+            {
+                'fecha': factura.fecha_factura,
+                'metodo_pago': factura.metodo_pago,
+                'estado': factura.estado or 'Pendiente'
+            },
+            {
+                'cantidad': signo,
+                'subtotal': signo * cls._redondear(factura.subtotal),
+                'impuestos': signo * cls._redondear(factura.impuestos),
+                'total': signo * cls._redondear(factura.total)
+            }
+        )
+    
+    @classmethod
+    def retirar(cls, factura):
+        """Restar una factura de su fila (antes de cambiar fecha, método o estado)"""
+        cls.registrar(factura, -1)
+    
+    @classmethod
+    def _agregado_fuente(cls):
+        return select(
+            Factura.fecha_factura,
+            Factura.metodo_pago,
+            func.coalesce(Factura.estado, 'Pendiente'),
+            func.count(Factura.factura_id),
+            func.coalesce(func.sum(Factura.subtotal), 0),
+            func.coalesce(func.sum(Factura.impuestos), 0),
+            func.coalesce(func.sum(Factura.total), 0)
+        ).group_by(
+            Factura.fecha_factura,
+            Factura.metodo_pago,
+            func.coalesce(Factura.estado, 'Pendiente')
+        )
+    
+    __fields__ = {
+        'fecha': ('fecha', isoformat),
+        'metodo_pago': 'metodo_pago',
+        'estado': 'estado',
+        'cantidad': 'cantidad',
+        'subtotal': ('subtotal', float),
+        'impuestos': ('impuestos', float),
+        'total': ('total', float)
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
+
+
+class ProductoVendidoDiario(ResumenDiarioMixin, SerializerMixin, db.Model):
+    """Unidades y monto vendidos por día y producto (solo facturas no anuladas)"""
+    __tablename__ = 'productos_vendidos_diarios'
+    
+    fecha = db.Column(db.Date, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.producto_id'), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    monto = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    
+    LLAVES = ('fecha', 'producto_id')
+    MEDIDAS = ('cantidad', 'monto')
+    
+    __table_args__ = (
+        Index('idx_productos_vendidos_diarios_producto', 'producto_id'),
+    )
+    
+    @classmethod
+    def registrar(cls, factura, signo=1):
+        """Sumar (o restar con ``signo=-1``) los productos de una factura ya insertada.
+        
+        No hace commit: el cambio queda en la transacción de la factura.
+        """
+        productos = db.session.query(
+            DetalleFactura.producto_id,
+            func.sum(DetalleFactura.cantidad),
+            func.sum(DetalleFactura.subtotal)
+        ).filter(
+            DetalleFactura.factura_id == factura.factura_id,
+            DetalleFactura.tipo_item == 'Producto',
+            DetalleFactura.producto_id.isnot(None)
+        ).group_by(DetalleFactura.producto_id).all()
+        
+        for producto_id, cantidad, monto in productos:
+            cls._sumar(
+                {'fecha': factura.fecha_factura, 'producto_id': producto_id},
+                {'cantidad': signo * int(cantidad), 'monto': signo * cls._redondear(monto)}
+            )
+    
+    @classmethod
+    def retirar(cls, factura):
+        """Restar los productos de una factura que se anula"""
+        cls.registrar(factura, -1)
+    
+    @classmethod
+    def _agregado_fuente(cls):
+        return select(
+            Factura.fecha_factura,
+            DetalleFactura.producto_id,
+            func.sum(DetalleFactura.cantidad),
+            func.sum(DetalleFactura.subtotal)
+        ).join(
+            Factura, DetalleFactura.factura_id == Factura.factura_id
+        ).filter(
+            DetalleFactura.tipo_item == 'Producto',
+            DetalleFactura.producto_id.isnot(None),
+            func.coalesce(Factura.estado, 'Pendiente') != 'Anulada'
+        ).group_by(
+            Factura.fecha_factura,
+            DetalleFactura.producto_id
+        )
+    
+    @classmethod
+    def top(cls, fecha_desde, fecha_hasta, limite=10):
+        """Productos más vendidos del período: ``[(producto_id, cantidad, monto)]``.
+        
+        Se suman las filas diarias por producto y se seleccionan los ``limite``
+        mayores con ``heapq.nlargest`` (O(n log k)) en lugar de ordenar todo.
+        """
+        totales = db.session.query(
+            cls.producto_id,
+            func.sum(cls.cantidad),
+            func.sum(cls.monto)
+        ).filter(
+            cls.fecha.between(fecha_desde, fecha_hasta)
+        ).group_by(cls.producto_id).having(func.sum(cls.cantidad) > 0).all()
+        
+        # Empates por cantidad: primero el producto de menor id
+        return heapq.nlargest(limite, totales, key=lambda t: (t[1], -t[0]))
+    
+    __fields__ = {
+        'fecha': ('fecha', isoformat),
+        'producto_id': 'producto_id',
+        'cantidad': 'cantidad',
+        'monto': ('monto', float)
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
\ No newline at end of file
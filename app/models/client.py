@@ -1,6 +1,19 @@
 from app.extensions import db
-from app.models.base import BaseModel
-from sqlalchemy import Index
+from app.models.base import BaseModel, RowField, isoformat, wants_field
+from app.utils.search import ranked_search
+from sqlalchemy import Index, func, select
+from sqlalchemy.orm import joinedload
+
+def formato_nombre(nombre, apellidos):
+    """Nombre completo de un cliente"""
+    return f"{nombre} {apellidos or ''}".strip()
+
+def _total_mascotas_sql(model):
+    from app.models.pet import Mascota
+    
+    return select(func.count(Mascota.mascota_id)).where(
+        Mascota.cliente_id == model.cliente_id
+    ).scalar_subquery()
 
 class Cliente(BaseModel):
     __tablename__ = 'clientes'
@@ -28,8 +41,22 @@ class Cliente(BaseModel):
         Index('idx_clientes_documento', 'documento_identidad'),
         Index('idx_clientes_telefono', 'telefono'),
         Index('idx_clientes_nombre', 'nombre', 'apellidos'),
+        Index('idx_clientes_nombre_trgm', 'nombre', postgresql_using='gin',
+              postgresql_ops={'nombre': 'gin_trgm_ops'}),
+        Index('idx_clientes_apellidos_trgm', 'apellidos', postgresql_using='gin',
+              postgresql_ops={'apellidos': 'gin_trgm_ops'}),
+        Index('idx_clientes_documento_trgm', 'documento_identidad', postgresql_using='gin',
+              postgresql_ops={'documento_identidad': 'gin_trgm_ops'}),
+        Index('idx_clientes_telefono_trgm', 'telefono', postgresql_using='gin',
+              postgresql_ops={'telefono': 'gin_trgm_ops'}),
+        Index('idx_clientes_email_trgm', 'email', postgresql_using='gin',
+              postgresql_ops={'email': 'gin_trgm_ops'}),
     )
     
+    # Valores precargados por preload_total_mascotas / preload_mascotas_activas (no persistidos)
+    _total_mascotas = None
+    _mascotas_activas = None
+    
     @property
     def id(self):
         """Alias para compatibilidad con JWT"""
@@ -37,35 +64,99 @@ class Cliente(BaseModel):
     
     @property
     def nombre_completo(self):
-        return f"{self.nombre} {self.apellidos or ''}".strip()
+        return formato_nombre(self.nombre, self.apellidos)
     
     @property
     def mascotas_activas(self):
+        if self._mascotas_activas is not None:
+            return self._mascotas_activas
         return self.mascotas.filter_by(activo=True).all()
     
     @property
     def total_mascotas(self):
+        if self._total_mascotas is not None:
+            return self._total_mascotas
         return self.mascotas.count()
     
-    def to_dict(self, include_mascotas=False):
-        data = {
-            'id': self.cliente_id,
-            'cliente_id': self.cliente_id,
-            'nombre': self.nombre,
-            'apellidos': self.apellidos,
-            'nombre_completo': self.nombre_completo,
-            'documento_identidad': self.documento_identidad,
-            'telefono': self.telefono,
-            'email': self.email,
-            'direccion': self.direccion,
-            'ciudad': self.ciudad,
-            'activo': self.activo,
-            'observaciones': self.observaciones,
-            'fecha_registro': self.fecha_registro.isoformat() if self.fecha_registro else None,
-            'total_mascotas': self.total_mascotas
-        }
+    @classmethod
+    def preload_total_mascotas(cls, clientes):
+        """Calcular total_mascotas de varios clientes con una sola consulta agrupada"""
+        from app.models.pet import Mascota
+        
+        pendientes = {c.cliente_id: c for c in clientes if c is not None}
+        if not pendientes:
+            return
+        
+        totales = dict(
+            db.session.query(Mascota.cliente_id, func.count(Mascota.mascota_id))
+            .filter(Mascota.cliente_id.in_(pendientes.keys()))
+            .group_by(Mascota.cliente_id)
+            .all()
+        )
+        for cliente_id, cliente in pendientes.items():
+            cliente._total_mascotas = totales.get(cliente_id, 0)
+    
+    @classmethod
+    def preload_mascotas_activas(cls, clientes):
+        """Cargar las mascotas activas de varios clientes con una sola consulta"""
+        from app.models.pet import Mascota
+        
+        pendientes = {c.cliente_id: c for c in clientes if c is not None}
+        if not pendientes:
+            return
+        
+        por_cliente = {cliente_id: [] for cliente_id in pendientes}
+        mascotas = Mascota.query.options(joinedload(Mascota.historia_clinica)).filter(
+            Mascota.cliente_id.in_(pendientes.keys()),
+            Mascota.activo == True
+        ).order_by(Mascota.mascota_id).all()
+        for mascota in mascotas:
+            por_cliente[mascota.cliente_id].append(mascota)
         
-        if include_mascotas:
+        for cliente_id, cliente in pendientes.items():
+            cliente._mascotas_activas = por_cliente[cliente_id]
+    
+    @classmethod
+    def serialize_many(cls, clientes, include_mascotas=False, fields=None):
+        """Serializar varios clientes con conteos y mascotas precargados"""
+        anidar = include_mascotas and wants_field(fields, 'mascotas')
+        if anidar or wants_field(fields, 'total_mascotas'):
+            cls.preload_total_mascotas(clientes)
+        if anidar:
+            cls.preload_mascotas_activas(clientes)
+        return [c.to_dict(include_mascotas=include_mascotas, fields=fields) for c in clientes]
+    
+    __fields__ = {
+        'id': 'cliente_id',
+        'cliente_id': 'cliente_id',
+        'nombre': 'nombre',
+        'apellidos': 'apellidos',
+        'nombre_completo': 'nombre_completo',
+        'documento_identidad': 'documento_identidad',
+        'telefono': 'telefono',
+        'email': 'email',
+        'direccion': 'direccion',
+        'ciudad': 'ciudad',
+        'activo': 'activo',
+        'observaciones': 'observaciones',
+        'fecha_registro': ('fecha_registro', isoformat),
+        'total_mascotas': 'total_mascotas'
+    }
+    __field_columns__ = {
+        'nombre_completo': ('nombre', 'apellidos'),
+        # Cada mascota anidada incluye a su propietario completo (este mismo objeto)
+        'mascotas': ('nombre', 'apellidos', 'documento_identidad', 'telefono', 'email',
+                     'direccion', 'ciudad', 'activo', 'observaciones', 'fecha_registro')
+    }
+    __row_fields__ = {
+        'nombre_completo': RowField(('nombre', 'apellidos'), formato_nombre),
+        'total_mascotas': RowField(sql=_total_mascotas_sql)
+    }
+    
+    def to_dict(self, include_mascotas=False, fields=None):
+        data = self.serialize_fields(fields)
+        
+        if include_mascotas and wants_field(fields, 'mascotas'):
             data['mascotas'] = [m.to_dict() for m in self.mascotas_activas]
         
         return data
@@ -79,7 +170,11 @@ class Cliente(BaseModel):
         return cls.query.filter_by(email=email).first()
     
     @classmethod
-    def search(cls, query_string):
+    def search(cls, query_string, ranked=False):
+        if ranked:
+            columns = (cls.nombre, cls.apellidos, cls.documento_identidad, cls.telefono, cls.email)
+            return ranked_search(cls.query, columns, query_string)
+        
         search_term = f"%{query_string}%"
         return cls.query.filter(
             db.or_(
@@ -1,8 +1,8 @@
 from app.extensions import db
-from app.models.base import BaseModel
-from sqlalchemy import Index, CheckConstraint
+from app.models.base import BaseModel, SerializerMixin, RowField, isoformat, float_or_none
+from sqlalchemy import Index, CheckConstraint, select
 
-class CategoriaProducto(db.Model):
+class CategoriaProducto(SerializerMixin, db.Model):
     __tablename__ = 'categorias_productos'
     
     categoria_id = db.Column('categoria_id', db.Integer, primary_key=True)
@@ -17,13 +17,15 @@ class CategoriaProducto(db.Model):
         Index('idx_categorias_nombre', 'nombre_categoria'),
     )
     
-    def to_dict(self):
-        return {
-            'categoria_id': self.categoria_id,
-            'nombre_categoria': self.nombre_categoria,
-            'descripcion': self.descripcion,
-            'activa': self.activa
-        }
+    __fields__ = {
+        'categoria_id': 'categoria_id',
+        'nombre_categoria': 'nombre_categoria',
+        'descripcion': 'descripcion',
+        'activa': 'activa'
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
 
 
 class Producto(BaseModel):
@@ -54,33 +56,49 @@ class Producto(BaseModel):
         Index('idx_productos_nombre', 'nombre'),
         Index('idx_productos_categoria', 'categoria_id'),
         Index('idx_productos_stock', 'stock_actual'),
+        Index('idx_productos_nombre_trgm', 'nombre', postgresql_using='gin',
+              postgresql_ops={'nombre': 'gin_trgm_ops'}),
+        Index('idx_productos_codigo_trgm', 'codigo_producto', postgresql_using='gin',
+              postgresql_ops={'codigo_producto': 'gin_trgm_ops'}),
+        Index('idx_productos_laboratorio_trgm', 'laboratorio', postgresql_using='gin',
+              postgresql_ops={'laboratorio': 'gin_trgm_ops'}),
     )
     
     @property
     def id(self):
         return self.producto_id
     
-    def to_dict(self):
-        return {
-            'producto_id': self.producto_id,
-            'categoria_id': self.categoria_id,
-            'categoria': self.categoria.nombre_categoria if self.categoria else None,
-            'codigo_producto': self.codigo_producto,
-            'nombre': self.nombre,
-            'descripcion': self.descripcion,
-            'laboratorio': self.laboratorio,
-            'unidad_medida': self.unidad_medida,
-            'precio_compra': float(self.precio_compra) if self.precio_compra else None,
-            'precio_venta': float(self.precio_venta),
-            'stock_actual': self.stock_actual,
-            'stock_minimo': self.stock_minimo,
-            'fecha_vencimiento': self.fecha_vencimiento.isoformat() if self.fecha_vencimiento else None,
-            'activo': self.activo,
-            'observaciones': self.observaciones
-        }
+    __fields__ = {
+        'producto_id': 'producto_id',
+        'categoria_id': 'categoria_id',
+        'categoria': lambda p: p.categoria.nombre_categoria if p.categoria else None,
+        'codigo_producto': 'codigo_producto',
+        'nombre': 'nombre',
+        'descripcion': 'descripcion',
+        'laboratorio': 'laboratorio',
+        'unidad_medida': 'unidad_medida',
+        'precio_compra': ('precio_compra', float_or_none),
+        'precio_venta': ('precio_venta', float),
+        'stock_actual': 'stock_actual',
+        'stock_minimo': 'stock_minimo',
+        'fecha_vencimiento': ('fecha_vencimiento', isoformat),
+        'activo': 'activo',
+        'observaciones': 'observaciones'
+    }
+    __field_columns__ = {
+        'categoria': ('categoria_id',)
+    }
+    __row_fields__ = {
+        'categoria': RowField(sql=lambda model: select(CategoriaProducto.nombre_categoria).where(
+            CategoriaProducto.categoria_id == model.categoria_id
+        ).scalar_subquery())
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
 
 
-class MovimientoInventario(db.Model):
+class MovimientoInventario(SerializerMixin, db.Model):
     __tablename__ = 'movimientos_inventario'
     
     movimiento_id = db.Column('movimiento_id', db.Integer, primary_key=True)
@@ -102,20 +120,27 @@ class MovimientoInventario(db.Model):
                         name='check_tipo_movimiento'),
         Index('idx_movimientos_producto', 'producto_id'),
         Index('idx_movimientos_fecha', 'fecha_movimiento'),
+        Index('idx_movimientos_fecha_id', 'fecha_movimiento', 'movimiento_id'),
         Index('idx_movimientos_tipo', 'tipo_movimiento'),
     )
     
-    def to_dict(self):
-        return {
-            'movimiento_id': self.movimiento_id,
-            'producto_id': self.producto_id,
-            'producto': self.producto.nombre if self.producto else None,
-            'tipo_movimiento': self.tipo_movimiento,
-            'cantidad': self.cantidad,
-            'precio_unitario': float(self.precio_unitario) if self.precio_unitario else None,
-            'fecha_movimiento': self.fecha_movimiento.isoformat(),
-            'motivo': self.motivo,
-            'documento_referencia': self.documento_referencia,
-            'usuario_id': self.usuario_id,
-            'usuario': self.usuario.username if self.usuario else None
-        }
+    __fields__ = {
+        'movimiento_id': 'movimiento_id',
+        'producto_id': 'producto_id',
+        'producto': lambda m: m.producto.nombre if m.producto else None,
+        'tipo_movimiento': 'tipo_movimiento',
+        'cantidad': 'cantidad',
+        'precio_unitario': ('precio_unitario', float_or_none),
+        'fecha_movimiento': ('fecha_movimiento', isoformat),
+        'motivo': 'motivo',
+        'documento_referencia': 'documento_referencia',
+        'usuario_id': 'usuario_id',
+        'usuario': lambda m: m.usuario.username if m.usuario else None
+    }
+    __field_columns__ = {
+        'producto': ('producto_id',),
+        'usuario': ('usuario_id',)
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
@@ -1,5 +1,5 @@
 from app.extensions import db
-from app.models.base import BaseModel
+from app.models.base import BaseModel, SerializerMixin, RowField, isoformat, float_or_none, wants_field
 from sqlalchemy import Index, CheckConstraint
 from datetime import datetime
 
@@ -33,20 +33,28 @@ class Veterinario(BaseModel):
     def nombre_completo(self):
         return f"Dr. {self.nombre} {self.apellidos}"
     
-    def to_dict(self):
-        return {
-            'id': self.veterinario_id,
-            'veterinario_id': self.veterinario_id,
-            'nombre': self.nombre,
-            'apellidos': self.apellidos,
-            'nombre_completo': self.nombre_completo,
-            'telefono': self.telefono,
-            'email': self.email,
-            'numero_tarjeta_profesional': self.numero_tarjeta_profesional,
-            'especialidad': self.especialidad,
-            'fecha_ingreso': self.fecha_ingreso.isoformat() if self.fecha_ingreso else None,
-            'activo': self.activo
-        }
+    __fields__ = {
+        'id': 'veterinario_id',
+        'veterinario_id': 'veterinario_id',
+        'nombre': 'nombre',
+        'apellidos': 'apellidos',
+        'nombre_completo': 'nombre_completo',
+        'telefono': 'telefono',
+        'email': 'email',
+        'numero_tarjeta_profesional': 'numero_tarjeta_profesional',
+        'especialidad': 'especialidad',
+        'fecha_ingreso': ('fecha_ingreso', isoformat),
+        'activo': 'activo'
+    }
+    __field_columns__ = {
+        'nombre_completo': ('nombre', 'apellidos')
+    }
+    __row_fields__ = {
+        'nombre_completo': RowField(('nombre', 'apellidos'), lambda nombre, apellidos: f"Dr. {nombre} {apellidos}")
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
     
     def __repr__(self):
         return f'<Veterinario {self.nombre_completo}>'
@@ -101,32 +109,39 @@ class HistoriaClinica(BaseModel):
     def consultas_recientes(self, limit=5):
         return self.consultas.limit(limit).all()
     
-    def to_dict(self, include_consultas=False):
-        data = {
-            'id': self.historia_id,
-            'historia_id': self.historia_id,
-            'mascota_id': self.mascota_id,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
-            'peso_inicial': float(self.peso_inicial) if self.peso_inicial else None,
-            'caracteristicas_especiales': self.caracteristicas_especiales,
-            'queja_principal': self.queja_principal,
-            'tratamientos_previos': self.tratamientos_previos,
-            'enfermedades_anteriores': self.enfermedades_anteriores,
-            'cirugias_anteriores': self.cirugias_anteriores,
-            'tipo_dieta': self.tipo_dieta,
-            'detalle_dieta': self.detalle_dieta,
-            'medicina_preventiva': self.medicina_preventiva,
-            'activa': self.activa,
-            'observaciones_generales': self.observaciones_generales,
-            'total_consultas': self.total_consultas
-        }
+    __fields__ = {
+        'id': 'historia_id',
+        'historia_id': 'historia_id',
+        'mascota_id': 'mascota_id',
+        'fecha_creacion': ('fecha_creacion', isoformat),
+        'peso_inicial': ('peso_inicial', float_or_none),
+        'caracteristicas_especiales': 'caracteristicas_especiales',
+        'queja_principal': 'queja_principal',
+        'tratamientos_previos': 'tratamientos_previos',
+        'enfermedades_anteriores': 'enfermedades_anteriores',
+        'cirugias_anteriores': 'cirugias_anteriores',
+        'tipo_dieta': 'tipo_dieta',
+        'detalle_dieta': 'detalle_dieta',
+        'medicina_preventiva': 'medicina_preventiva',
+        'activa': 'activa',
+        'observaciones_generales': 'observaciones_generales',
+        'total_consultas': 'total_consultas'
+    }
+    __field_columns__ = {
+        'mascota': ('mascota_id',)
+    }
+    
+    def to_dict(self, include_consultas=False, fields=None):
+        data = self.serialize_fields(fields)
         
         if include_consultas:
-            data['consultas'] = [c.to_dict() for c in self.consultas_recientes()]
-            if self.ultima_consulta:
+            if wants_field(fields, 'consultas'):
+                data['consultas'] = [c.to_dict() for c in self.consultas_recientes()]
+            if wants_field(fields, 'ultima_consulta') and self.ultima_consulta:
                 data['ultima_consulta'] = self.ultima_consulta.to_dict()
         
-        data['mascota'] = self.mascota.to_dict() if self.mascota else None
+        if wants_field(fields, 'mascota'):
+            data['mascota'] = self.mascota.to_dict() if self.mascota else None
         return data
     
     def __repr__(self):
@@ -207,45 +222,50 @@ class Consulta(BaseModel):
     def fecha_hora(self):
         return datetime.combine(self.fecha_consulta, self.hora_consulta)
     
-    def to_dict(self, include_relations=False):
-        data = {
-            'id': self.consulta_id,
-            'consulta_id': self.consulta_id,
-            'historia_id': self.historia_id,
-            'veterinario_id': self.veterinario_id,
-            'fecha_consulta': self.fecha_consulta.isoformat(),
-            'hora_consulta': self.hora_consulta.isoformat(),
-            'motivo_consulta': self.motivo_consulta,
-            'inspeccion_general': self.inspeccion_general,
-            'temperatura': float(self.temperatura) if self.temperatura else None,
-            'pulso': self.pulso,
-            'respiracion': self.respiracion,
-            'tiempo_llenado_capilar': float(self.tiempo_llenado_capilar) if self.tiempo_llenado_capilar else None,
-            'hidratacion': self.hidratacion,
-            'peso': float(self.peso) if self.peso else None,
-            'ganglios': self.ganglios,
-            'sistema_digestivo': self.sistema_digestivo,
-            'sistema_respiratorio': self.sistema_respiratorio,
-            'sistema_cardiovascular': self.sistema_cardiovascular,
-            'sistema_urinario': self.sistema_urinario,
-            'sistema_genital': self.sistema_genital,
-            'sistema_nervioso': self.sistema_nervioso,
-            'sistema_locomotor': self.sistema_locomotor,
-            'piel_anexos': self.piel_anexos,
-            'hallazgos': self.hallazgos,
-            'examenes_solicitados': self.examenes_solicitados,
-            'examenes_autorizados': self.examenes_autorizados,
-            'diagnostico': self.diagnostico,
-            'pronostico': self.pronostico,
-            'tratamiento_ideal': self.tratamiento_ideal,
-            'tratamiento_instaurado': self.tratamiento_instaurado,
-            'cotizacion_tratamiento': float(self.cotizacion_tratamiento) if self.cotizacion_tratamiento else None,
-            'observaciones': self.observaciones,
-            'proxima_cita': self.proxima_cita.isoformat() if self.proxima_cita else None,
-            'costo_consulta': float(self.costo_consulta) if self.costo_consulta else None
-        }
+    __fields__ = {
+        'id': 'consulta_id',
+        'consulta_id': 'consulta_id',
+        'historia_id': 'historia_id',
+        'veterinario_id': 'veterinario_id',
+        'fecha_consulta': ('fecha_consulta', isoformat),
+        'hora_consulta': ('hora_consulta', isoformat),
+        'motivo_consulta': 'motivo_consulta',
+        'inspeccion_general': 'inspeccion_general',
+        'temperatura': ('temperatura', float_or_none),
+        'pulso': 'pulso',
+        'respiracion': 'respiracion',
+        'tiempo_llenado_capilar': ('tiempo_llenado_capilar', float_or_none),
+        'hidratacion': 'hidratacion',
+        'peso': ('peso', float_or_none),
+        'ganglios': 'ganglios',
+        'sistema_digestivo': 'sistema_digestivo',
+        'sistema_respiratorio': 'sistema_respiratorio',
+        'sistema_cardiovascular': 'sistema_cardiovascular',
+        'sistema_urinario': 'sistema_urinario',
+        'sistema_genital': 'sistema_genital',
+        'sistema_nervioso': 'sistema_nervioso',
+        'sistema_locomotor': 'sistema_locomotor',
+        'piel_anexos': 'piel_anexos',
+        'hallazgos': 'hallazgos',
+        'examenes_solicitados': 'examenes_solicitados',
+        'examenes_autorizados': 'examenes_autorizados',
+        'diagnostico': 'diagnostico',
+        'pronostico': 'pronostico',
+        'tratamiento_ideal': 'tratamiento_ideal',
+        'tratamiento_instaurado': 'tratamiento_instaurado',
+        'cotizacion_tratamiento': ('cotizacion_tratamiento', float_or_none),
+        'observaciones': 'observaciones',
+        'proxima_cita': ('proxima_cita', isoformat),
+        'costo_consulta': ('costo_consulta', float_or_none)
+    }
+    __field_columns__ = {
+        'veterinario': ('veterinario_id',)
+    }
+    
+    def to_dict(self, include_relations=False, fields=None):
+        data = self.serialize_fields(fields)
         
-        if include_relations:
+        if include_relations and wants_field(fields, 'veterinario'):
             data['veterinario'] = self.veterinario.to_dict() if self.veterinario else None
         
         return data
@@ -272,18 +292,20 @@ class SeguimientoPaciente(BaseModel):
         Index('idx_seguimiento_fecha', 'fecha_seguimiento'),
     )
     
-    def to_dict(self):
-        return {
-            'seguimiento_id': self.seguimiento_id,
-            'consulta_id': self.consulta_id,
-            'fecha_seguimiento': self.fecha_seguimiento.isoformat(),
-            'hora_seguimiento': self.hora_seguimiento.isoformat() if self.hora_seguimiento else None,
-            'observaciones': self.observaciones,
-            'responsable': self.responsable
-        }
+    __fields__ = {
+        'seguimiento_id': 'seguimiento_id',
+        'consulta_id': 'consulta_id',
+        'fecha_seguimiento': ('fecha_seguimiento', isoformat),
+        'hora_seguimiento': ('hora_seguimiento', isoformat),
+        'observaciones': 'observaciones',
+        'responsable': 'responsable'
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
 
 
-class TipoServicio(db.Model):
+class TipoServicio(SerializerMixin, db.Model):
     __tablename__ = 'tipos_servicios'
     
     servicio_id = db.Column('servicio_id', db.Integer, primary_key=True)
@@ -299,18 +321,20 @@ class TipoServicio(db.Model):
         Index('idx_servicios_nombre', 'nombre_servicio'),
     )
     
-    def to_dict(self):
-        return {
-            'servicio_id': self.servicio_id,
-            'nombre_servicio': self.nombre_servicio,
-            'descripcion': self.descripcion,
-            'precio_base': float(self.precio_base) if self.precio_base else None,
-            'duracion_estimada': self.duracion_estimada,
-            'activo': self.activo
-        }
+    __fields__ = {
+        'servicio_id': 'servicio_id',
+        'nombre_servicio': 'nombre_servicio',
+        'descripcion': 'descripcion',
+        'precio_base': ('precio_base', float_or_none),
+        'duracion_estimada': 'duracion_estimada',
+        'activo': 'activo'
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
 
 
-class ServicioConsulta(db.Model):
+class ServicioConsulta(SerializerMixin, db.Model):
     __tablename__ = 'servicios_consulta'
     
     servicio_consulta_id = db.Column('servicio_consulta_id', db.Integer, primary_key=True)
@@ -327,12 +351,17 @@ class ServicioConsulta(db.Model):
         Index('idx_servicios_consulta', 'consulta_id'),
     )
     
-    def to_dict(self):
-        return {
-            'servicio_consulta_id': self.servicio_consulta_id,
-            'consulta_id': self.consulta_id,
-            'servicio_id': self.servicio_id,
-            'servicio': self.tipo_servicio.nombre_servicio if self.tipo_servicio else None,
-            'precio': float(self.precio),
-            'observaciones': self.observaciones
-        }
\ No newline at end of file
+    __fields__ = {
+        'servicio_consulta_id': 'servicio_consulta_id',
+        'consulta_id': 'consulta_id',
+        'servicio_id': 'servicio_id',
+        'servicio': lambda s: s.tipo_servicio.nombre_servicio if s.tipo_servicio else None,
+        'precio': ('precio', float),
+        'observaciones': 'observaciones'
+    }
+    __field_columns__ = {
+        'servicio': ('servicio_id',)
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
\ No newline at end of file
@@ -1,8 +1,43 @@
 from app.extensions import db
-from app.models.base import BaseModel
-from sqlalchemy import Index, CheckConstraint
+from app.models.base import BaseModel, RowField, isoformat, float_or_none, wants_field
+from app.utils.search import ranked_search
+from sqlalchemy import Index, CheckConstraint, select
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from functools import lru_cache
+
+@lru_cache(maxsize=4096)
+def _edad(hoy, fecha_nacimiento):
+    # relativedelta es costoso y en un listado se repiten pocas fechas por día
+    return relativedelta(hoy, fecha_nacimiento)
+
+def edad_texto(fecha_nacimiento):
+    """Edad legible ("3 años", "5 meses", "12 días") a partir de la fecha de nacimiento"""
+    if not fecha_nacimiento:
+        return None
+    
+    edad = _edad(datetime.now().date(), fecha_nacimiento)
+    
+    if edad.years > 0:
+        return f"{edad.years} año{'s' if edad.years > 1 else ''}"
+    elif edad.months > 0:
+        return f"{edad.months} mes{'es' if edad.months > 1 else ''}"
+    else:
+        return f"{edad.days} día{'s' if edad.days > 1 else ''}"
+
+def edad_en_meses(fecha_nacimiento):
+    """Edad en meses cumplidos"""
+    if not fecha_nacimiento:
+        return None
+    edad = _edad(datetime.now().date(), fecha_nacimiento)
+    return edad.years * 12 + edad.months
+
+def _historia_clinica_sql(model):
+    from app.models.medical import HistoriaClinica
+    
+    return select(HistoriaClinica.historia_id).where(
+        HistoriaClinica.mascota_id == model.mascota_id
+    ).scalar_subquery()
 
 class Mascota(BaseModel):
     __tablename__ = 'mascotas'
@@ -39,6 +74,10 @@ class Mascota(BaseModel):
         Index('idx_mascotas_cliente', 'cliente_id'),
         Index('idx_mascotas_nombre', 'nombre'),
         Index('idx_mascotas_microchip', 'microchip'),
+        Index('idx_mascotas_nombre_trgm', 'nombre', postgresql_using='gin',
+              postgresql_ops={'nombre': 'gin_trgm_ops'}),
+        Index('idx_mascotas_microchip_trgm', 'microchip', postgresql_using='gin',
+              postgresql_ops={'microchip': 'gin_trgm_ops'}),
     )
     
     @property
@@ -48,51 +87,50 @@ class Mascota(BaseModel):
     
     @property
     def edad(self):
-        if not self.fecha_nacimiento:
-            return None
-        
-        today = datetime.now().date()
-        edad = relativedelta(today, self.fecha_nacimiento)
-        
-        if edad.years > 0:
-            return f"{edad.years} año{'s' if edad.years > 1 else ''}"
-        elif edad.months > 0:
-            return f"{edad.months} mes{'es' if edad.months > 1 else ''}"
-        else:
-            return f"{edad.days} día{'s' if edad.days > 1 else ''}"
+        return edad_texto(self.fecha_nacimiento)
     
     @property
     def edad_meses(self):
-        if not self.fecha_nacimiento:
-            return None
-        today = datetime.now().date()
-        edad = relativedelta(today, self.fecha_nacimiento)
-        return edad.years * 12 + edad.months
+        return edad_en_meses(self.fecha_nacimiento)
     
-    def to_dict(self, include_relations=True):
-        data = {
-            'id': self.mascota_id,
-            'mascota_id': self.mascota_id,
-            'cliente_id': self.cliente_id,
-            'nombre': self.nombre,
-            'especie': self.especie,
-            'raza': self.raza,
-            'fecha_nacimiento': self.fecha_nacimiento.isoformat() if self.fecha_nacimiento else None,
-            'edad': self.edad,
-            'edad_meses': self.edad_meses,
-            'sexo': self.sexo,
-            'peso_actual': float(self.peso_actual) if self.peso_actual else None,
-            'color': self.color,
-            'microchip': self.microchip,
-            'esterilizado': self.esterilizado,
-            'fecha_registro': self.fecha_registro.isoformat() if self.fecha_registro else None,
-            'activo': self.activo,
-            'observaciones': self.observaciones
-        }
+    __fields__ = {
+        'id': 'mascota_id',
+        'mascota_id': 'mascota_id',
+        'cliente_id': 'cliente_id',
+        'nombre': 'nombre',
+        'especie': 'especie',
+        'raza': 'raza',
+        'fecha_nacimiento': ('fecha_nacimiento', isoformat),
+        'edad': 'edad',
+        'edad_meses': 'edad_meses',
+        'sexo': 'sexo',
+        'peso_actual': ('peso_actual', float_or_none),
+        'color': 'color',
+        'microchip': 'microchip',
+        'esterilizado': 'esterilizado',
+        'fecha_registro': ('fecha_registro', isoformat),
+        'activo': 'activo',
+        'observaciones': 'observaciones'
+    }
+    __field_columns__ = {
+        'edad': ('fecha_nacimiento',),
+        'edad_meses': ('fecha_nacimiento',),
+        'propietario': ('cliente_id',)
+    }
+    __row_fields__ = {
+        'edad': RowField(('fecha_nacimiento',), edad_texto),
+        'edad_meses': RowField(('fecha_nacimiento',), edad_en_meses),
+        'propietario': RowField(relation='propietario'),
+        'historia_clinica_id': RowField(sql=_historia_clinica_sql, omit_none=True)
+    }
+    
+    def to_dict(self, include_relations=True, fields=None):
+        data = self.serialize_fields(fields)
         
         if include_relations:
-            data['propietario'] = self.propietario.to_dict()
-            if self.historia_clinica:
+            if wants_field(fields, 'propietario'):
+                data['propietario'] = self.propietario.to_dict()
+            if wants_field(fields, 'historia_clinica_id') and self.historia_clinica:
                 data['historia_clinica_id'] = self.historia_clinica.historia_id
         
         return data
@@ -102,7 +140,10 @@ class Mascota(BaseModel):
         return cls.query.filter_by(microchip=microchip).first()
     
     @classmethod
-    def search(cls, query_string):
+    def search(cls, query_string, ranked=False):
+        if ranked:
+            return ranked_search(cls.query, (cls.nombre, cls.microchip), query_string)
+        
         search_term = f"%{query_string}%"
         return cls.query.filter(
             db.or_(
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
-from app.extensions import db, bcrypt
+from app.extensions import db, password_hasher, user_cache
 from app.models.base import BaseModel, TimestampMixin
+from flask import current_app
 from flask_jwt_extended import create_access_token, create_refresh_token
-from sqlalchemy import Index, CheckConstraint
+from sqlalchemy import Index, CheckConstraint, inspect, update
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
 from enum import Enum
 import traceback
 
@@ -12,6 +16,9 @@ class UserRole(Enum):
     ASISTENTE = "Asistente"        
     RECEPCIONISTA = "Recepcionista"
 
+# Columnas de las que depende la autorización: su cambio descarta la copia en caché
+COLUMNAS_SENSIBLES = ('rol', 'activo', 'password_hash')
+
 class User(BaseModel):
     __tablename__ = 'usuarios'
     
@@ -32,7 +39,7 @@ class User(BaseModel):
     ultimo_acceso = db.Column(db.DateTime)
     
     movimientos = db.relationship('MovimientoInventario', back_populates='usuario', lazy='dynamic')
-
+    
     __table_args__ = (
         CheckConstraint("rol IN ('Administrador', 'Veterinario', 'Asistente', 'Recepcionista')", 
                        name='check_rol'),
@@ -46,17 +53,29 @@ class User(BaseModel):
         return self.usuario_id
     
     def __init__(self, **kwargs):
+        password = kwargs.pop('password', None)
         super(User, self).__init__(**kwargs)
-        if 'password' in kwargs:
-            self.set_password(kwargs['password'])
+        if password is not None:
+            self.set_password(password)
     
     def set_password(self, password):
         """Encriptar y establecer la contraseña"""
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.generate(password)
     
     def check_password(self, password):
-        """Verificar la contraseña"""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        """Verificar la contraseña (rehace el hash si cambió el costo configurado)"""
+        if not password_hasher.check(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            # Se persiste con el siguiente commit (p. ej. ultimo_acceso en el login).
+            # Es opcional: si falla (cola llena, timeout) el login sigue siendo válido
+            try:
+                self.set_password(password)
+            except Exception as e:
+                current_app.logger.warning('No se pudo rehacer el hash del usuario %s: %s', self.usuario_id, e)
+            else:
+                password_hasher.record_rehash()
+        return True
     
     def generate_tokens(self):
         """Generar tokens JWT"""
@@ -94,6 +113,78 @@ class User(BaseModel):
             required_roles = [required_roles]
         return self.rol in required_roles
     
+    def _cambio_sensible(self):
+        estado = inspect(self)
+        return any(estado.attrs[columna].history.has_changes() for columna in COLUMNAS_SENSIBLES)
+    
+    def save(self):
+        invalidar = self._cambio_sensible()
+        super().save()
+        if invalidar:
+            user_cache.delete(self.usuario_id)
+        return self
+    
+    def update(self, **kwargs):
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+        invalidar = self._cambio_sensible()
+        super().update()
+        if invalidar:
+            user_cache.delete(self.usuario_id)
+        elif user_cache.get(self.usuario_id) is not None:
+            # Datos de perfil: se reemplaza la copia en lugar de descartarla
+            user_cache.set(self.usuario_id, self.detached_copy())
+        return self
+    
+    def registrar_acceso(self, momento=None):
+        """Guardar ``ultimo_acceso`` y hacer commit.
+        
+        Se escribe con un UPDATE directo sobre la conexión: no descarta la
+        copia en caché ni incrementa la versión de ``usuarios`` de los ETags.
+        Un rehash pendiente de ``check_password`` se guarda en el mismo commit.
+        """
+        momento = momento or datetime.utcnow()
+        invalidar = self._cambio_sensible()
+        tabla = self.__table__
+        db.session.connection().execute(
+            update(tabla).where(tabla.c.usuario_id == self.usuario_id).values(ultimo_acceso=momento)
+        )
+        set_committed_value(self, 'ultimo_acceso', momento)
+        db.session.commit()
+        if invalidar:
+            user_cache.delete(self.usuario_id)
+        return self
+    
+    def detached_copy(self):
+        """Copia desligada de la sesión, apta para guardarse en caché"""
+        copy = self.__class__.__mapper__.class_manager.new_instance()
+        for attr in self.__class__.__mapper__.column_attrs:
+            setattr(copy, attr.key, getattr(self, attr.key))
+        make_transient_to_detached(copy)
+        return copy
+    
+    @classmethod
+    def get_cached(cls, usuario_id):
+        """Obtener un usuario activo usando la caché por usuario_id.
+        
+        Los usuarios inactivos o inexistentes no se guardan en caché.
+        """
+        try:
+            usuario_id = int(usuario_id)
+        except (TypeError, ValueError):
+            return None
+        
+        cached = user_cache.get(usuario_id)
+        if cached is not None:
+            # load=False: se asocia a la sesión actual sin consultar la base de datos
+            return db.session.merge(cached, load=False)
+        
+        user = db.session.get(cls, usuario_id)
+        if user is not None and user.activo:
+            user_cache.set(usuario_id, user.detached_copy())
+        return user
+    
     @classmethod
     def find_by_username(cls, username):
         try:
@@ -1,7 +1,8 @@
 from app.extensions import db
+from app.models.base import SerializerMixin, isoformat, float_or_none, wants_field
 from sqlalchemy import Index
 
-class VacunaCatalogo(db.Model):
+class VacunaCatalogo(SerializerMixin, db.Model):
     __tablename__ = 'vacunas_catalogo'
     
     vacuna_id = db.Column('vacuna_id', db.Integer, primary_key=True)
@@ -18,19 +19,21 @@ class VacunaCatalogo(db.Model):
         Index('idx_vacunas_nombre', 'nombre_vacuna'),
     )
     
-    def to_dict(self):
-        return {
-            'vacuna_id': self.vacuna_id,
-            'nombre_vacuna': self.nombre_vacuna,
-            'laboratorio': self.laboratorio,
-            'descripcion': self.descripcion,
-            'meses_vigencia': self.meses_vigencia,
-            'precio': float(self.precio) if self.precio else None,
-            'activa': self.activa
-        }
+    __fields__ = {
+        'vacuna_id': 'vacuna_id',
+        'nombre_vacuna': 'nombre_vacuna',
+        'laboratorio': 'laboratorio',
+        'descripcion': 'descripcion',
+        'meses_vigencia': 'meses_vigencia',
+        'precio': ('precio', float_or_none),
+        'activa': 'activa'
+    }
+    
+    def to_dict(self, fields=None):
+        return self.serialize_fields(fields)
 
 
-class Vacunacion(db.Model):
+class Vacunacion(SerializerMixin, db.Model):
     __tablename__ = 'vacunaciones'
     
     vacunacion_id = db.Column('vacunacion_id', db.Integer, primary_key=True)
@@ -56,21 +59,29 @@ class Vacunacion(db.Model):
         Index('idx_vacunaciones_vencimiento', 'fecha_vencimiento'),
     )
     
-    def to_dict(self, include_relations=False):
-        data = {
-            'vacunacion_id': self.vacunacion_id,
-            'mascota_id': self.mascota_id,
-            'veterinario_id': self.veterinario_id,
-            'vacuna_id': self.vacuna_id,
-            'fecha_aplicacion': self.fecha_aplicacion.isoformat(),
-            'fecha_vencimiento': self.fecha_vencimiento.isoformat() if self.fecha_vencimiento else None,
-            'lote': self.lote,
-            'observaciones': self.observaciones,
-            'costo': float(self.costo) if self.costo else None
-        }
+    __fields__ = {
+        'vacunacion_id': 'vacunacion_id',
+        'mascota_id': 'mascota_id',
+        'veterinario_id': 'veterinario_id',
+        'vacuna_id': 'vacuna_id',
+        'fecha_aplicacion': ('fecha_aplicacion', isoformat),
+        'fecha_vencimiento': ('fecha_vencimiento', isoformat),
+        'lote': 'lote',
+        'observaciones': 'observaciones',
+        'costo': ('costo', float_or_none)
+    }
+    __field_columns__ = {
+        'vacuna': ('vacuna_id',),
+        'veterinario': ('veterinario_id',)
+    }
+    
+    def to_dict(self, include_relations=False, fields=None):
+        data = self.serialize_fields(fields)
         
         if include_relations:
-            data['vacuna'] = self.vacuna_catalogo.to_dict() if self.vacuna_catalogo else None
-            data['veterinario'] = self.veterinario.to_dict() if self.veterinario else None
+            if wants_field(fields, 'vacuna'):
+                data['vacuna'] = self.vacuna_catalogo.to_dict() if self.vacuna_catalogo else None
+            if wants_field(fields, 'veterinario'):
+                data['veterinario'] = self.veterinario.to_dict() if self.veterinario else None
         
         return data
\ No newline at end of file
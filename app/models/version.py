@@ -0,0 +1,62 @@
+from app.extensions import db
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+class VersionTabla(db.Model):
+    """Versión de cada tabla, incrementada después de cada commit que la modifica.
+    
+    Permite calcular ETags (``app.utils.etag``) sin leer ni serializar los datos.
+    """
+    __tablename__ = 'versiones_tablas'
+    
+    tabla = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    @classmethod
+    def incrementar(cls, tablas):
+        """Incrementar la versión de ``tablas`` en una transacción corta y propia.
+        
+        Se llama después del commit de los datos, así que las filas de versión
+        no quedan bloqueadas durante la transacción que los modifica. Una fila
+        bloqueada por otro incremento en curso se omite (``SKIP LOCKED``): ese
+        incremento confirma después de nuestros datos y cambia la versión igual.
+        """
+        tablas = sorted(tablas)
+        with db.engine.begin() as conn:
+            existentes = set(conn.scalars(select(cls.tabla).where(cls.tabla.in_(tablas))))
+            faltan = [tabla for tabla in tablas if tabla not in existentes]
+            if faltan:
+                cls._crear(conn, faltan)
+            bloqueadas = select(cls.tabla).where(cls.tabla.in_(tablas)).with_for_update(skip_locked=True)
+            conn.execute(
+                update(cls).where(cls.tabla.in_(bloqueadas)).values(version=cls.version + 1)
+            )
+    
+    @classmethod
+    def _crear(cls, conn, tablas):
+        filas = [{'tabla': tabla, 'version': 0} for tabla in tablas]
+        dialecto = conn.dialect.name
+        if dialecto in ('postgresql', 'sqlite'):
+            insertar = (postgresql_insert if dialecto == 'postgresql' else sqlite_insert)(cls)
+            # Otra transacción pudo crear la fila al mismo tiempo
+            conn.execute(insertar.on_conflict_do_nothing(), filas)
+            return
+        for fila in filas:
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(cls), fila)
+            except IntegrityError:
+                pass
+    
+    @classmethod
+    def obtener(cls, tablas):
+        """Versiones actuales de ``tablas``, en el mismo orden (0 si nunca se modificaron)"""
+        versiones = dict(
+            db.session.query(cls.tabla, cls.version).filter(cls.tabla.in_(tablas)).all()
+        )
+        return tuple(versiones.get(tabla, 0) for tabla in tablas)
+    
+    def __repr__(self):
+        return f'<VersionTabla {self.tabla} {self.version}>'
\ No newline at end of file
@@ -1,5 +1,6 @@
-from marshmallow import Schema, fields, validate, validates, ValidationError
+from marshmallow import Schema, fields, validate, validates, validates_schema, ValidationError
 from datetime import datetime, time
+from app.models.appointment import Cita
 
 class CitaSchema(Schema):
     cita_id = fields.Int(dump_only=True)
@@ -8,6 +9,8 @@ class CitaSchema(Schema):
     veterinario_id = fields.Int(allow_none=True)
     fecha_cita = fields.Date(required=True)
     hora_cita = fields.Time(required=True)
+    servicio_id = fields.Int(allow_none=True)
+    duracion = fields.Int(validate=validate.Range(min=1, max=Cita.DURACION_MAXIMA))
     motivo = fields.Str(required=True, validate=validate.Length(min=5, max=255))
     estado = fields.Str(missing='Programada', validate=validate.OneOf([
         'Programada', 'Confirmada', 'En curso', 'Completada', 'Cancelada', 'No asistió'
@@ -24,9 +27,34 @@ class CitaUpdateSchema(Schema):
     veterinario_id = fields.Int(allow_none=True)
     fecha_cita = fields.Date()
     hora_cita = fields.Time()
+    servicio_id = fields.Int(allow_none=True)
+    duracion = fields.Int(validate=validate.Range(min=1, max=Cita.DURACION_MAXIMA))
     motivo = fields.Str(validate=validate.Length(min=5, max=255))
     estado = fields.Str(validate=validate.OneOf([
         'Programada', 'Confirmada', 'En curso', 'Completada', 'Cancelada', 'No asistió'
     ]))
     observaciones = fields.Str(allow_none=True)
-    activa = fields.Bool()
\ No newline at end of file
+    activa = fields.Bool()
+
+# Citas por serie (POST /api/appointments/serie)
+MAX_CITAS_SERIE = 52
+
+class CitaSerieSchema(CitaSchema):
+    """Serie de citas iguales: desde ``fecha_cita`` cada ``intervalo`` ``unidad``
+    durante ``repeticiones`` ocurrencias, o en las ``fechas`` indicadas"""
+    fecha_cita = fields.Date()
+    repeticiones = fields.Int(validate=validate.Range(min=1, max=MAX_CITAS_SERIE))
+    intervalo = fields.Int(missing=1, validate=validate.Range(min=1, max=MAX_CITAS_SERIE))
+    unidad = fields.Str(missing='semanas', validate=validate.OneOf(['dias', 'semanas', 'meses']))
+    fechas = fields.List(fields.Date(), validate=validate.Length(min=1, max=MAX_CITAS_SERIE))
+    parcial = fields.Bool(missing=False)
+    
+    @validates('fechas')
+    def validate_fechas(self, value):
+        if min(value) < datetime.now().date():
+            raise ValidationError('Las fechas de las citas no pueden ser en el pasado')
+    
+    @validates_schema
+    def validate_serie(self, data, **kwargs):
+        if not data.get('fechas') and not (data.get('fecha_cita') and data.get('repeticiones')):
+            raise ValidationError('Indique fechas, o fecha_cita y repeticiones')
\ No newline at end of file
@@ -30,6 +30,7 @@ class FacturaSchema(Schema):
         'Pagada', 'Pendiente', 'Anulada'
     ]))
     observaciones = fields.Str(allow_none=True)
+    serie = fields.Str(missing='FAC', validate=validate.Length(max=10))
     detalles = fields.List(fields.Nested(DetalleFacturaSchema), required=True)
     
     subtotal = fields.Decimal(places=2, dump_only=True)
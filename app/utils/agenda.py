@@ -0,0 +1,175 @@
+import time
+from datetime import timedelta
+from hashlib import sha1
+from secrets import token_hex
+from flask import current_app, g, request
+
+from app.extensions import agenda_cache
+from app.models.appointment import Cita
+from app.utils.etag import aplicar_etag, al_confirmar
+
+# Tablas de las relaciones anidadas en cada cita (cliente, mascota con su
+# propietario e historia, veterinario): si cambian, la agenda se descarta
+TABLAS_RELACIONADAS = frozenset(('clientes', 'mascotas', 'veterinarios', 'historias_clinicas'))
+
+# Vida máxima del candado de un día: si su dueño muere, expira y otro lo toma
+TTL_CANDADO = 2  # segundos
+
+def init_app(app):
+    """Configurar la agenda y descartarla cuando cambien los datos anidados"""
+    agenda_cache.configure(
+        maxsize=app.config['AGENDA_CACHE_MAXSIZE'],
+        ttl=app.config['AGENDA_CACHE_TTL']
+    )
+    al_confirmar(_invalidar)
+
+def _invalidar(tablas):
+    if not TABLAS_RELACIONADAS.isdisjoint(tablas):
+        agenda_cache.clear()
+
+def _entrada(citas, version=None):
+    # Cada cambio lleva una versión nueva: de ella sale el ETag de las respuestas
+    return {'version': version or token_hex(8), 'citas': citas}
+
+def _generacion(llave):
+    """Llave de la generación del día: la ``version`` que debe tener su entrada vigente"""
+    return ('generacion', llave)
+
+def _vigente(entrada, generacion):
+    return entrada is not None and generacion is not None and entrada['version'] == generacion
+
+def _generacion_actual(llave):
+    """Generación del día, creándola si no existe"""
+    generacion = agenda_cache.get(_generacion(llave))
+    if generacion is None:
+        agenda_cache.add(_generacion(llave), token_hex(8))
+        generacion = agenda_cache.get(_generacion(llave))
+    return generacion
+
+def _orden(cita):
+    return cita['hora_cita'], cita['cita_id']
+
+def _serializar(query):
+    """Citas completas (con relaciones anidadas, igual que ``to_dict()``) de ``query``"""
+    serializer = Cita.row_serializer(None)
+    filas = serializer.select(query).order_by(
+        Cita.fecha_cita, Cita.hora_cita, Cita.cita_id
+    ).all()
+    return serializer.serialize_many(filas)
+
+def dias(fecha_desde, fecha_hasta):
+    """Agenda de cada día del rango: ``[(fecha, entrada)]``.
+    
+    Los días que no están en la caché se arman con una sola consulta; el
+    resto no toca la base de datos. Cada entrada tiene las citas activas del
+    día ordenadas por hora (``citas``) y su ``version``.
+    
+    Una entrada solo es vigente si su ``version`` es la generación actual del
+    día. La generación se lee antes de consultar y se guarda como versión de
+    lo armado: si ``actualizar`` la cambia mientras tanto (la cita se confirmó
+    después de la consulta), lo guardado aquí ya no se usa.
+    """
+    fechas = [fecha_desde + timedelta(days=i) for i in range((fecha_hasta - fecha_desde).days + 1)]
+    llaves = [fecha.isoformat() for fecha in fechas]
+    entradas = agenda_cache.get_many(llaves)
+    generaciones = agenda_cache.get_many([_generacion(llave) for llave in llaves])
+    resultado = {
+        llave: entrada
+        for llave, entrada, generacion in zip(llaves, entradas, generaciones)
+        if _vigente(entrada, generacion)
+    }
+    faltan = [fecha for fecha, llave in zip(fechas, llaves) if llave not in resultado]
+    
+    if faltan:
+        leidas = {fecha.isoformat(): _generacion_actual(fecha.isoformat()) for fecha in faltan}
+        nuevas = {llave: [] for llave in leidas}
+        query = Cita.query.filter(Cita.fecha_cita.in_(faltan), Cita.activa == True)
+        for cita in _serializar(query):
+            nuevas[cita['fecha_cita']].append(cita)
+        for llave, generacion in leidas.items():
+            entrada = _entrada(nuevas[llave], generacion)
+            agenda_cache.set(llave, entrada)
+            resultado[llave] = entrada
+    
+    return [(fecha, resultado[llave]) for fecha, llave in zip(fechas, llaves)]
+
+def _modificar(llave, cambio):
+    """Aplicar ``cambio(citas) -> citas`` al día ``llave`` y renovar su generación.
+    
+    La generación cambia aunque el día no esté en la caché, para que una
+    lectura en curso no guarde como vigente una agenda anterior al cambio.
+    La lectura y escritura se hacen con un candado por día (``add`` atómico
+    del backend) para no perder cambios simultáneos de otros workers; el
+    candado expira a los ``TTL_CANDADO`` segundos si su dueño no lo libera.
+    """
+    candado = ('candado', llave)
+    while not agenda_cache.add(candado, True, ttl=TTL_CANDADO):
+        time.sleep(0.005)
+    try:
+        entrada = agenda_cache.get(llave)
+        if _vigente(entrada, agenda_cache.get(_generacion(llave))):
+            nueva = _entrada(cambio(entrada['citas']))
+            agenda_cache.set(_generacion(llave), nueva['version'])
+            agenda_cache.set(llave, nueva)
+        else:
+            agenda_cache.set(_generacion(llave), token_hex(8))
+            agenda_cache.delete(llave)
+    finally:
+        agenda_cache.delete(candado)
+
+def actualizar(cita_ids, fechas_anteriores=()):
+    """Reflejar en la agenda las citas ``cita_ids`` ya confirmadas en la base de datos.
+    
+    ``fechas_anteriores`` son los días donde estaban antes (si cambiaron de
+    fecha). Las citas se releen con una consulta; los días en la caché se
+    corrigen en el lugar y los demás solo cambian de generación (se arman
+    completos cuando se pidan).
+    """
+    cita_ids = set(cita_ids)
+    afectados = {fecha.isoformat() for fecha in fechas_anteriores}
+    por_dia = {}
+    for cita in _serializar(Cita.query.filter(Cita.cita_id.in_(cita_ids))):
+        afectados.add(cita['fecha_cita'])
+        if cita['activa']:
+            por_dia.setdefault(cita['fecha_cita'], []).append(cita)
+    
+    for llave in afectados:
+        def cambio(actuales, nuevas=por_dia.get(llave, [])):
+            citas = [c for c in actuales if c['cita_id'] not in cita_ids] + nuevas
+            return sorted(citas, key=_orden)
+        _modificar(llave, cambio)
+
+def refrescar(cita_ids, fechas_anteriores=()):
+    """``actualizar`` para las rutas, después de su commit: un error de la caché no falla la petición.
+    
+    Si la agenda no se puede corregir se descarta completa; si tampoco se
+    puede (backend caído), las entradas anteriores expiran con su TTL.
+    """
+    try:
+        actualizar(cita_ids, fechas_anteriores)
+    except Exception:
+        current_app.logger.exception('No se pudo actualizar la agenda de las citas %s', sorted(cita_ids))
+        try:
+            agenda_cache.clear()
+        except Exception:
+            current_app.logger.exception('No se pudo descartar la agenda')
+
+def no_modificada(entradas):
+    """ETag de la petición según las versiones de ``entradas``; 304 si el cliente ya lo tiene"""
+    huella = (request.full_path, tuple(entrada['version'] for _, entrada in entradas))
+    g.etag = sha1(repr(huella).encode('utf-8')).hexdigest()[:20]
+    if request.if_none_match.contains_weak(g.etag):
+        return aplicar_etag(current_app.response_class(status=304))
+    return None
+
+def citas(entradas, veterinario_id=None, estados=None, fields=None):
+    """Citas de ``entradas`` en orden, filtradas y con solo los campos ``fields``"""
+    resultado = []
+    for _, entrada in entradas:
+        for cita in entrada['citas']:
+            if veterinario_id is not None and cita['veterinario_id'] != veterinario_id:
+                continue
+            if estados is not None and cita['estado'] not in estados:
+                continue
+            resultado.append(cita if fields is None else {k: v for k, v in cita.items() if k in fields})
+    return resultado
\ No newline at end of file
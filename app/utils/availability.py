@@ -0,0 +1,130 @@
+from datetime import time, timedelta
+from flask import current_app
+
+from app.extensions import db
+from app.models.appointment import Cita
+from app.models.medical import Veterinario
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+class Grilla:
+    """Horarios de atención de un día: de ``inicio`` a ``fin`` cada ``intervalo`` minutos.
+    
+    La ocupación de un veterinario en un día es un entero usado como mapa de
+    bits: el bit ``i`` encendido indica que el horario ``i`` está ocupado.
+    """
+    
+    def __init__(self, inicio=time(8, 0), fin=time(18, 0), intervalo=30):
+        self.inicio = _minutos(inicio)
+        self.intervalo = intervalo
+        self.horarios = [
+            time(m // 60, m % 60) for m in range(self.inicio, _minutos(fin), intervalo)
+        ]
+        self.completo = (1 << len(self.horarios)) - 1
+    
+    @classmethod
+    def desde_config(cls):
+        """Grilla de ``AGENDA_HORA_INICIO``, ``AGENDA_HORA_FIN`` y ``AGENDA_INTERVALO``"""
+        config = current_app.config
+        return cls(
+            time.fromisoformat(config.get('AGENDA_HORA_INICIO', '08:00')),
+            time.fromisoformat(config.get('AGENDA_HORA_FIN', '18:00')),
+            config.get('AGENDA_INTERVALO', 30)
+        )
+    
+    def bits(self, hora, duracion):
+        """Mapa de bits de los horarios que se solapan con [hora, hora + duracion)"""
+        inicio = _minutos(hora) - self.inicio
+        primero = max(inicio // self.intervalo, 0)
+        ultimo = min(-(-(inicio + duracion) // self.intervalo), len(self.horarios))
+        if ultimo <= primero:
+            return 0
+        return ((1 << (ultimo - primero)) - 1) << primero
+    
+    def primer_horario(self, desde):
+        """Índice del primer horario que empieza a la hora ``desde`` o después"""
+        segundos = _minutos(desde) * 60 + desde.second - self.inicio * 60
+        return max(-(-segundos // (self.intervalo * 60)), 0)
+    
+    def libres(self, ocupado, desde=None):
+        """Índices de los horarios libres, opcionalmente a partir de la hora ``desde``"""
+        libre = self.completo & ~ocupado
+        if desde is not None:
+            libre &= ~((1 << self.primer_horario(desde)) - 1)
+        indices = []
+        while libre:
+            bit = libre & -libre
+            indices.append(bit.bit_length() - 1)
+            libre ^= bit
+        return indices
+    
+    def texto(self, indices):
+        return [self.horarios[i].strftime('%H:%M') for i in indices]
+
+def veterinarios_activos():
+    """IDs de los veterinarios activos, en orden"""
+    return [v for v, in db.session.query(Veterinario.veterinario_id).filter_by(activo=True)
+            .order_by(Veterinario.veterinario_id)]
+
+def citas_ocupadas(fecha_desde, fecha_hasta, veterinario_ids=None):
+    """Consulta de (veterinario_id, fecha, hora, duracion) de las citas que ocupan horario en el rango"""
+    query = db.session.query(Cita.veterinario_id, Cita.fecha_cita, Cita.hora_cita, Cita.duracion).filter(
+        Cita.fecha_cita.between(fecha_desde, fecha_hasta),
+        Cita.estado.in_(Cita.ESTADOS_OCUPAN),
+        Cita.activa == True
+    )
+    if veterinario_ids is not None:
+        query = query.filter(Cita.veterinario_id.in_(veterinario_ids))
+    # Orden del índice (fecha_cita, hora_cita)
+    return query.order_by(Cita.fecha_cita, Cita.hora_cita)
+
+def ocupacion(grilla, filas):
+    """Mapas de bits ``{(veterinario_id, fecha): ocupado}`` a partir de las filas de ``citas_ocupadas``"""
+    mapas = {}
+    for veterinario_id, fecha, hora, duracion in filas:
+        llave = (veterinario_id, fecha)
+        mapas[llave] = mapas.get(llave, 0) | grilla.bits(hora, duracion)
+    return mapas
+
+def _dias(fecha_desde, fecha_hasta):
+    fecha = fecha_desde
+    while fecha <= fecha_hasta:
+        yield fecha
+        fecha += timedelta(days=1)
+
+def disponibilidad(grilla, fecha_desde, fecha_hasta, veterinario_ids):
+    """Horarios libres de cada veterinario en cada día del rango (una consulta).
+    
+    Devuelve ``{veterinario_id: {fecha: [índices libres]}}``.
+    """
+    mapas = ocupacion(grilla, citas_ocupadas(fecha_desde, fecha_hasta, veterinario_ids))
+    return {
+        veterinario_id: {
+            fecha: grilla.libres(mapas.get((veterinario_id, fecha), 0))
+            for fecha in _dias(fecha_desde, fecha_hasta)
+        }
+        for veterinario_id in veterinario_ids
+    }
+
+def proximos_libres(grilla, desde, hasta, veterinario_ids, n):
+    """Los ``n`` primeros horarios libres desde ``desde`` (datetime) hasta la fecha ``hasta``.
+    
+    Recorre los días y horarios en orden y, en cada horario, los veterinarios
+    en el orden dado. Devuelve ``[(fecha, hora, veterinario_id)]``.
+    """
+    mapas = ocupacion(grilla, citas_ocupadas(desde.date(), hasta, veterinario_ids))
+    resultado = []
+    for fecha in _dias(desde.date(), hasta):
+        inicio = desde.time() if fecha == desde.date() else None
+        libres = [
+            (veterinario_id, set(grilla.libres(mapas.get((veterinario_id, fecha), 0), inicio)))
+            for veterinario_id in veterinario_ids
+        ]
+        for i, hora in enumerate(grilla.horarios):
+            for veterinario_id, indices in libres:
+                if i in indices:
+                    resultado.append((fecha, hora, veterinario_id))
+                    if len(resultado) >= n:
+                        return resultado
+    return resultado
\ No newline at end of file
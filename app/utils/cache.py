@@ -0,0 +1,296 @@
+from collections import OrderedDict
+from secrets import token_hex
+from threading import Lock
+import time
+
+_MISSING = object()
+
+class TTLCache:
+    """Caché en memoria del proceso con expiración (TTL), desalojo LRU y contadores.
+    
+    Con ``sizeof`` (tamaño en bytes de cada valor) y ``maxbytes`` el desalojo
+    también mantiene el total por debajo de ese límite.
+    """
+    
+    def __init__(self, maxsize=1024, ttl=60, maxbytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def configure(self, maxsize=None, ttl=None, maxbytes=None):
+        """Ajustar tamaño máximo y TTL (p. ej. desde la configuración de la app)"""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            if maxbytes is not None:
+                self.maxbytes = maxbytes
+            self._evict()
+    
+    def _over_limit(self):
+        if len(self._data) > self.maxsize:
+            return True
+        return self.maxbytes is not None and self.bytes > self.maxbytes
+    
+    def _evict(self):
+        while self._data and self._over_limit():
+            _, entry = self._data.popitem(last=False)
+            self.bytes -= entry[2]
+            self.evictions += 1
+    
+    def _remove(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+    
+    def get(self, key, default=None):
+        """Obtener un valor vigente; cuenta aciertos y fallos"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not _MISSING:
+                self._remove(key)
+            self.misses += 1
+            return default
+    
+    def _store(self, key, value, expires, size):
+        # Llamar con self._lock tomado
+        self._remove(key)
+        if self.maxbytes is not None and size > self.maxbytes:
+            # No cabe: guardarlo desalojaría todo lo demás
+            return
+        self._data[key] = (value, expires, size)
+        self.bytes += size
+        self._evict()
+    
+    def set(self, key, value, ttl=None):
+        """Guardar un valor con el TTL por defecto o uno propio"""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self.sizeof(value) if self.sizeof else 0
+        with self._lock:
+            self._store(key, value, expires, size)
+    
+    def add(self, key, value, ttl=None):
+        """Guardar un valor solo si no hay uno vigente; indica si se guardó.
+        
+        La comprobación y el guardado ocurren con el mismo candado: de varias
+        llamadas simultáneas solo una guarda.
+        """
+        now = time.monotonic()
+        expires = now + (self.ttl if ttl is None else ttl)
+        size = self.sizeof(value) if self.sizeof else 0
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] > now:
+                return False
+            self._store(key, value, expires, size)
+            return True
+    
+    def delete(self, key):
+        """Invalidar una llave"""
+        with self._lock:
+            self._remove(key)
+    
+    def clear(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def stats(self):
+        """Contadores de uso"""
+        with self._lock:
+            total = self.hits + self.misses
+            stats = {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else None
+            }
+            if self.sizeof is not None:
+                stats['bytes'] = self.bytes
+                stats['maxbytes'] = self.maxbytes
+            return stats
+
+class Cache:
+    """Espacio de nombres de caché sobre un backend (ver ``cache_backends``).
+    
+    Mantiene la interfaz de ``TTLCache``; los contadores de aciertos y
+    fallos son del proceso, el contenido es el del backend.
+    """
+    
+    def __init__(self, namespace, backend, maxsize=1024, ttl=60, maxbytes=None, sizeof=None):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bind(backend)
+    
+    def bind(self, backend):
+        """Usar ``backend`` (p. ej. el elegido en ``CACHE_BACKEND``)"""
+        self.backend = backend
+        backend.configure(self.namespace, self.maxsize, self.maxbytes, self.sizeof)
+    
+    def configure(self, maxsize=None, ttl=None, maxbytes=None):
+        """Ajustar tamaño máximo y TTL (p. ej. desde la configuración de la app)"""
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if ttl is not None:
+            self.ttl = ttl
+        if maxbytes is not None:
+            self.maxbytes = maxbytes
+        self.backend.configure(self.namespace, self.maxsize, self.maxbytes, self.sizeof)
+    
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+    
+    def get(self, key, default=None):
+        """Obtener un valor vigente; cuenta aciertos y fallos"""
+        value = self.backend.get(self.namespace, key)
+        self._count(value is not None, value is None)
+        return default if value is None else value
+    
+    def get_many(self, keys):
+        """Valores vigentes de varias llaves (``None`` si no están)"""
+        values = self.backend.get_many(self.namespace, list(keys))
+        found = sum(v is not None for v in values)
+        self._count(found, len(values) - found)
+        return values
+    
+    def set(self, key, value, ttl=None):
+        """Guardar un valor con el TTL por defecto o uno propio"""
+        self.backend.set(self.namespace, key, value, self.ttl if ttl is None else ttl)
+    
+    def add(self, key, value, ttl=None):
+        """Guardar solo si no hay un valor vigente; indica si se guardó"""
+        return self.backend.add(self.namespace, key, value, self.ttl if ttl is None else ttl)
+    
+    def delete(self, key):
+        """Invalidar una llave"""
+        self.backend.delete(self.namespace, key)
+    
+    def clear(self):
+        """Vaciar la caché"""
+        self.backend.clear(self.namespace)
+    
+    def stats(self):
+        """Contadores de uso"""
+        with self._lock:
+            total = self.hits + self.misses
+            stats = {
+                'backend': self.backend.name,
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else None
+            }
+        stats.update(self.backend.info(self.namespace))
+        return stats
+
+class ResponseCache:
+    """Respuestas ya serializadas, etiquetadas con las tablas que leen.
+    
+    Cada tabla tiene una marca de generación aleatoria guardada en el
+    backend; ``invalidate`` la reemplaza y las entradas guardadas con una
+    marca anterior dejan de servirse sin tener que recorrer la caché (el
+    LRU las termina desalojando). Con un backend compartido la invalidación
+    llega a todos los workers. Cuenta aciertos y fallos por endpoint.
+    """
+    
+    def __init__(self, entries, generations):
+        self._entries = entries
+        self._generations = generations
+        self._endpoints = {}
+        self._lock = Lock()
+        self.invalidations = 0
+    
+    def configure(self, maxsize=None, ttl=None, maxbytes=None):
+        """Ajustar límites y TTL por defecto"""
+        self._entries.configure(maxsize=maxsize, ttl=ttl, maxbytes=maxbytes)
+    
+    def generations(self, tables):
+        """Generación vigente de cada tabla (tomarla antes de ejecutar la vista)"""
+        tokens = self._generations.get_many(tables)
+        for i, token in enumerate(tokens):
+            if token is None:
+                # Una marca perdida (p. ej. desalojada) se reemplaza por una nueva,
+                # así nunca vuelve a coincidir con entradas anteriores
+                self._generations.add(tables[i], token_hex(8))
+                tokens[i] = self._generations.get(tables[i]) or token_hex(8)
+        return tuple(tokens)
+    
+    def _count(self, endpoint, hit):
+        with self._lock:
+            counters = self._endpoints.setdefault(endpoint, [0, 0])
+            counters[0 if hit else 1] += 1
+    
+    def get(self, key, tables, endpoint=None):
+        """Cuerpo y tipo de una respuesta vigente, o ``None``"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] != self.generations(tables):
+            self._entries.delete(key)
+            entry = None
+        self._count(endpoint, entry is not None)
+        return entry[:2] if entry is not None else None
+    
+    def set(self, key, body, mimetype, generations, ttl=None):
+        """Guardar una respuesta con las generaciones leídas antes de generarla"""
+        self._entries.set(key, (body, mimetype, generations), ttl=ttl)
+    
+    def invalidate(self, tables):
+        """Descartar las respuestas que leen alguna de ``tables``"""
+        for table in tables:
+            self._generations.set(table, token_hex(8))
+        with self._lock:
+            self.invalidations += 1
+    
+    def clear(self):
+        """Vaciar la caché"""
+        self._entries.clear()
+    
+    def stats(self):
+        """Uso global y proporción de aciertos por endpoint"""
+        stats = self._entries.stats()
+        with self._lock:
+            hits = sum(c[0] for c in self._endpoints.values())
+            misses = sum(c[1] for c in self._endpoints.values())
+            stats.update({
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+                'invalidations': self.invalidations,
+                'endpoints': {
+                    endpoint: {
+                        'hits': h,
+                        'misses': m,
+                        'hit_ratio': round(h / (h + m), 4)
+                    }
+                    for endpoint, (h, m) in sorted(self._endpoints.items(), key=lambda i: str(i[0]))
+                }
+            })
+        return stats
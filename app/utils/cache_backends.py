@@ -0,0 +1,311 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from hashlib import sha1
+
+from app.utils.cache import TTLCache, Cache
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+CACHE_BACKENDS = ('memory', 'sqlite', 'redis')
+
+def _key(key):
+    """Llave textual estable entre procesos (las largas se resumen)"""
+    text = key if isinstance(key, str) else repr(key)
+    return text if len(text) <= 200 else sha1(text.encode('utf-8')).hexdigest()
+
+class MemoryBackend:
+    """Backend en memoria del proceso: un ``TTLCache`` por espacio de nombres.
+    
+    Cada worker tiene su propia copia y las invalidaciones no salen del proceso.
+    """
+    name = 'memory'
+    shared = False
+    enforces_limits = True
+    
+    def __init__(self):
+        self._caches = {}
+        self._lock = threading.Lock()
+    
+    def _cache(self, namespace):
+        cache = self._caches.get(namespace)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.setdefault(namespace, TTLCache())
+        return cache
+    
+    def configure(self, namespace, maxsize, maxbytes=None, sizeof=None):
+        cache = self._cache(namespace)
+        cache.sizeof = sizeof if maxbytes is not None else None
+        cache.configure(maxsize=maxsize, maxbytes=maxbytes)
+    
+    @staticmethod
+    def _ttl(ttl):
+        return float('inf') if ttl is None else ttl
+    
+    def get(self, namespace, key):
+        return self._cache(namespace).get(key)
+    
+    def get_many(self, namespace, keys):
+        cache = self._cache(namespace)
+        return [cache.get(key) for key in keys]
+    
+    def set(self, namespace, key, value, ttl):
+        self._cache(namespace).set(key, value, ttl=self._ttl(ttl))
+    
+    def add(self, namespace, key, value, ttl):
+        return self._cache(namespace).add(key, value, ttl=self._ttl(ttl))
+    
+    def delete(self, namespace, key):
+        self._cache(namespace).delete(key)
+    
+    def clear(self, namespace):
+        self._cache(namespace).clear()
+    
+    def info(self, namespace):
+        stats = self._cache(namespace).stats()
+        return {k: stats[k] for k in ('size', 'evictions', 'bytes', 'maxbytes') if k in stats}
+    
+    def reopen(self):
+        return MemoryBackend()
+
+class SQLiteBackend:
+    """Backend en un archivo SQLite (modo WAL) compartido por los workers de un host.
+    
+    Cada hilo de cada proceso abre su propia conexión. Al superar
+    ``maxsize`` o ``maxbytes`` se desalojan primero las entradas más
+    próximas a expirar.
+    """
+    name = 'sqlite'
+    shared = True
+    enforces_limits = True
+    
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._limits = {}
+        self.evictions = {}
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,'
+            ' size INTEGER NOT NULL, expires REAL,'
+            ' PRIMARY KEY (namespace, key)) WITHOUT ROWID'
+        )
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Las conexiones no se heredan de un fork: cada proceso abre la suya
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    @staticmethod
+    def _expires(ttl):
+        return None if ttl is None else time.time() + ttl
+    
+    def configure(self, namespace, maxsize, maxbytes=None, sizeof=None):
+        self._limits[namespace] = (maxsize, maxbytes)
+    
+    def get(self, namespace, key):
+        row = self._connect().execute(
+            'SELECT value FROM cache WHERE namespace = ? AND key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (namespace, _key(key), time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+    
+    def get_many(self, namespace, keys):
+        if not keys:
+            return []
+        names = [_key(key) for key in keys]
+        rows = dict(self._connect().execute(
+            f"SELECT key, value FROM cache WHERE namespace = ? AND key IN ({', '.join('?' * len(names))})"
+            ' AND (expires IS NULL OR expires > ?)',
+            (namespace, *names, time.time())
+        ).fetchall())
+        return [pickle.loads(rows[n]) if n in rows else None for n in names]
+    
+    def set(self, namespace, key, value, ttl):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._connect().execute(
+            'INSERT OR REPLACE INTO cache (namespace, key, value, size, expires) VALUES (?, ?, ?, ?, ?)',
+            (namespace, _key(key), data, len(data), self._expires(ttl))
+        )
+        self._evict(namespace)
+    
+    def add(self, namespace, key, value, ttl):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        # Una sola sentencia (su propia transacción): inserta si no existe y
+        # reemplaza solo una entrada ya expirada; si hay una vigente no cambia nada
+        cursor = self._connect().execute(
+            'INSERT INTO cache (namespace, key, value, size, expires) VALUES (?, ?, ?, ?, ?)'
+            ' ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value,'
+            ' size = excluded.size, expires = excluded.expires'
+            ' WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (namespace, _key(key), data, len(data), self._expires(ttl), now)
+        )
+        return cursor.rowcount == 1
+    
+    def _evict(self, namespace):
+        maxsize, maxbytes = self._limits.get(namespace, (None, None))
+        conn = self._connect()
+        deleted = conn.execute(
+            'DELETE FROM cache WHERE namespace = ? AND expires <= ?', (namespace, time.time())
+        ).rowcount
+        
+        size, total = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?', (namespace,)
+        ).fetchone()
+        if (maxsize is not None and size > maxsize) or (maxbytes is not None and total > maxbytes):
+            deleted += conn.execute(
+                'DELETE FROM cache WHERE namespace = ? AND key IN ('
+                ' SELECT key FROM ('
+                '  SELECT key, ROW_NUMBER() OVER w AS n, SUM(size) OVER w AS total'
+                '  FROM cache WHERE namespace = ?'
+                '  WINDOW w AS (ORDER BY expires IS NOT NULL, expires DESC))'
+                ' WHERE n > ? OR total > ?)',
+                (namespace, namespace,
+                 maxsize if maxsize is not None else size,
+                 maxbytes if maxbytes is not None else total)
+            ).rowcount
+        if deleted:
+            self.evictions[namespace] = self.evictions.get(namespace, 0) + deleted
+    
+    def delete(self, namespace, key):
+        self._connect().execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (namespace, _key(key)))
+    
+    def clear(self, namespace):
+        self._connect().execute('DELETE FROM cache WHERE namespace = ?', (namespace,))
+    
+    def info(self, namespace):
+        size, total = self._connect().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (namespace, time.time())
+        ).fetchone()
+        return {
+            'size': size,
+            'bytes': total,
+            'maxbytes': self._limits.get(namespace, (None, None))[1],
+            'evictions': self.evictions.get(namespace, 0)
+        }
+    
+    def reopen(self):
+        return SQLiteBackend(self.path, self.timeout)
+
+class RedisBackend:
+    """Backend sobre un servidor que hable el protocolo de Redis (requiere ``redis``).
+    
+    Los límites de tamaño los impone el servidor (``maxmemory`` con una
+    política ``allkeys-lru``); aquí solo se aplica el TTL.
+    """
+    name = 'redis'
+    shared = True
+    enforces_limits = False
+    
+    def __init__(self, url, prefix='zoopecas'):
+        if redis is None:
+            raise RuntimeError('CACHE_BACKEND=redis requiere el paquete redis')
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+    
+    def _name(self, namespace, key):
+        return f'{self.prefix}:{namespace}:{_key(key)}'
+    
+    @staticmethod
+    def _px(ttl):
+        return None if ttl is None else max(int(ttl * 1000), 1)
+    
+    @staticmethod
+    def _load(data):
+        return pickle.loads(data) if data is not None else None
+    
+    def configure(self, namespace, maxsize, maxbytes=None, sizeof=None):
+        pass
+    
+    def get(self, namespace, key):
+        return self._load(self.client.get(self._name(namespace, key)))
+    
+    def get_many(self, namespace, keys):
+        if not keys:
+            return []
+        return [self._load(d) for d in self.client.mget([self._name(namespace, k) for k in keys])]
+    
+    def set(self, namespace, key, value, ttl):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.client.set(self._name(namespace, key), data, px=self._px(ttl))
+    
+    def add(self, namespace, key, value, ttl):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        return bool(self.client.set(self._name(namespace, key), data, px=self._px(ttl), nx=True))
+    
+    def delete(self, namespace, key):
+        self.client.delete(self._name(namespace, key))
+    
+    def clear(self, namespace):
+        batch = []
+        for name in self.client.scan_iter(match=f'{self.prefix}:{namespace}:*', count=500):
+            batch.append(name)
+            if len(batch) >= 500:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+    
+    def info(self, namespace):
+        return {}
+    
+    def reopen(self):
+        return RedisBackend(self.url, self.prefix)
+
+def create_backend(name, url=None, prefix='zoopecas'):
+    """Instanciar el backend ``memory``, ``sqlite`` (``url`` = ruta) o ``redis``"""
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'sqlite':
+        return SQLiteBackend(url)
+    if name == 'redis':
+        return RedisBackend(url, prefix)
+    raise ValueError(f'Backend de caché inválido: {name}')
+
+class CacheManager:
+    """Backend común de las cachés de la aplicación, elegido con ``CACHE_BACKEND``.
+    
+    Las cachés se declaran con ``namespace`` (en ``app.extensions``) y usan
+    memoria del proceso hasta que ``init_app`` las enlaza al backend
+    configurado: ``memory``, ``sqlite`` (archivo ``CACHE_URL``, por defecto
+    en la carpeta ``instance``) o ``redis`` (``CACHE_URL`` = ``redis://...``).
+    """
+    
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self._caches = []
+    
+    def namespace(self, name, **kwargs):
+        """Declarar una caché con su tamaño máximo y TTL por defecto"""
+        cache = Cache(name, self.backend, **kwargs)
+        self._caches.append(cache)
+        return cache
+    
+    def init_app(self, app):
+        name = app.config.get('CACHE_BACKEND', 'memory')
+        url = app.config.get('CACHE_URL')
+        if name == 'sqlite' and not url:
+            os.makedirs(app.instance_path, exist_ok=True)
+            url = os.path.join(app.instance_path, 'cache.sqlite3')
+        self.backend = create_backend(name, url, app.config.get('CACHE_KEY_PREFIX', 'zoopecas'))
+        for cache in self._caches:
+            cache.bind(self.backend)
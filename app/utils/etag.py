@@ -0,0 +1,104 @@
+from datetime import date
+from functools import wraps
+from hashlib import sha1
+from flask import current_app, g, request
+from sqlalchemy import event, inspect
+
+from app.extensions import db
+from app.models.version import VersionTabla
+
+# Tablas modificadas en la transacción en curso (en session.info)
+_MODIFICADAS = 'tablas_modificadas'
+# Tablas del commit en curso, para avisar cuando quede confirmado
+_CONFIRMADAS = 'tablas_confirmadas'
+
+# Funciones llamadas con las tablas de cada commit ya confirmado
+_suscriptores = []
+
+def al_confirmar(callback):
+    """Llamar ``callback(tablas)`` después de cada commit que modifique tablas"""
+    if callback not in _suscriptores:
+        _suscriptores.append(callback)
+
+def _registrar(session, tablas):
+    pendientes = session.info.setdefault(_MODIFICADAS, set())
+    pendientes.update(t for t in tablas if t != VersionTabla.__tablename__)
+
+def _after_flush(session, flush_context):
+    objetos = list(session.new) + list(session.deleted)
+    objetos += [o for o in session.dirty if session.is_modified(o)]
+    _registrar(session, {t.name for o in objetos for t in inspect(o).mapper.tables})
+
+def _do_orm_execute(state):
+    # INSERT/UPDATE/DELETE masivos (insert(), update(), from_select) no pasan por el flush
+    if state.is_insert or state.is_update or state.is_delete:
+        _registrar(state.session, [state.statement.table.name])
+
+def _before_commit(session):
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    tablas = session.info.pop(_MODIFICADAS, None)
+    if tablas:
+        session.info[_CONFIRMADAS] = tablas
+
+def _after_commit(session):
+    tablas = session.info.pop(_CONFIRMADAS, None)
+    if not tablas:
+        return
+    try:
+        # Fuera de la transacción de los datos: no la alarga ni la bloquea
+        VersionTabla.incrementar(tablas)
+    except Exception:
+        current_app.logger.exception('No se pudo incrementar la versión de %s', ', '.join(sorted(tablas)))
+    for callback in _suscriptores:
+        callback(tablas)
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_MODIFICADAS, None)
+        session.info.pop(_CONFIRMADAS, None)
+
+def init_app(app):
+    """Versionar las tablas modificadas en cada commit de la sesión"""
+    event.listen(db.session, 'after_flush', _after_flush)
+    event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+    event.listen(db.session, 'before_commit', _before_commit)
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_transaction_end', _after_transaction_end)
+
+def calcular_etag(tablas, vigencia=None):
+    """ETag de la petición actual: versiones de ``tablas``, ruta, fecha del día y ``vigencia``"""
+    huella = (request.full_path, date.today().isoformat(), VersionTabla.obtener(tablas), vigencia)
+    return sha1(repr(huella).encode('utf-8')).hexdigest()[:20]
+
+def aplicar_etag(response):
+    """Agregar a la respuesta el ETag calculado por ``conditional``"""
+    etag = g.get('etag')
+    if etag and response.status_code in (200, 304):
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def conditional(*models, vigencia=None):
+    """GET condicional: 304 si ``If-None-Match`` coincide con el ETag vigente.
+    
+    El ETag débil sale de las versiones de las tablas de ``models`` (las que
+    la respuesta lee, incluidas las relaciones anidadas), no del cuerpo: con
+    un 304 la vista no se ejecuta. ``success_response`` lo agrega a la
+    respuesta. Va debajo de ``jwt_required``.
+    
+    Si la respuesta depende también de la hora, ``vigencia`` es una función
+    sin argumentos cuyo valor entra en el ETag (p. ej. el horario actual).
+    """
+    tablas = tuple(sorted({m.__tablename__ for m in models}))
+    
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.etag = calcular_etag(tablas, vigencia() if vigencia else None)
+            if request.if_none_match.contains_weak(g.etag):
+                return aplicar_etag(current_app.response_class(status=304))
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
\ No newline at end of file
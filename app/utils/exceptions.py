@@ -22,6 +22,16 @@ class AuthorizationError(VeterinaryException):
     def __init__(self, message="Permisos insuficientes"):
         super().__init__(message, 403)
 
+class RateLimitError(VeterinaryException):
+    """Demasiadas solicitudes"""
+    def __init__(self, message="Demasiadas solicitudes, intente más tarde"):
+        super().__init__(message, 429)
+
+class PaginationError(VeterinaryException):
+    """Parámetros de paginación inválidos (``?cursor=``, ``?count=``)"""
+    def __init__(self, message="Parámetros de paginación inválidos"):
+        super().__init__(message, 400)
+
 class NotFoundError(VeterinaryException):
     """Recurso no encontrado"""
     def __init__(self, message="Recurso no encontrado"):
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Response, current_app, stream_with_context
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# Tamaño aproximado de cada bloque enviado al cliente
+CHUNK_SIZE = 64 * 1024
+
+def _csv_lines(rows, columnas):
+    """Filas (diccionarios) a líneas CSV, con el encabezado ``columnas`` aunque no haya filas"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columnas, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+def _ndjson_lines(rows):
+    """Filas (diccionarios) a líneas JSON independientes"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+def stream_export(query, serialize, formato, nombre, columnas):
+    """Respuesta que exporta una consulta completa sin cargarla en memoria.
+    
+    Las filas se leen por lotes de ``EXPORT_BATCH_SIZE`` con ``yield_per``
+    (cursor del lado del servidor en PostgreSQL), se serializan con
+    ``serialize`` y se envían en bloques a medida que se generan.
+    ``columnas`` son las llaves que produce ``serialize`` (encabezado CSV).
+    """
+    if formato not in EXPORT_FORMATS:
+        raise ValueError(f'Formato de exportación inválido: {formato}')
+    
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    logger = current_app.logger
+    
+    def generate():
+        rows = (serialize(item) for item in query.yield_per(batch_size))
+        lines = _csv_lines(rows, columnas) if formato == 'csv' else _ndjson_lines(rows)
+        chunk = []
+        size = 0
+        try:
+            for line in lines:
+                chunk.append(line)
+                size += len(line)
+                if size >= CHUNK_SIZE:
+                    yield ''.join(chunk)
+                    chunk = []
+                    size = 0
+            if chunk:
+                yield ''.join(chunk)
+        except Exception:
+            # Los encabezados ya se enviaron: se corta la respuesta para que quede incompleta
+            logger.exception('Error durante la exportación de %s', nombre)
+            raise
+    
+    filename = f"{nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+    return Response(
+        stream_with_context(generate()),
+        content_type=EXPORT_FORMATS[formato],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
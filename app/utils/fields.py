@@ -0,0 +1,17 @@
+from flask import request
+
+def requested_fields():
+    """Campos pedidos con ``?fields=a,b,c`` (None si no se indican: respuesta completa)"""
+    raw = request.args.get('fields', '')
+    fields = frozenset(f.strip() for f in raw.split(',') if f.strip())
+    return fields or None
+
+def apply_fields(query, model, fields, *columns):
+    """Diferir en SQL las columnas de ``model`` que no se van a serializar.
+    
+    ``columns`` son columnas adicionales que la ruta necesita aunque no se
+    pidan (p. ej. las llaves del cursor de paginación).
+    """
+    if fields is None:
+        return query
+    return query.options(model.load_only_fields(set(fields) | {c.key for c in columns}))
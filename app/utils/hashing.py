@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import BoundedSemaphore, Lock
+import time
+
+from app.utils.exceptions import RateLimitError
+
+class PasswordHasher:
+    """Ejecuta bcrypt en un pool acotado de hilos con control de admisión.
+    
+    Como mucho ``max_workers`` operaciones corren a la vez y ``max_pending``
+    esperan en cola; las siguientes se rechazan con ``RateLimitError`` (429)
+    en lugar de ocupar más workers del servidor. Lo mismo ocurre si una
+    operación no termina en ``BCRYPT_TIMEOUT`` segundos.
+    """
+    
+    def __init__(self, bcrypt):
+        self.bcrypt = bcrypt
+        self.log_rounds = 12
+        self.max_workers = 0
+        self.max_pending = 0
+        self.timeout = None
+        self._executor = None
+        self._admission = None
+        self._lock = Lock()
+        self._reset_stats()
+    
+    def _reset_stats(self):
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.rehashed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+    
+    def init_app(self, app):
+        self.log_rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        max_workers = app.config.get('BCRYPT_MAX_WORKERS', 2)
+        max_pending = app.config.get('BCRYPT_MAX_PENDING', 8)
+        self.timeout = app.config.get('BCRYPT_TIMEOUT', 10)
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._admission = BoundedSemaphore(max_workers + max_pending)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+    
+    def _run(self, fn, *args):
+        # init_app puede reemplazar el semáforo mientras el trabajo sigue en curso
+        admission = self._admission
+        if not admission.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise RateLimitError('Demasiados inicios de sesión simultáneos, intente de nuevo')
+        
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+        
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.in_flight += 1
+                self.total_wait += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.completed += 1
+                    self.total_run += time.perf_counter() - started
+                # El cupo se libera cuando termina el trabajo, no cuando deja de esperarse
+                admission.release()
+        
+        try:
+            return self._executor.submit(task).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # El trabajo sigue en el pool y libera su cupo al terminar
+            with self._lock:
+                self.timed_out += 1
+            raise RateLimitError('El servicio de autenticación está saturado, intente de nuevo')
+    
+    def generate(self, password):
+        """Hash bcrypt con el costo configurado"""
+        return self._run(
+            self.bcrypt.generate_password_hash, password, self.log_rounds
+        ).decode('utf-8')
+    
+    def check(self, password_hash, password):
+        """Verificar una contraseña contra su hash"""
+        return self._run(self.bcrypt.check_password_hash, password_hash, password)
+    
+    def needs_rehash(self, password_hash):
+        """El hash se generó con un costo distinto al configurado"""
+        try:
+            return int(password_hash.split('$')[2]) != self.log_rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+    
+    def record_rehash(self):
+        with self._lock:
+            self.rehashed += 1
+    
+    def stats(self):
+        """Métricas de la cola de hashing"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'log_rounds': self.log_rounds,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'rehashed': self.rehashed,
+                'avg_wait_ms': round(self.total_wait / self.completed * 1000, 2) if self.completed else None,
+                'avg_run_ms': round(self.total_run / self.completed * 1000, 2) if self.completed else None
+            }
@@ -0,0 +1,57 @@
+from datetime import date, time
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    """Tipos sin representación JSON nativa: Decimal como texto (sin perder precisión) y fechas en ISO 8601"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+class JSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de la aplicación.
+    
+    Codifica ``Decimal`` como texto, igual que el proveedor de Flask, y
+    ``date``, ``time`` y ``datetime`` en ISO 8601. Usa ``orjson`` si está
+    instalado (serializa a bytes en una sola pasada); si no, o si se piden
+    opciones propias del módulo ``json``, usa la biblioteca estándar con el
+    mismo resultado. Respeta ``JSON_AS_ASCII``.
+    """
+    default = staticmethod(_default)
+    
+    def __init__(self, app):
+        super().__init__(app)
+        self.ensure_ascii = app.config.get('JSON_AS_ASCII', False)
+        # orjson no escapa caracteres no ASCII
+        self.fast = orjson is not None and not self.ensure_ascii
+    
+    def _options(self):
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        if self.fast and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._options()).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        if self.fast and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        if not self.fast:
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -1,15 +1,31 @@
-from flask import request, url_for
+from flask import request, url_for, current_app
 from math import ceil
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import date, datetime, time
+from decimal import Decimal
+from hashlib import sha1
+import json
+
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.sql import operators
+from app.extensions import count_cache
+from app.utils.exceptions import PaginationError
+
+COUNT_STRATEGIES = ('exact', 'estimate', 'capped', 'cached')
 
 class Pagination:
     """Clase para manejar paginación"""
     
-    def __init__(self, query, page, per_page, total, items):
+    def __init__(self, query, page, per_page, total, items, count_strategy='exact', has_more=None,
+                 total_is_exact=True):
         self.query = query
         self.page = page
         self.per_page = per_page
         self.total = total
         self.items = items
+        self.count_strategy = count_strategy
+        self.has_more = has_more
+        self.total_is_exact = total_is_exact
     
     @property
     def pages(self):
@@ -29,6 +45,8 @@ class Pagination:
     @property
     def has_next(self):
         """Tiene página siguiente"""
+        if self.has_more is not None:
+            return self.has_more
         return self.page < self.pages
     
     @property
@@ -46,20 +64,238 @@ class Pagination:
             'has_prev': self.has_prev,
             'prev_num': self.prev_num,
             'has_next': self.has_next,
-            'next_num': self.next_num
+            'next_num': self.next_num,
+            'count_strategy': self.count_strategy,
+            'total_is_exact': self.total_is_exact
+        }
+
+class CursorPagination:
+    """Paginación por cursor (keyset) sobre las llaves de ordenamiento"""
+    
+    def __init__(self, query, per_page, items, next_cursor, prev_cursor):
+        self.query = query
+        self.per_page = per_page
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+    
+    @property
+    def has_prev(self):
+        """Tiene página anterior"""
+        return self.prev_cursor is not None
+    
+    @property
+    def has_next(self):
+        """Tiene página siguiente"""
+        return self.next_cursor is not None
+    
+    def to_dict(self):
+        """Convertir a diccionario"""
+        return {
+            'mode': 'cursor',
+            'per_page': self.per_page,
+            'has_prev': self.has_prev,
+            'prev_cursor': self.prev_cursor,
+            'has_next': self.has_next,
+            'next_cursor': self.next_cursor
         }
 
-def paginate_query(query, page=None, per_page=None, error_out=True):
-    """Paginar una consulta SQLAlchemy"""
+def _encode_value(value):
+    """Serializar un valor de llave conservando su tipo"""
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, time):
+        return ['t', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['n', str(value)]
+    return ['v', value]
+
+def _decode_value(item):
+    """Reconstruir un valor de llave serializado"""
+    tag, value = item
+    if tag == 'dt':
+        return datetime.fromisoformat(value)
+    if tag == 'd':
+        return date.fromisoformat(value)
+    if tag == 't':
+        return time.fromisoformat(value)
+    if tag == 'n':
+        return Decimal(value)
+    return value
+
+def encode_cursor(values, direction='next'):
+    """Codificar los valores de llave en un cursor opaco"""
+    payload = {'d': direction, 'v': [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decodificar un cursor opaco en (dirección, valores); ``PaginationError`` si es inválido"""
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = payload['d']
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, [_decode_value(v) for v in payload['v']]
+    except Exception:
+        raise PaginationError('Cursor inválido')
+
+def _split_key(key):
+    """Separar una expresión de orden en (columna, descendente)"""
+    modifier = getattr(key, 'modifier', None)
+    if modifier in (operators.desc_op, operators.asc_op):
+        return key.element, modifier is operators.desc_op
+    return key, False
+
+def _seek_filter(columns, descending, values, forward):
+    """Construir el predicado de búsqueda por llave (keyset)"""
+    def after(column, desc, value):
+        return column < value if desc == forward else column > value
+    
+    if all(descending) or not any(descending):
+        # Comparación de tuplas: permite usar el índice compuesto directamente
+        return after(tuple_(*columns), descending[0], tuple_(*values))
+    
+    clauses = []
+    for i, column in enumerate(columns):
+        prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*prefix, after(column, descending[i], values[i])))
+    return or_(*clauses)
+
+def paginate_cursor(query, cursor_keys, cursor=None, per_page=None):
+    """Paginar una consulta SQLAlchemy por cursor (keyset).
+    
+    ``cursor_keys`` son las expresiones de orden (p. ej. ``Factura.fecha_factura.desc()``)
+    y deben terminar en una columna única y no nula para que el orden sea total.
+    """
+    if per_page is None:
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
+    
+    columns, descending = zip(*(_split_key(k) for k in cursor_keys))
+    direction, values = decode_cursor(cursor) if cursor else ('next', None)
+    forward = direction == 'next'
+    
+    if values is not None and len(values) != len(columns):
+        raise PaginationError('Cursor inválido')
+    
+    order = [
+        c.desc() if desc == forward else c.asc()
+        for c, desc in zip(columns, descending)
+    ]
+    
+    seek_query = query.order_by(None).order_by(*order)
+    if values is not None:
+        seek_query = seek_query.filter(_seek_filter(columns, descending, values, forward))
+    
+    rows = seek_query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    if not forward:
+        items.reverse()
+    
+    def key_values(item):
+        return [getattr(item, c.key) for c in columns]
+    
+    next_cursor = prev_cursor = None
+    if items:
+        if has_more or not forward:
+            next_cursor = encode_cursor(key_values(items[-1]), 'next')
+        if values is not None and (forward or has_more):
+            prev_cursor = encode_cursor(key_values(items[0]), 'prev')
+    
+    return CursorPagination(query, per_page, items, next_cursor, prev_cursor)
+
+def _count_cache_key(query):
+    """Llave normalizada (SQL + parámetros, sin ORDER BY) de una consulta"""
+    compiled = query.order_by(None).statement.compile()
+    params = sorted((k, repr(v)) for k, v in compiled.params.items())
+    return sha1(f'{compiled}|{params}'.encode('utf-8')).hexdigest()
+
+def count_exact(query):
+    """SELECT COUNT(*) exacto"""
+    return query.order_by(None).count()
+
+def count_estimate(query):
+    """Estimación del planificador de PostgreSQL (EXPLAIN); exacto en otros motores"""
+    session = query.session
+    bind = session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return count_exact(query)
+    
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    result = session.connection().exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+    ).scalar()
+    plan = json.loads(result) if isinstance(result, str) else result
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def count_capped(query, cap):
+    """Contar como máximo ``cap + 1`` filas"""
+    return query.order_by(None).limit(cap + 1).count()
+
+def count_cached(query, ttl):
+    """COUNT exacto reutilizado durante ``ttl`` segundos por conjunto de filtros"""
+    key = _count_cache_key(query)
+    total = count_cache.get(key)
+    if total is None:
+        total = count_exact(query)
+        count_cache.set(key, total, ttl=ttl)
+    return total
+
+def paginate_query(query, page=None, per_page=None, error_out=True, cursor_keys=None,
+                   count_strategy=None):
+    """Paginar una consulta SQLAlchemy
+    
+    Si se indican ``cursor_keys`` y la petición trae ``?cursor=``, se usa
+    paginación por cursor en lugar de ``COUNT`` + ``OFFSET``.
+    
+    ``count_strategy`` (o ``?count=``) define cómo se obtiene el total:
+    ``exact``, ``estimate`` (EXPLAIN de PostgreSQL), ``capped`` (hasta
+    ``PAGINATION_COUNT_CAP``) o ``cached`` (``PAGINATION_COUNT_CACHE_TTL`` segundos).
+    """
+    if cursor_keys is not None and 'cursor' in request.args:
+        return paginate_cursor(query, cursor_keys, request.args.get('cursor'), per_page)
+    
     if page is None:
         page = request.args.get('page', 1, type=int)
     if per_page is None:
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+    if count_strategy is None:
+        count_strategy = request.args.get('count', 'exact')
+    if count_strategy not in COUNT_STRATEGIES:
+        raise PaginationError(f'Estrategia de conteo inválida: {count_strategy}')
     
-    total = query.count()
-    items = query.offset((page - 1) * per_page).limit(per_page).all()
+    if count_strategy == 'exact':
+        total = count_exact(query)
+        items = query.offset((page - 1) * per_page).limit(per_page).all()
+        has_more = None
+        total_is_exact = True
+    else:
+        # Se pide una fila extra para saber si hay página siguiente sin depender del total
+        rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        
+        if count_strategy == 'estimate':
+            total = count_estimate(query)
+            total_is_exact = False
+        elif count_strategy == 'capped':
+            cap = current_app.config.get('PAGINATION_COUNT_CAP', 1000)
+            total = count_capped(query, cap)
+            total_is_exact = total <= cap
+            total = min(total, cap)
+        else:
+            ttl = current_app.config.get('PAGINATION_COUNT_CACHE_TTL', 30)
+            total = count_cached(query, ttl)
+            total_is_exact = True
+        
+        # El total aproximado nunca puede ser menor que lo ya visto
+        total = max(total, (page - 1) * per_page + len(items) + (1 if has_more else 0))
     
     if error_out and page > 1 and len(items) == 0:
         raise ValueError('Página no encontrada')
     
-    return Pagination(query, page, per_page, total, items)
+    return Pagination(query, page, per_page, total, items, count_strategy, has_more, total_is_exact)
@@ -0,0 +1,60 @@
+from datetime import date
+from functools import wraps
+from flask import current_app, g, request
+
+from app.extensions import response_cache
+from app.auth.decorators import get_current_user
+from app.utils.etag import aplicar_etag, al_confirmar
+
+def init_app(app):
+    """Configurar la caché de respuestas e invalidarla con cada commit"""
+    response_cache.configure(
+        maxsize=app.config['RESPONSE_CACHE_MAXSIZE'],
+        ttl=app.config['RESPONSE_CACHE_TTL'],
+        maxbytes=app.config['RESPONSE_CACHE_MAX_BYTES']
+    )
+    al_confirmar(response_cache.invalidate)
+
+def _cache_key(current_user):
+    """Ruta, argumentos, rol, fecha del día y ETag de la petición actual"""
+    user = current_user or get_current_user()
+    return (
+        request.path,
+        tuple(sorted(request.args.items(multi=True))),
+        user.rol if user else None,
+        date.today().isoformat(),
+        # Con ``conditional`` el cuerpo servido siempre corresponde al ETag enviado
+        g.get('etag')
+    )
+
+def cached_response(*models, ttl=None):
+    """Servir desde memoria las respuestas 200 de un GET.
+    
+    La llave combina ruta, argumentos, rol y fecha. ``models`` son las tablas
+    que la respuesta lee: un commit que modifique alguna invalida sus
+    entradas en este proceso. Debajo de ``conditional`` la llave incluye
+    además el ETag (versiones de las tablas), así que los cambios confirmados
+    desde otros procesos también se ven; ``ttl`` (por defecto
+    ``RESPONSE_CACHE_TTL``) limita cuánto vive cada entrada.
+    """
+    tablas = tuple(sorted({m.__tablename__ for m in models}))
+    
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = _cache_key(kwargs.get('current_user'))
+            entry = response_cache.get(key, tablas, request.endpoint)
+            if entry is not None:
+                body, mimetype = entry
+                response = current_app.response_class(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return aplicar_etag(response)
+            
+            generations = response_cache.generations(tablas)
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                response_cache.set(key, response.get_data(), response.mimetype, generations, ttl=ttl)
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
\ No newline at end of file
@@ -1,15 +1,19 @@
-from flask import jsonify
+from flask import current_app
+from app.utils.etag import aplicar_etag
 
 def success_response(message, data=None, status_code=200):
     """Respuesta de éxito estandardizada"""
     response = {'message': message}
     if data is not None:
         response['data'] = data
-    return jsonify(response), status_code
+    
+    resp = current_app.json.response(response)
+    resp.status_code = status_code
+    return aplicar_etag(resp), status_code
 
 def error_response(message, errors=None, status_code=400):
     """Respuesta de error estandardizada"""
     response = {'message': message}
     if errors:
         response['errors'] = errors
-    return jsonify(response), status_code
\ No newline at end of file
+    return current_app.json.response(response), status_code
\ No newline at end of file
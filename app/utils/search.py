@@ -0,0 +1,78 @@
+import re
+import sqlite3
+from flask import current_app
+from sqlalchemy import event, func, or_, desc, text
+from app.extensions import db
+
+_WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+def trigrams(text):
+    """Trigramas de un texto con las mismas reglas que pg_trgm"""
+    result = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+def similarity(a, b):
+    """Equivalente de pg_trgm similarity(a, b)"""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+def word_similarity(term, text):
+    """Aproximación de pg_trgm word_similarity(term, text).
+    
+    Compara el término con cada secuencia de palabras consecutivas del texto
+    de la misma longitud y devuelve la mayor similitud.
+    """
+    words = _WORD_RE.findall((text or '').lower())
+    size = max(len(_WORD_RE.findall((term or '').lower())), 1)
+    if not words:
+        return 0.0
+    windows = [' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))]
+    return max(similarity(term, w) for w in windows)
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('similarity', 2, similarity, deterministic=True)
+        dbapi_connection.create_function('word_similarity', 2, word_similarity, deterministic=True)
+
+def init_app(app):
+    """Registrar las funciones de similitud en conexiones SQLite"""
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _register_sqlite_functions)
+
+def _is_postgresql():
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+def ranked_search(query, columns, term):
+    """Búsqueda tolerante a errores ordenada por similitud.
+    
+    Incluye las coincidencias por subcadena (ILIKE) y las aproximadas por
+    trigramas; en PostgreSQL ambas usan los índices GIN ``gin_trgm_ops``.
+    """
+    pattern = f'%{term}%'
+    postgresql = _is_postgresql()
+    threshold = current_app.config.get('SEARCH_SIMILARITY_THRESHOLD', 0.5)
+    
+    clauses = [c.ilike(pattern) for c in columns]
+    if postgresql:
+        # term <% columna: operador indexable de word_similarity; el umbral
+        # se fija solo para la transacción actual
+        db.session.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"),
+            {'t': str(threshold)}
+        )
+        clauses += [db.literal(term).op('<%')(c) for c in columns]
+    else:
+        clauses += [func.word_similarity(term, c) >= threshold for c in columns]
+    
+    scores = [func.word_similarity(term, c) for c in columns]
+    if len(scores) == 1:
+        rank = scores[0]
+    else:
+        rank = func.greatest(*scores) if postgresql else func.max(*scores)
+    return query.filter(or_(*clauses)).order_by(desc(rank))
@@ -0,0 +1,55 @@
+"""Utilidades compartidas por los benchmarks: app aislada, usuario y medición"""
+import os
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from app import create_app
+from app.config import config, TestingConfig
+from app.extensions import db
+
+def crear_app():
+    """App de pruebas con las tablas recién creadas.
+    
+    Usa SQLite en memoria salvo que ``BENCH_DATABASE_URL`` indique otra base
+    de datos (se eliminan y crean todas las tablas).
+    """
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL', TestingConfig.SQLALCHEMY_DATABASE_URI)
+    
+    config['benchmark'] = BenchmarkConfig
+    try:
+        app = create_app('benchmark')
+    finally:
+        del config['benchmark']
+    with app.app_context():
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            db.session.commit()
+        db.drop_all()
+        db.create_all()
+    return app
+
+def encabezados_admin(app):
+    """Crear un administrador y devolver sus encabezados de autorización"""
+    from app.models import User
+    with app.app_context():
+        admin = User(username='bench', email='bench@zoopecas.test', nombre='Bench',
+                     apellidos='Admin', rol='Administrador')
+        admin.set_password('Bench123!')
+        db.session.add(admin)
+        db.session.commit()
+        token = create_access_token(identity=str(admin.usuario_id))
+    return {'Authorization': f'Bearer {token}'}
+
+def medir(funcion, repeticiones=5, antes=None):
+    """Mejor tiempo en milisegundos de ``repeticiones`` ejecuciones de ``funcion``"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        if antes is not None:
+            antes()
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
@@ -0,0 +1,68 @@
+"""Creación de facturas: consultas y latencia según el número de líneas.
+
+``POST /api/billing`` carga los productos facturados con una sola consulta,
+inserta detalles y movimientos de inventario en bloque y hace un único
+commit. Lo único que crece con las líneas es el resumen de productos
+vendidos por día (``ProductoVendidoDiario``): un UPDATE por producto.
+"""
+from sqlalchemy import event, insert
+
+from app.extensions import db
+from app.models import Cliente, Factura, Producto
+from benchmarks._comun import crear_app, encabezados_admin, medir
+
+LINEAS = (1, 5, 15, 50)
+REPETICIONES = 20
+
+def poblar():
+    db.session.add(Cliente(nombre='Cliente', apellidos='Benchmark', documento_identidad='BENCH-1'))
+    db.session.execute(insert(Producto), [
+        dict(codigo_producto=f'P-{i}', nombre=f'Producto {i}', precio_venta=10, stock_actual=10 ** 7)
+        for i in range(max(LINEAS))
+    ])
+    db.session.commit()
+
+def factura(lineas):
+    """Factura con ``lineas`` líneas: productos distintos y un servicio cada cinco líneas"""
+    detalles = []
+    for i in range(lineas):
+        if i % 5 == 4:
+            detalles.append({'tipo_item': 'Servicio', 'descripcion': 'Baño', 'cantidad': 1, 'precio_unitario': 15})
+        else:
+            detalles.append({'tipo_item': 'Producto', 'producto_id': i + 1, 'descripcion': f'Producto {i}',
+                             'cantidad': 2, 'precio_unitario': 10})
+    return {'cliente_id': 1, 'fecha_factura': '2024-06-01', 'metodo_pago': 'Efectivo', 'detalles': detalles}
+
+def main():
+    app = crear_app()
+    headers = encabezados_admin(app)
+    client = app.test_client()
+    with app.app_context():
+        poblar()
+        
+        sentencias = []
+        def contar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', contar)
+        
+        print(f'{"líneas":>6}  {"consultas":>9}  {"ms":>6}')
+        for lineas in LINEAS:
+            datos = factura(lineas)
+            
+            def crear():
+                response = client.post('/api/billing', headers=headers, json=datos)
+                assert response.status_code == 201, response.get_json()
+            
+            # La primera factura crea las filas del resumen diario; se cuenta la siguiente
+            crear()
+            sentencias.clear()
+            crear()
+            consultas = len(sentencias)
+            ms = medir(crear, repeticiones=REPETICIONES)
+            print(f'{lineas:>6}  {consultas:>9}  {ms:>6.1f}')
+        
+        event.remove(db.engine, 'before_cursor_execute', contar)
+        print(f'Facturas creadas: {Factura.query.count()}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Reporte de productos vendidos: agregado en vivo vs. ``productos_vendidos_diarios``.
+
+Genera un año de facturas (40.000, con 1 a 4 líneas cada una) sobre 300
+productos con ventas concentradas en unos pocos, reconstruye el resumen y
+compara el resultado y el tiempo de ambas consultas para varios rangos.
+"""
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert
+
+from app.extensions import db, response_cache
+from app.models import Cliente, DetalleFactura, Factura, Producto, ProductoVendidoDiario
+from benchmarks._comun import crear_app, encabezados_admin, medir
+
+FACTURAS = 40000
+PRODUCTOS = 300
+RANGOS = (
+    (date(2024, 1, 1), date(2024, 12, 31), 10),
+    (date(2024, 6, 1), date(2024, 6, 1), 5),
+    (date(2024, 3, 1), date(2024, 4, 15), 50),
+)
+
+def poblar():
+    random.seed(4)
+    db.session.add(Cliente(nombre='Cliente', apellidos='Benchmark', documento_identidad='BENCH-1'))
+    db.session.flush()
+    db.session.execute(insert(Producto), [
+        dict(nombre=f'Producto {i}', codigo_producto=f'P-{i}', precio_venta=10, stock_actual=10 ** 7)
+        for i in range(PRODUCTOS)
+    ])
+    facturas, detalles = [], []
+    for i in range(1, FACTURAS + 1):
+        facturas.append(dict(
+            factura_id=i, cliente_id=1, numero_factura=f'BENCH-{i:06d}',
+            fecha_factura=date(2024, 1, 1) + timedelta(days=random.randint(0, 365)),
+            subtotal=1, impuestos=0, total=1, metodo_pago='Efectivo',
+            estado=random.choice(['Pagada', 'Pendiente', 'Pendiente', 'Anulada'])
+        ))
+        for _ in range(random.randint(1, 4)):
+            cantidad = random.randint(1, 5)
+            precio = random.choice([1.25, 9.99, 20.5, 3.1])
+            detalles.append(dict(
+                factura_id=i, producto_id=int(random.paretovariate(1.2)) % PRODUCTOS + 1,
+                tipo_item='Producto', descripcion='Producto', cantidad=cantidad,
+                precio_unitario=precio, subtotal=round(cantidad * precio, 2)
+            ))
+    db.session.execute(insert(Factura), facturas)
+    db.session.execute(insert(DetalleFactura), detalles)
+    filas = ProductoVendidoDiario.reconstruir()
+    db.session.commit()
+    print(f'{FACTURAS} facturas, {len(detalles)} líneas, {filas} filas de resumen')
+
+def en_vivo(desde, hasta, limite):
+    """Consulta anterior del reporte: join y GROUP BY sobre todos los detalles del rango"""
+    return db.session.query(
+        DetalleFactura.producto_id,
+        func.sum(DetalleFactura.cantidad),
+        func.sum(DetalleFactura.subtotal)
+    ).join(
+        Factura, DetalleFactura.factura_id == Factura.factura_id
+    ).filter(
+        DetalleFactura.tipo_item == 'Producto',
+        Factura.fecha_factura.between(desde, hasta),
+        Factura.estado != 'Anulada'
+    ).group_by(
+        DetalleFactura.producto_id
+    ).order_by(
+        func.sum(DetalleFactura.cantidad).desc(), DetalleFactura.producto_id
+    ).limit(limite).all()
+
+def normalizar(filas):
+    return [(producto_id, int(cantidad), round(float(monto), 2)) for producto_id, cantidad, monto in filas]
+
+def main():
+    app = crear_app()
+    headers = encabezados_admin(app)
+    with app.app_context():
+        poblar()
+        for desde, hasta, limite in RANGOS:
+            iguales = normalizar(en_vivo(desde, hasta, limite)) == normalizar(
+                ProductoVendidoDiario.top(desde, hasta, limite))
+            vivo = medir(lambda: en_vivo(desde, hasta, limite))
+            resumen = medir(lambda: ProductoVendidoDiario.top(desde, hasta, limite))
+            print(f'{desde} a {hasta} (top {limite}): en vivo {vivo:.1f} ms, '
+                  f'resumen {resumen:.1f} ms, mismo resultado: {iguales}')
+        dialecto = db.engine.dialect.name
+    
+    if dialecto == 'sqlite':
+        # La ruta filtra con las fechas ISO de la URL, que el tipo Date de SQLite no acepta
+        print('Endpoint: se mide solo con BENCH_DATABASE_URL de PostgreSQL')
+        return
+    client = app.test_client()
+    url = '/api/billing/reportes/productos-vendidos?fecha_desde=2024-01-01&fecha_hasta=2024-12-31'
+    # Sin la caché de respuestas: se mide la consulta y la serialización
+    tiempo = medir(lambda: client.get(url, headers=headers), antes=response_cache.clear)
+    print(f'Endpoint (año completo, sin caché de respuestas): {tiempo:.1f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Codificación de respuestas: proveedor JSON de Flask vs. ``JSONProvider`` (stdlib y orjson).
+
+Mide la página de 100 consultas de ``/api/medical/consultas``: solo la
+codificación del payload y la petición completa con el cliente de pruebas.
+"""
+import json
+import time
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import Cliente, Consulta, HistoriaClinica, Mascota, Veterinario
+from app.utils import json_provider
+from app.utils.json_provider import JSONProvider
+from benchmarks._comun import crear_app, encabezados_admin
+
+URL = '/api/medical/consultas?per_page=100'
+
+def poblar():
+    veterinario = Veterinario(nombre='Ana', apellidos='Vet')
+    cliente = Cliente(nombre='Cliente', apellidos='Benchmark', documento_identidad='BENCH-1')
+    db.session.add_all([veterinario, cliente])
+    db.session.flush()
+    mascota = Mascota(cliente_id=cliente.cliente_id, nombre='Mascota', especie='Perro', sexo='Macho',
+                      fecha_nacimiento=date(2020, 1, 1))
+    db.session.add(mascota)
+    db.session.flush()
+    historia = HistoriaClinica(mascota_id=mascota.mascota_id)
+    db.session.add(historia)
+    db.session.flush()
+    db.session.execute(insert(Consulta), [
+        dict(historia_id=historia.historia_id, veterinario_id=veterinario.veterinario_id,
+             fecha_consulta=date(2024, 1, 1) + timedelta(days=i % 300), hora_consulta=dtime(9, 30),
+             motivo_consulta='Revisión anual del paciente',
+             diagnostico='Otitis externa leve, tratamiento tópico',
+             inspeccion_general='Paciente alerta, mucosas rosadas', temperatura=Decimal('38.5'),
+             pulso=90, peso=Decimal('4.1'), observaciones='Control en 15 días',
+             costo_consulta=Decimal('50'))
+        for i in range(100)
+    ])
+    db.session.commit()
+
+def por_segundo(funcion, n):
+    inicio = time.perf_counter()
+    for _ in range(n):
+        funcion()
+    return n / (time.perf_counter() - inicio)
+
+def main():
+    app = crear_app()
+    headers = encabezados_admin(app)
+    with app.app_context():
+        poblar()
+    client = app.test_client()
+    
+    proveedores = {'Flask por defecto': DefaultJSONProvider(app), 'JSONProvider stdlib': JSONProvider(app)}
+    proveedores['JSONProvider stdlib'].fast = False
+    if json_provider.orjson is not None:
+        proveedores['JSONProvider orjson'] = JSONProvider(app)
+    
+    cuerpos = {}
+    for nombre, proveedor in proveedores.items():
+        app.json = proveedor
+        cuerpos[nombre] = client.get(URL, headers=headers).data
+        payload = json.loads(cuerpos[nombre])
+        with app.app_context():
+            codificacion = por_segundo(lambda: proveedor.response(payload), 2000)
+        peticiones = por_segundo(lambda: client.get(URL, headers=headers), 300)
+        print(f'{nombre:20s} codificación {codificacion:8,.0f}/s  petición {peticiones:6,.0f}/s  '
+              f'{len(cuerpos[nombre]):,} bytes')
+    
+    decodificados = {json.dumps(json.loads(c), sort_keys=True) for c in cuerpos.values()}
+    print(f'Mismo JSON en todos los proveedores: {len(decodificados) == 1}')
+
+if __name__ == '__main__':
+    main()
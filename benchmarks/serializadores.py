@@ -0,0 +1,93 @@
+"""Serialización de listados: ``to_dict()`` sobre objetos ORM vs. ``row_serializer()``.
+
+Genera 5.000 consultas, citas y productos, verifica que ambos caminos
+producen los mismos diccionarios y mide filas por segundo de cada uno.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models import (CategoriaProducto, Cita, Cliente, Consulta, HistoriaClinica,
+                        Mascota, Producto, Veterinario)
+from benchmarks._comun import crear_app, medir
+
+FILAS = 5000
+
+def poblar():
+    db.session.add_all([Veterinario(nombre='Ana', apellidos='Vet'), Veterinario(nombre='Bo', apellidos='Vet')])
+    db.session.execute(insert(Cliente), [
+        dict(nombre=f'Cliente {i}', apellidos='Benchmark', documento_identidad=f'BENCH-{i}')
+        for i in range(500)
+    ])
+    db.session.execute(insert(Mascota), [
+        dict(cliente_id=1 + i % 500, nombre=f'Mascota {i}', especie='Perro', sexo='Macho',
+             fecha_nacimiento=date(2015, 1, 1) + timedelta(days=i % 2000), peso_actual=Decimal('4.5'))
+        for i in range(1000)
+    ])
+    db.session.execute(insert(HistoriaClinica), [dict(mascota_id=1 + i) for i in range(600)])
+    db.session.execute(insert(CategoriaProducto), [dict(nombre_categoria=f'Categoría {i}') for i in range(10)])
+    db.session.execute(insert(Producto), [
+        dict(categoria_id=(1 + i % 10) if i % 3 else None, codigo_producto=f'P-{i}', nombre=f'Producto {i}',
+             precio_venta=Decimal('10.50'), precio_compra=Decimal('5'), stock_actual=i % 50,
+             stock_minimo=3, fecha_vencimiento=date(2030, 1, 1))
+        for i in range(FILAS)
+    ])
+    db.session.execute(insert(Consulta), [
+        dict(historia_id=1 + i % 600, veterinario_id=1 + i % 2,
+             fecha_consulta=date(2024, 1, 1) + timedelta(days=i % 300), hora_consulta=time(9, 30),
+             motivo_consulta='Control', diagnostico='Sano', temperatura=Decimal('38.5'),
+             peso=Decimal('4.1'), costo_consulta=Decimal('50'))
+        for i in range(FILAS)
+    ])
+    db.session.execute(insert(Cita), [
+        dict(cliente_id=1 + i % 500, mascota_id=1 + i % 1000, veterinario_id=1 + i % 2,
+             fecha_cita=date(2024, 1, 1) + timedelta(days=i % 300), hora_cita=time(8 + i % 10),
+             motivo='Control', estado='Programada', fecha_creacion=datetime(2024, 1, 1))
+        for i in range(FILAS)
+    ])
+    db.session.commit()
+
+def consultas_to_dict():
+    return [c.to_dict() for c in Consulta.query.all()]
+
+def productos_to_dict():
+    return [p.to_dict() for p in Producto.query.options(joinedload(Producto.categoria)).all()]
+
+def citas_to_dict():
+    """Camino anterior de las citas: joinedload de las relaciones anidadas"""
+    citas = Cita.query.options(
+        joinedload(Cita.cliente),
+        joinedload(Cita.veterinario),
+        joinedload(Cita.mascota).joinedload(Mascota.propietario),
+        joinedload(Cita.mascota).joinedload(Mascota.historia_clinica)
+    ).all()
+    Cliente.preload_total_mascotas([c.cliente for c in citas] + [c.mascota.propietario for c in citas])
+    return [c.to_dict() for c in citas]
+
+def con_row_serializer(model):
+    serializer = model.row_serializer()
+    return lambda: serializer.serialize_many(serializer.select(model.query).all())
+
+def main():
+    app = crear_app()
+    with app.app_context():
+        poblar()
+        casos = (
+            ('Consulta', 'consulta_id', consultas_to_dict, con_row_serializer(Consulta)),
+            ('Cita', 'cita_id', citas_to_dict, con_row_serializer(Cita)),
+            ('Producto', 'producto_id', productos_to_dict, con_row_serializer(Producto)),
+        )
+        for nombre, llave, anterior, nuevo in casos:
+            orden = lambda filas: sorted(filas, key=lambda d: d[llave])
+            iguales = orden(anterior()) == orden(nuevo())
+            tiempos = [medir(f, antes=db.session.expunge_all) for f in (anterior, nuevo)]
+            por_segundo = [FILAS / (ms / 1000) for ms in tiempos]
+            print(f'{nombre}: to_dict {por_segundo[0]:,.0f} filas/s, row_serializer '
+                  f'{por_segundo[1]:,.0f} filas/s (x{por_segundo[1] / por_segundo[0]:.1f}), '
+                  f'mismo resultado: {iguales}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Duración y servicio de las citas, con índice por veterinario y fecha
+
+Revision ID: 12079d8a38ec
+Revises: 4ef6d0d2f35e
+Create Date: 2026-10-17 11:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '12079d8a38ec'
+down_revision = '4ef6d0d2f35e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('citas') as batch:
+            batch.add_column(sa.Column('servicio_id', sa.Integer(), nullable=True))
+            batch.add_column(sa.Column('duracion', sa.Integer(), server_default='30', nullable=False))
+            batch.create_foreign_key('citas_servicio_id_fkey', 'tipos_servicios',
+                                     ['servicio_id'], ['servicio_id'])
+            batch.create_check_constraint('check_duracion_cita', 'duracion BETWEEN 1 AND 480')
+            batch.drop_index('idx_citas_veterinario')
+            batch.create_index('idx_citas_veterinario_fecha', ['veterinario_id', 'fecha_cita', 'hora_cita'])
+        return
+    
+    # Columnas con DEFAULT constante: sin reescribir la tabla
+    op.add_column('citas', sa.Column('servicio_id', sa.Integer(), nullable=True))
+    op.add_column('citas', sa.Column('duracion', sa.Integer(), server_default='30', nullable=False))
+    # NOT VALID + VALIDATE: la validación no bloquea las escrituras sobre citas
+    op.execute('ALTER TABLE citas ADD CONSTRAINT citas_servicio_id_fkey FOREIGN KEY (servicio_id)'
+               ' REFERENCES tipos_servicios (servicio_id) NOT VALID')
+    op.execute('ALTER TABLE citas ADD CONSTRAINT check_duracion_cita'
+               ' CHECK (duracion BETWEEN 1 AND 480) NOT VALID')
+    op.execute('ALTER TABLE citas VALIDATE CONSTRAINT citas_servicio_id_fkey')
+    op.execute('ALTER TABLE citas VALIDATE CONSTRAINT check_duracion_cita')
+    
+    with op.get_context().autocommit_block():
+        op.create_index('idx_citas_veterinario_fecha', 'citas', ['veterinario_id', 'fecha_cita', 'hora_cita'],
+                        if_not_exists=True, postgresql_concurrently=True)
+        # Cubierto por el prefijo veterinario_id del índice nuevo
+        op.drop_index('idx_citas_veterinario', table_name='citas', if_exists=True,
+                      postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('citas') as batch:
+            batch.drop_index('idx_citas_veterinario_fecha')
+            batch.create_index('idx_citas_veterinario', ['veterinario_id'])
+            batch.drop_constraint('check_duracion_cita', type_='check')
+            batch.drop_constraint('citas_servicio_id_fkey', type_='foreignkey')
+            batch.drop_column('duracion')
+            batch.drop_column('servicio_id')
+        return
+    
+    with op.get_context().autocommit_block():
+        op.create_index('idx_citas_veterinario', 'citas', ['veterinario_id'],
+                        if_not_exists=True, postgresql_concurrently=True)
+        op.drop_index('idx_citas_veterinario_fecha', table_name='citas', if_exists=True,
+                      postgresql_concurrently=True)
+    op.drop_constraint('check_duracion_cita', 'citas', type_='check')
+    op.drop_constraint('citas_servicio_id_fkey', 'citas', type_='foreignkey')
+    op.drop_column('citas', 'duracion')
+    op.drop_column('citas', 'servicio_id')
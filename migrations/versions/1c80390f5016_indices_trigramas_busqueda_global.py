@@ -0,0 +1,44 @@
+"""Índices de trigramas (pg_trgm) para la búsqueda global de productos y facturas
+
+Revision ID: 1c80390f5016
+Revises: 68f0ce081af7
+Create Date: 2026-10-17 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c80390f5016'
+down_revision = '68f0ce081af7'
+branch_labels = None
+depends_on = None
+
+INDICES = (
+    ('idx_productos_nombre_trgm', 'productos', 'nombre'),
+    ('idx_productos_codigo_trgm', 'productos', 'codigo_producto'),
+    ('idx_productos_laboratorio_trgm', 'productos', 'laboratorio'),
+    ('idx_facturas_numero_trgm', 'facturas', 'numero_factura'),
+)
+
+
+def upgrade():
+    # /api/search filtra productos con <% / ILIKE y facturas con ILIKE '%término%'
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columna in INDICES:
+            op.create_index(nombre, tabla, [columna], if_not_exists=True,
+                            postgresql_using='gin', postgresql_ops={columna: 'gin_trgm_ops'},
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _ in INDICES:
+            op.drop_index(nombre, table_name=tabla, if_exists=True,
+                          postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""Tabla series_factura para la numeración consecutiva de facturas
+
+Revision ID: 21e1df069a19
+Revises: 1c80390f5016
+Create Date: 2026-10-17 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '21e1df069a19'
+down_revision = '1c80390f5016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'series_factura',
+        sa.Column('prefijo', sa.String(length=10), nullable=False),
+        sa.Column('ultimo_numero', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('prefijo')
+    )
+    # La serie FAC continúa desde la última factura emitida con el generador anterior
+    if op.get_bind().dialect.name == 'postgresql':
+        numero = "CAST(substring(numero_factura FROM '^FAC-([0-9]+)$') AS INTEGER)"
+    else:
+        numero = "CAST(substr(numero_factura, 5) AS INTEGER)"
+    op.execute(
+        "INSERT INTO series_factura (prefijo, ultimo_numero) "
+        f"SELECT 'FAC', COALESCE(MAX({numero}), 0) FROM facturas "
+        "WHERE numero_factura LIKE 'FAC-%'"
+    )
+
+
+def downgrade():
+    op.drop_table('series_factura')
@@ -0,0 +1,37 @@
+"""Índices de la paginación por cursor (keyset)
+
+Revision ID: 4318a982269f
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4318a982269f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDICES = (
+    ('idx_citas_fecha_id', 'citas', ['fecha_cita', 'hora_cita', 'cita_id']),
+    ('idx_facturas_fecha_id', 'facturas', ['fecha_factura', 'factura_id']),
+    ('idx_movimientos_fecha_id', 'movimientos_inventario', ['fecha_movimiento', 'movimiento_id']),
+)
+
+
+def upgrade():
+    # CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas in INDICES:
+            op.create_index(nombre, tabla, columnas, if_not_exists=True,
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _ in INDICES:
+            op.drop_index(nombre, table_name=tabla, if_exists=True,
+                          postgresql_concurrently=True)
@@ -0,0 +1,30 @@
+"""Tabla versiones_tablas para los ETags de las respuestas GET
+
+Revision ID: 4ef6d0d2f35e
+Revises: 81aa02c36df0
+Create Date: 2026-10-17 11:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4ef6d0d2f35e'
+down_revision = '81aa02c36df0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sin filas iniciales: cada tabla se registra con su primer cambio (versión 0 hasta entonces)
+    op.create_table(
+        'versiones_tablas',
+        sa.Column('tabla', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('tabla')
+    )
+
+
+def downgrade():
+    op.drop_table('versiones_tablas')
@@ -0,0 +1,47 @@
+"""Índices de trigramas (pg_trgm) para la búsqueda de clientes y mascotas
+
+Revision ID: 68f0ce081af7
+Revises: 4318a982269f
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '68f0ce081af7'
+down_revision = '4318a982269f'
+branch_labels = None
+depends_on = None
+
+INDICES = (
+    ('idx_clientes_nombre_trgm', 'clientes', 'nombre'),
+    ('idx_clientes_apellidos_trgm', 'clientes', 'apellidos'),
+    ('idx_clientes_documento_trgm', 'clientes', 'documento_identidad'),
+    ('idx_clientes_telefono_trgm', 'clientes', 'telefono'),
+    ('idx_clientes_email_trgm', 'clientes', 'email'),
+    ('idx_mascotas_nombre_trgm', 'mascotas', 'nombre'),
+    ('idx_mascotas_microchip_trgm', 'mascotas', 'microchip'),
+)
+
+
+def upgrade():
+    # Los operadores <% e ILIKE de ranked_search usan estos índices GIN
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columna in INDICES:
+            op.create_index(nombre, tabla, [columna], if_not_exists=True,
+                            postgresql_using='gin', postgresql_ops={columna: 'gin_trgm_ops'},
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _ in INDICES:
+            op.drop_index(nombre, table_name=tabla, if_exists=True,
+                          postgresql_concurrently=True)
@@ -0,0 +1,43 @@
+"""Tabla de resumen productos_vendidos_diarios, poblada desde las facturas existentes
+
+Revision ID: 81aa02c36df0
+Revises: 99b0f0841b43
+Create Date: 2026-10-17 10:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '81aa02c36df0'
+down_revision = '99b0f0841b43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'productos_vendidos_diarios',
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('producto_id', sa.Integer(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.Column('monto', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['producto_id'], ['productos.producto_id']),
+        sa.PrimaryKeyConstraint('fecha', 'producto_id')
+    )
+    op.create_index('idx_productos_vendidos_diarios_producto', 'productos_vendidos_diarios',
+                    ['producto_id'])
+    # Mismo agregado que ProductoVendidoDiario.reconstruir(): líneas de producto de facturas no anuladas
+    op.execute(
+        "INSERT INTO productos_vendidos_diarios (fecha, producto_id, cantidad, monto) "
+        "SELECT f.fecha_factura, d.producto_id, SUM(d.cantidad), SUM(d.subtotal) "
+        "FROM detalles_factura d JOIN facturas f ON d.factura_id = f.factura_id "
+        "WHERE d.tipo_item = 'Producto' AND d.producto_id IS NOT NULL AND COALESCE(f.estado, 'Pendiente') != 'Anulada' "
+        "GROUP BY f.fecha_factura, d.producto_id"
+    )
+
+
+def downgrade():
+    op.drop_index('idx_productos_vendidos_diarios_producto', table_name='productos_vendidos_diarios')
+    op.drop_table('productos_vendidos_diarios')
@@ -0,0 +1,42 @@
+"""Tabla de resumen ventas_diarias, poblada desde las facturas existentes
+
+Revision ID: 99b0f0841b43
+Revises: 21e1df069a19
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '99b0f0841b43'
+down_revision = '21e1df069a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ventas_diarias',
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('metodo_pago', sa.String(length=20), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.Column('subtotal', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('impuestos', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('fecha', 'metodo_pago', 'estado')
+    )
+    # Mismo agregado que VentaDiaria.reconstruir(): los reportes leen la tabla desde el primer día
+    op.execute(
+        "INSERT INTO ventas_diarias (fecha, metodo_pago, estado, cantidad, subtotal, impuestos, total) "
+        "SELECT fecha_factura, metodo_pago, COALESCE(estado, 'Pendiente'), COUNT(factura_id), "
+        "COALESCE(SUM(subtotal), 0), COALESCE(SUM(impuestos), 0), COALESCE(SUM(total), 0) "
+        "FROM facturas "
+        "GROUP BY fecha_factura, metodo_pago, COALESCE(estado, 'Pendiente')"
+    )
+
+
+def downgrade():
+    op.drop_table('ventas_diarias')
@@ -0,0 +1,121 @@
+import os
+from contextlib import contextmanager
+from datetime import date, time
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, text
+
+from app import create_app
+from app.config import config, TestingConfig
+from app.extensions import db
+from app.models import User, Cliente, Mascota, Veterinario, Cita
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def app_pg():
+    """App sobre la base PostgreSQL de ``TEST_DATABASE_URL``; se omite la prueba si no hay.
+    
+    Para las pruebas de bloqueos y concurrencia, que SQLite no puede
+    reproducir. Se crean y eliminan todas las tablas.
+    """
+    url = os.environ.get('TEST_DATABASE_URL', '')
+    if not url.startswith('postgresql'):
+        pytest.skip('requiere TEST_DATABASE_URL de PostgreSQL')
+    
+    class PostgresTestingConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = url
+    
+    config['testing-postgresql'] = PostgresTestingConfig
+    try:
+        app = create_app('testing-postgresql')
+    finally:
+        del config['testing-postgresql']
+    with app.app_context():
+        db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        db.session.commit()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def admin(app):
+    user = User(
+        username='admin', email='admin@zoopecas.test',
+        nombre='Admin', apellidos='Pruebas', rol='Administrador'
+    )
+    user.set_password('Admin123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def auth_headers(admin):
+    token = create_access_token(identity=str(admin.usuario_id))
+    return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def crear_citas(app):
+    """Crear ``n`` citas, cada una con su cliente y mascota, para un veterinario"""
+    def crear(n, fecha=None):
+        veterinario = Veterinario(nombre='Ana', apellidos='Pérez')
+        db.session.add(veterinario)
+        db.session.flush()
+        citas = []
+        for i in range(n):
+            cliente = Cliente(nombre=f'Cliente {i}', apellidos='Pruebas', documento_identidad=f'DOC-{i}')
+            db.session.add(cliente)
+            db.session.flush()
+            mascota = Mascota(
+                cliente_id=cliente.cliente_id, nombre=f'Mascota {i}', especie='Perro',
+                sexo='Macho', fecha_nacimiento=date(2020, 1, 1)
+            )
+            db.session.add(mascota)
+            db.session.flush()
+            citas.append(Cita(
+                cliente_id=cliente.cliente_id, mascota_id=mascota.mascota_id,
+                veterinario_id=veterinario.veterinario_id, fecha_cita=fecha or date.today(),
+                hora_cita=time(8 + i % 10, 30 * (i // 10 % 2)), motivo='Control general'
+            ))
+        db.session.add_all(citas)
+        db.session.commit()
+        return citas
+    return crear
+
+@pytest.fixture
+def contar_consultas(app):
+    """Context manager que cuenta las sentencias SQL ejecutadas dentro del bloque.
+    
+    Los commits de la sesión (que el driver no ejecuta como sentencia) se
+    registran como ``'COMMIT'``; los de ``VersionTabla.incrementar``, que usa
+    su propia conexión, no.
+    """
+    @contextmanager
+    def contar():
+        sentencias = []
+        
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+        
+        def registrar_commit(session):
+            # También se llama al liberar un SAVEPOINT: solo cuenta el commit real
+            if not session.in_nested_transaction():
+                sentencias.append('COMMIT')
+        
+        event.listen(db.engine, 'before_cursor_execute', registrar)
+        event.listen(db.session, 'after_commit', registrar_commit)
+        try:
+            yield sentencias
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', registrar)
+            event.remove(db.session, 'after_commit', registrar_commit)
+    return contar
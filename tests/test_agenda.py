@@ -0,0 +1,67 @@
+from datetime import date
+
+from app.extensions import db, agenda_cache
+from app.utils import agenda
+
+def estados_hoy(client, auth_headers):
+    respuesta = client.get('/api/appointments/hoy', headers=auth_headers)
+    assert respuesta.status_code == 200
+    return {cita['cita_id']: cita['estado'] for cita in respuesta.get_json()['data']}
+
+def test_hoy_refleja_cancelaciones(client, auth_headers, crear_citas):
+    agenda_cache.clear()
+    citas = [cita.cita_id for cita in crear_citas(3)]
+    assert list(estados_hoy(client, auth_headers)) == citas
+    
+    assert client.post(f'/api/appointments/{citas[0]}/cancelar', headers=auth_headers).status_code == 200
+    assert estados_hoy(client, auth_headers)[citas[0]] == 'Cancelada'
+
+def test_lectura_anterior_a_un_cambio_no_queda_vigente(app, crear_citas, monkeypatch):
+    """Una consulta que leyó la agenda antes de que se confirmara un cambio no
+    debe quedar en la caché aunque el día no estuviera guardado al cambiar."""
+    agenda_cache.clear()
+    citas = crear_citas(2)
+    cancelada = citas[0].cita_id
+    serializar = agenda._serializar
+    
+    def serializar_y_cancelar(query):
+        # La lectura ve la cita activa; justo después otro worker la cancela
+        monkeypatch.setattr(agenda, '_serializar', serializar)
+        leidas = serializar(query)
+        citas[0].activa = False
+        db.session.commit()
+        agenda.actualizar([cancelada])
+        return leidas
+    
+    monkeypatch.setattr(agenda, '_serializar', serializar_y_cancelar)
+    hoy = date.today()
+    [(_, antigua)] = agenda.dias(hoy, hoy)
+    assert cancelada in [cita['cita_id'] for cita in antigua['citas']]
+    
+    [(_, entrada)] = agenda.dias(hoy, hoy)
+    assert entrada['version'] != antigua['version']
+    assert [cita['cita_id'] for cita in entrada['citas']] == [citas[1].cita_id]
+
+def test_error_de_la_cache_no_falla_una_cita_ya_guardada(client, auth_headers, crear_citas, monkeypatch):
+    agenda_cache.clear()
+    cita = crear_citas(1)[0]
+    datos = {
+        'cliente_id': cita.cliente_id, 'mascota_id': cita.mascota_id, 'veterinario_id': cita.veterinario_id,
+        'fecha_cita': date.today().isoformat(), 'hora_cita': '15:00', 'motivo': 'Control general'
+    }
+    assert list(estados_hoy(client, auth_headers)) == [cita.cita_id]
+    
+    def falla(*args, **kwargs):
+        raise ConnectionError('backend de caché caído')
+    
+    monkeypatch.setattr(agenda, 'actualizar', falla)
+    response = client.post('/api/appointments', headers=auth_headers, json=datos)
+    assert response.status_code == 201
+    nueva = response.get_json()['data']['cita_id']
+    # La agenda se descartó: la próxima lectura la arma con la cita nueva
+    assert list(estados_hoy(client, auth_headers)) == [cita.cita_id, nueva]
+    
+    monkeypatch.setattr(agenda_cache, 'clear', falla)
+    response = client.post(f'/api/appointments/{nueva}/cancelar', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['data']['estado'] == 'Cancelada'
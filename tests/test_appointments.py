@@ -0,0 +1,265 @@
+import calendar
+import threading
+import time as reloj
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.api.appointments import routes
+from app.extensions import db, response_cache
+from app.models import Cita, Cliente, Mascota, Veterinario
+from app.models.medical import TipoServicio
+
+DIA = date.today() + timedelta(days=3)
+
+# Consultas de una página del listado de citas, sin importar su tamaño: versiones
+# de tablas (ETag), COUNT, filas de la página y una por relación anidada (cliente,
+# mascota, propietario de la mascota y veterinario)
+MAX_CONSULTAS_LISTADO = 7
+
+@pytest.mark.parametrize('per_page', [5, 20])
+def test_listado_citas_consultas_acotadas(client, auth_headers, crear_citas, contar_consultas, per_page):
+    crear_citas(per_page)
+    
+    with contar_consultas() as sentencias:
+        response = client.get(f'/api/appointments?per_page={per_page}', headers=auth_headers)
+    
+    assert response.status_code == 200
+    citas = response.get_json()['data']['citas']
+    assert len(citas) == per_page
+    assert all(c['cliente'] and c['mascota'] and c['veterinario'] for c in citas)
+    assert len(sentencias) <= MAX_CONSULTAS_LISTADO, sentencias
+
+def test_listado_citas_consultas_no_crecen_con_la_pagina(client, auth_headers, crear_citas, contar_consultas):
+    crear_citas(20)
+    
+    totales = []
+    for per_page in (2, 20):
+        with contar_consultas() as sentencias:
+            response = client.get(f'/api/appointments?per_page={per_page}', headers=auth_headers)
+        assert response.status_code == 200
+        totales.append(len(sentencias))
+    
+    assert totales[0] == totales[1]
+
+@pytest.fixture
+def reservar(client, auth_headers, crear_citas):
+    """POST de una cita (del cliente, mascota y veterinario de una cita a las 8:00)"""
+    base = crear_citas(1, fecha=DIA)[0]
+    
+    def reservar(hora, **datos):
+        return client.post('/api/appointments', headers=auth_headers, json={
+            'cliente_id': base.cliente_id, 'mascota_id': base.mascota_id,
+            'veterinario_id': base.veterinario_id, 'fecha_cita': DIA.isoformat(),
+            'hora_cita': hora, 'motivo': 'Control general', **datos
+        })
+    return reservar
+
+def actualizar(client, auth_headers, cita_id, **datos):
+    return client.put(f'/api/appointments/{cita_id}', headers=auth_headers, json=datos)
+
+@pytest.fixture
+def cache_vacia(app):
+    # La caché es del proceso: una base recién creada repite las versiones de las tablas
+    response_cache.clear()
+
+def calendario(client, auth_headers, consulta='', fecha=DIA):
+    response = client.get(f'/api/appointments/calendario?vista=semana&fecha={fecha}{consulta}', headers=auth_headers)
+    assert response.status_code == 200
+    return response
+
+def test_calendario_cuenta_por_dia_veterinario_y_estado(client, auth_headers, crear_citas, cache_vacia):
+    lunes = date(2030, 6, 3)
+    citas = crear_citas(4, fecha=lunes)
+    citas[1].estado = 'Confirmada'
+    citas[3].fecha_cita = lunes + timedelta(days=2)
+    db.session.add(Cita(cliente_id=citas[0].cliente_id, mascota_id=citas[0].mascota_id,
+                        fecha_cita=lunes, hora_cita=time(9), motivo='Sin veterinario'))
+    db.session.commit()
+    
+    data = calendario(client, auth_headers, fecha=lunes + timedelta(days=4)).get_json()['data']
+    
+    assert (data['fecha_desde'], data['fecha_hasta']) == ('2030-06-03', '2030-06-09')
+    assert data['total'] == 5
+    assert data['estados'] == {'Programada': 4, 'Confirmada': 1}
+    assert [d['total'] for d in data['dias']] == [4, 0, 1, 0, 0, 0, 0]
+    veterinario_id = citas[0].veterinario_id
+    assert data['dias'][0]['veterinarios'] == [
+        {'veterinario_id': veterinario_id, 'total': 3, 'estados': {'Programada': 2, 'Confirmada': 1}},
+        {'veterinario_id': None, 'total': 1, 'estados': {'Programada': 1}},
+    ]
+    assert data['dias'][2]['veterinarios'] == [
+        {'veterinario_id': veterinario_id, 'total': 1, 'estados': {'Programada': 1}}
+    ]
+
+def test_calendario_citas_compactas_aunque_se_pidan_relaciones(client, auth_headers, crear_citas, cache_vacia):
+    cita = crear_citas(1, fecha=DIA)[0]
+    
+    citas = calendario(client, auth_headers, '&citas=1&fields=cliente,mascota,estado').get_json()['data']['citas']
+    assert citas == [{'estado': 'Programada'}]
+    
+    citas = calendario(client, auth_headers, '&citas=1').get_json()['data']['citas']
+    assert set(citas[0]) == set(routes.CAMPOS_COMPACTOS)
+    assert citas[0]['cita_id'] == cita.cita_id
+
+def test_calendario_se_invalida_con_cambios_en_citas(client, auth_headers, reservar, cache_vacia):
+    primera = calendario(client, auth_headers, '&citas=1')
+    assert calendario(client, auth_headers, '&citas=1').headers['X-Cache'] == 'HIT'
+    
+    cita_id = reservar('10:00').get_json()['data']['cita_id']
+    segunda = calendario(client, auth_headers, '&citas=1')
+    assert segunda.headers['X-Cache'] == 'MISS'
+    assert segunda.get_json()['data']['total'] == primera.get_json()['data']['total'] + 1
+    
+    client.post(f'/api/appointments/{cita_id}/cancelar', headers=auth_headers)
+    tercera = calendario(client, auth_headers, '&citas=1').get_json()['data']
+    assert tercera['estados']['Cancelada'] == 1
+
+def test_cita_larga_bloquea_los_horarios_que_cubre(reservar):
+    larga = reservar('10:00', duracion=90)
+    assert larga.status_code == 201, larga.get_json()
+    
+    rechazada = reservar('10:30')
+    assert rechazada.status_code == 400
+    assert rechazada.get_json()['errors'] == [
+        {'cita_id': larga.get_json()['data']['cita_id'], 'hora_cita': '10:00', 'duracion': 90}
+    ]
+    assert reservar('11:00').status_code == 400
+    assert reservar('09:45', duracion=30).status_code == 400
+    assert reservar('11:30').status_code == 201
+    assert reservar('09:30').status_code == 201
+
+def test_actualizar_excluye_la_propia_cita(client, auth_headers, reservar):
+    cita_id = reservar('10:00', duracion=60).get_json()['data']['cita_id']
+    reservar('11:30')
+    
+    assert actualizar(client, auth_headers, cita_id, hora_cita='10:15').status_code == 200
+    assert actualizar(client, auth_headers, cita_id, duracion=75).status_code == 200
+    assert actualizar(client, auth_headers, cita_id, duracion=90).status_code == 400
+
+def test_volver_a_programada_verifica_solapamientos(client, auth_headers, reservar):
+    cita_id = reservar('10:00').get_json()['data']['cita_id']
+    assert client.post(f'/api/appointments/{cita_id}/cancelar', headers=auth_headers).status_code == 200
+    assert reservar('10:00').status_code == 201
+    
+    response = actualizar(client, auth_headers, cita_id, estado='Programada')
+    assert response.status_code == 400
+    db.session.expire_all()
+    assert db.session.get(Cita, cita_id).estado == 'Cancelada'
+    
+    assert actualizar(client, auth_headers, cita_id, estado='Programada', hora_cita='14:00').status_code == 200
+
+def test_duracion_por_defecto_del_servicio(reservar):
+    servicio = TipoServicio(nombre_servicio='Cirugía menor', duracion_estimada=60)
+    db.session.add(servicio)
+    db.session.commit()
+    
+    response = reservar('10:00', servicio_id=servicio.servicio_id)
+    assert response.status_code == 201
+    assert response.get_json()['data']['duracion'] == 60
+    assert reservar('10:30').status_code == 400
+    assert reservar('11:00').get_json()['data']['duracion'] == 30
+    assert reservar('12:00', servicio_id=servicio.servicio_id, duracion=15).get_json()['data']['duracion'] == 15
+    assert reservar('13:00', servicio_id=9999).status_code == 404
+
+@pytest.fixture
+def serie(client, auth_headers, crear_citas):
+    """POST de una serie a las 8:00 del veterinario de dos citas existentes: DIA 8:00 y DIA + 14 días 8:15"""
+    existentes = crear_citas(2, fecha=DIA)
+    existentes[1].fecha_cita = DIA + timedelta(days=14)
+    existentes[1].hora_cita = time(8, 15)
+    db.session.commit()
+    base = {
+        'cliente_id': existentes[0].cliente_id, 'mascota_id': existentes[0].mascota_id,
+        'veterinario_id': existentes[0].veterinario_id
+    }
+    
+    def serie(**datos):
+        return client.post('/api/appointments/serie', headers=auth_headers, json={
+            **base, 'hora_cita': '08:00', 'motivo': 'Control semanal', **datos
+        })
+    return serie
+
+def test_serie_con_conflictos_no_crea_ninguna(serie):
+    response = serie(fecha_cita=DIA.isoformat(), repeticiones=4, unidad='semanas')
+    
+    assert response.status_code == 400
+    conflictos = response.get_json()['errors']['conflictos']
+    assert [c['fecha_cita'] for c in conflictos] == [DIA.isoformat(), (DIA + timedelta(days=14)).isoformat()]
+    assert conflictos[1]['conflictos'][0]['hora_cita'] == '08:15'
+    assert Cita.query.count() == 2
+
+def test_serie_parcial_crea_las_fechas_libres(serie):
+    response = serie(fecha_cita=DIA.isoformat(), repeticiones=4, unidad='semanas', parcial=True)
+    
+    assert response.status_code == 201
+    data = response.get_json()['data']
+    assert [c['fecha_cita'] for c in data['creadas']] == [
+        (DIA + timedelta(days=7)).isoformat(), (DIA + timedelta(days=21)).isoformat()
+    ]
+    assert len(data['conflictos']) == 2
+    assert Cita.query.count() == 4
+
+def test_serie_mensual_desde_el_31_cae_en_fin_de_mes(serie):
+    inicio = date(DIA.year + 1, 1, 31)
+    response = serie(fecha_cita=inicio.isoformat(), repeticiones=4, unidad='meses')
+    
+    assert response.status_code == 201
+    febrero = calendar.monthrange(inicio.year, 2)[1]
+    assert [c['fecha_cita'] for c in response.get_json()['data']['creadas']] == [
+        f'{inicio.year}-01-31', f'{inicio.year}-02-{febrero}', f'{inicio.year}-03-31', f'{inicio.year}-04-30'
+    ]
+
+def test_serie_verifica_la_agenda_con_una_consulta(serie, contar_consultas):
+    with contar_consultas() as sentencias:
+        response = serie(fecha_cita=DIA.isoformat(), repeticiones=12, unidad='semanas', parcial=True)
+    
+    assert response.status_code == 201
+    antes_del_commit = sentencias[:sentencias.index('COMMIT')]
+    lecturas = [s for s in antes_del_commit if s.lstrip().startswith('SELECT') and 'FROM citas' in s]
+    assert len(lecturas) == 1, lecturas
+
+def test_reservas_simultaneas_no_se_solapan(app_pg):
+    """Dos reservas a la vez del mismo horario: el advisory lock deja pasar solo una"""
+    veterinario = Veterinario(nombre='Ana', apellidos='Pérez')
+    cliente = Cliente(nombre='Cliente', apellidos='Pruebas', documento_identidad='DOC-1')
+    db.session.add_all([veterinario, cliente])
+    db.session.flush()
+    mascota = Mascota(cliente_id=cliente.cliente_id, nombre='Firulais', especie='Perro',
+                      sexo='Macho', fecha_nacimiento=date(2020, 1, 1))
+    db.session.add(mascota)
+    db.session.commit()
+    ids = (cliente.cliente_id, mascota.mascota_id, veterinario.veterinario_id)
+    
+    creadas = []
+    errores = []
+    barrera = threading.Barrier(2)
+    
+    def reservar(hora):
+        with app_pg.app_context():
+            try:
+                barrera.wait()
+                Cita.bloquear_agenda(ids[2], DIA)
+                if not Cita.conflictos(ids[2], DIA, hora, 60):
+                    # Ventana entre verificar e insertar: sin el bloqueo ambas pasan
+                    reloj.sleep(0.2)
+                    db.session.add(Cita(cliente_id=ids[0], mascota_id=ids[1], veterinario_id=ids[2],
+                                        fecha_cita=DIA, hora_cita=hora, duracion=60, motivo='Control general'))
+                    db.session.commit()
+                    creadas.append(hora)
+                else:
+                    db.session.rollback()
+            except Exception as e:
+                errores.append(e)
+            finally:
+                db.session.remove()
+    
+    hilos = [threading.Thread(target=reservar, args=(hora,)) for hora in (time(10, 0), time(10, 30))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    
+    assert errores == []
+    assert len(creadas) == 1
+    assert Cita.query.count() == 1
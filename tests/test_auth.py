@@ -0,0 +1,71 @@
+import time
+
+from app.extensions import db, user_cache, password_hasher
+from app.models import User
+from app.models.version import VersionTabla
+from app.utils.exceptions import RateLimitError
+
+def login(client, password='Admin123!'):
+    return client.post('/api/auth/login', json={'username': 'admin', 'password': password})
+
+def test_login_no_invalida_cache_ni_version(client, admin):
+    User.get_cached(admin.usuario_id)
+    version = VersionTabla.obtener(('usuarios',))
+    
+    response = login(client)
+    
+    assert response.status_code == 200
+    assert user_cache.get(admin.usuario_id) is not None
+    assert VersionTabla.obtener(('usuarios',)) == version
+    db.session.expire_all()
+    assert db.session.get(User, admin.usuario_id).ultimo_acceso is not None
+
+def test_cambio_de_rol_invalida_cache(app, admin):
+    User.get_cached(admin.usuario_id)
+    
+    admin.update(rol='Asistente')
+    
+    assert user_cache.get(admin.usuario_id) is None
+
+def test_cambio_de_perfil_reemplaza_copia_en_cache(app, admin):
+    User.get_cached(admin.usuario_id)
+    
+    admin.update(telefono='555-0101')
+    
+    assert user_cache.get(admin.usuario_id).telefono == '555-0101'
+
+def test_registro_crea_usuario_con_contrasena(client):
+    response = client.post('/api/auth/register', json={
+        'username': 'nuevo', 'email': 'nuevo@zoopecas.test', 'password': 'Clave123!',
+        'nombre': 'Nuevo', 'apellidos': 'Usuario'
+    })
+    
+    assert response.status_code == 201
+    user = User.find_by_username('nuevo')
+    assert user.rol == 'Asistente'
+    assert user.check_password('Clave123!')
+
+def test_login_con_bcrypt_lento_responde_429(client, admin, monkeypatch):
+    def lento(*args):
+        time.sleep(0.2)
+        return True
+    monkeypatch.setattr(password_hasher.bcrypt, 'check_password_hash', lento)
+    monkeypatch.setattr(password_hasher, 'timeout', 0.01)
+    
+    response = login(client)
+    
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+
+def test_login_exitoso_aunque_falle_el_rehash(client, admin, monkeypatch):
+    monkeypatch.setattr(password_hasher, 'log_rounds', password_hasher.log_rounds + 1)
+    def saturado(password):
+        raise RateLimitError()
+    monkeypatch.setattr(password_hasher, 'generate', saturado)
+    hash_anterior = admin.password_hash
+    
+    response = login(client)
+    
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, admin.usuario_id).password_hash == hash_anterior
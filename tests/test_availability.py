@@ -0,0 +1,95 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.api.appointments import routes
+from app.extensions import db
+from app.utils.availability import Grilla
+
+DIA = date.today() + timedelta(days=3)
+
+@pytest.fixture
+def grilla():
+    return Grilla(time(8, 0), time(18, 0), 30)
+
+def indices(mapa):
+    return [i for i in range(mapa.bit_length()) if mapa >> i & 1]
+
+@pytest.mark.parametrize('hora, duracion, esperado', [
+    (time(10, 0), 90, [4, 5, 6]),
+    (time(10, 15), 30, [4, 5]),          # fuera de la grilla: ocupa los dos horarios que toca
+    (time(10, 0), 1, [4]),
+    (time(7, 30), 60, [0]),              # empieza antes de la apertura
+    (time(17, 45), 60, [19]),            # termina después del cierre
+    (time(18, 0), 30, []),
+    (time(7, 0), 30, []),
+])
+def test_bits(grilla, hora, duracion, esperado):
+    assert indices(grilla.bits(hora, duracion)) == esperado
+
+@pytest.mark.parametrize('desde, primero', [
+    (None, 0),
+    (time(7, 0), 0),
+    (time(9, 0), 2),
+    (time(9, 0, 1), 3),                  # el horario de las 9:00 ya empezó
+    (time(9, 10), 3),
+    (time(17, 30), 19),
+])
+def test_libres_desde(grilla, desde, primero):
+    assert grilla.libres(0, desde) == list(range(primero, 20))
+
+def test_libres_despues_del_cierre(grilla):
+    assert grilla.primer_horario(time(18, 0)) == 20
+    assert grilla.libres(0, time(18, 0)) == []
+    assert grilla.libres(0, time(23, 59)) == []
+
+def test_libres_descuenta_ocupados(grilla):
+    ocupado = grilla.bits(time(8, 0), 60) | grilla.bits(time(17, 45), 30)
+    assert grilla.libres(ocupado) == list(range(2, 19))
+    assert grilla.texto(grilla.libres(ocupado, time(16, 50))) == ['17:00']
+
+def test_disponibilidad_y_rango_coinciden(client, auth_headers, crear_citas):
+    citas = crear_citas(4, fecha=DIA)
+    citas[0].duracion = 90
+    citas[1].hora_cita = time(13, 15)
+    citas[2].estado = 'Cancelada'
+    db.session.commit()
+    veterinario_id = citas[0].veterinario_id
+    
+    dia = client.get(
+        f'/api/appointments/disponibilidad?fecha={DIA}&veterinario_id={veterinario_id}', headers=auth_headers
+    ).get_json()['data']
+    rango = client.get(
+        f'/api/appointments/disponibilidad/rango?fecha_desde={DIA}&veterinario_id={veterinario_id}',
+        headers=auth_headers
+    ).get_json()['data']
+    
+    libres = rango['veterinarios'][0]['dias'][0]['horarios_disponibles']
+    assert libres == dia['horarios_disponibles']
+    for ocupado in ('08:00', '09:00', '13:00', '13:30', '11:00'):
+        assert ocupado not in libres
+    assert '10:00' in libres                     # la cita cancelada no ocupa
+    assert len(libres) == 20 - 6
+
+def test_proximos_sin_desde_cambia_de_etag_con_el_horario(client, auth_headers, crear_citas, monkeypatch):
+    crear_citas(1, fecha=DIA)
+    ahora = [datetime.combine(date.today(), time(9, 5))]
+    
+    class Reloj(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return ahora[0]
+    
+    monkeypatch.setattr(routes, 'datetime', Reloj)
+    url = '/api/appointments/disponibilidad/proximos?n=1'
+    primera = client.get(url, headers=auth_headers)
+    assert primera.get_json()['data']['horarios'][0]['hora'] == '09:30'
+    etag = primera.headers['ETag']
+    
+    ahora[0] = ahora[0].replace(minute=25)
+    assert client.get(url, headers={**auth_headers, 'If-None-Match': etag}).status_code == 304
+    
+    ahora[0] = ahora[0].replace(hour=15)
+    segunda = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+    assert segunda.status_code == 200
+    assert segunda.get_json()['data']['horarios'][0]['hora'] == '15:30'
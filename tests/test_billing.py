@@ -0,0 +1,124 @@
+"""Creación de facturas y su numeración bajo concurrencia.
+
+El bloqueo de filas solo se puede probar en PostgreSQL (fixture ``app_pg``).
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import update
+
+from app.extensions import db
+from app.models import (Cliente, DetalleFactura, Factura, MovimientoInventario, Producto,
+                        ProductoVendidoDiario, SerieFactura, VentaDiaria)
+
+HILOS = 8
+FACTURAS_POR_HILO = 25
+
+@pytest.fixture
+def productos(app):
+    """Cliente y dos productos: uno con stock de sobra y otro con 2 unidades"""
+    db.session.add(Cliente(nombre='Cliente', apellidos='Pruebas', documento_identidad='DOC-1'))
+    db.session.add_all([
+        Producto(nombre='Amoxicilina', codigo_producto='AMX', precio_venta=10, stock_actual=100),
+        Producto(nombre='Vacuna triple', codigo_producto='VAC', precio_venta=30, stock_actual=2),
+    ])
+    db.session.commit()
+    return Producto.query.order_by(Producto.producto_id).all()
+
+def factura(*detalles):
+    return {
+        'cliente_id': 1, 'fecha_factura': '2024-06-01', 'metodo_pago': 'Efectivo',
+        'detalles': list(detalles)
+    }
+
+def linea(producto=None, cantidad=1, descripcion='Producto'):
+    if producto is None:
+        return {'tipo_item': 'Servicio', 'descripcion': 'Baño', 'cantidad': cantidad, 'precio_unitario': 15}
+    return {
+        'tipo_item': 'Producto', 'producto_id': producto.producto_id, 'descripcion': descripcion,
+        'cantidad': cantidad, 'precio_unitario': 10
+    }
+
+def sin_filas():
+    return Factura.query.count() == DetalleFactura.query.count() == MovimientoInventario.query.count() == 0
+
+@pytest.mark.parametrize('lineas', [1, 15])
+def test_crear_factura_hace_un_solo_commit(client, auth_headers, productos, contar_consultas, lineas):
+    detalles = [linea(productos[0]) if i % 2 else linea() for i in range(lineas)]
+    with contar_consultas() as sentencias:
+        response = client.post('/api/billing', headers=auth_headers, json=factura(*detalles))
+    
+    assert response.status_code == 201, response.get_json()
+    assert sentencias.count('COMMIT') == 1
+    assert DetalleFactura.query.count() == lineas
+    assert MovimientoInventario.query.count() == lineas // 2
+
+def test_stock_insuficiente_en_una_linea_posterior_no_deja_filas(client, auth_headers, productos):
+    amoxicilina, vacuna = productos
+    response = client.post('/api/billing', headers=auth_headers, json=factura(
+        linea(amoxicilina), linea(), linea(vacuna, cantidad=1), linea(vacuna, cantidad=2)
+    ))
+    
+    assert response.status_code == 400
+    assert 'Vacuna triple' in response.get_json()['message']
+    db.session.expire_all()
+    assert sin_filas()
+    assert [p.stock_actual for p in Producto.query.order_by(Producto.producto_id)] == [100, 2]
+
+def test_error_despues_de_insertar_la_cabecera_no_deja_filas(client, auth_headers, productos):
+    # La última línea no tiene descripción: falla con la factura ya insertada (flush)
+    ultima = linea(productos[0])
+    del ultima['descripcion']
+    response = client.post('/api/billing', headers=auth_headers, json=factura(linea(productos[0]), linea(), ultima))
+    
+    assert response.status_code == 500
+    db.session.expire_all()
+    assert sin_filas()
+    assert SerieFactura.query.filter_by(prefijo='FAC').count() == 0
+
+def test_factura_sin_estado_cuenta_en_los_resumenes(client, auth_headers, productos):
+    response = client.post('/api/billing', headers=auth_headers, json=factura(linea(productos[0], cantidad=3)))
+    assert response.status_code == 201, response.get_json()
+    # Facturas importadas sin estado: la columna admite NULL y cuenta como pendiente
+    db.session.execute(update(Factura).values(estado=None))
+    db.session.commit()
+    
+    assert ProductoVendidoDiario.verificar() == []
+    assert VentaDiaria.verificar() == []
+
+def test_allocate_concurrente_sin_duplicados_ni_huecos(app_pg):
+    confirmados = []
+    errores = []
+    candado = threading.Lock()
+    barrera = threading.Barrier(HILOS)
+    
+    def emitir(hilo):
+        with app_pg.app_context():
+            try:
+                barrera.wait()
+                for i in range(FACTURAS_POR_HILO):
+                    numero = SerieFactura.allocate('TST')
+                    if hilo == 0 and i == FACTURAS_POR_HILO // 2:
+                        # Revertir con la serie bloqueada: los demás esperan y reusan el número
+                        time.sleep(0.05)
+                        db.session.rollback()
+                        continue
+                    db.session.commit()
+                    with candado:
+                        confirmados.append(numero)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                db.session.remove()
+    
+    hilos = [threading.Thread(target=emitir, args=(h,)) for h in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    
+    assert errores == []
+    total = HILOS * FACTURAS_POR_HILO - 1
+    assert sorted(confirmados) == [f'TST-{n:06d}' for n in range(1, total + 1)]
+    assert db.session.get(SerieFactura, 'TST').ultimo_numero == total
@@ -0,0 +1,145 @@
+"""Contrato de los backends de caché (``app.utils.cache_backends``).
+
+Redis se prueba contra ``TEST_REDIS_URL`` (por defecto una base local) y
+se omite si el paquete o el servidor no están disponibles.
+"""
+import os
+import sys
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.utils.cache import TTLCache
+from app.utils import cache_backends
+from app.utils.cache_backends import create_backend
+
+NAMESPACE = 'pruebas'
+OTRO = 'pruebas-otro'
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        backend = create_backend('memory')
+    elif request.param == 'sqlite':
+        backend = create_backend('sqlite', str(tmp_path / 'cache.sqlite3'))
+    else:
+        if cache_backends.redis is None:
+            pytest.skip('el paquete redis no está instalado')
+        backend = create_backend('redis', os.environ.get('TEST_REDIS_URL', 'redis://localhost:6379/15'),
+                                 prefix='zoopecas-pruebas')
+        try:
+            backend.client.ping()
+        except Exception:
+            pytest.skip('servidor Redis no disponible')
+    yield backend
+    for namespace in (NAMESPACE, OTRO):
+        backend.clear(namespace)
+
+def test_ida_y_vuelta(backend):
+    valor = {'bytes': b'\x00\xff', 'decimal': Decimal('10.50'), 'fecha': date(2024, 1, 31), 'tupla': (1, None)}
+    backend.set(NAMESPACE, 'valor', valor, 60)
+    assert backend.get(NAMESPACE, 'valor') == valor
+    assert backend.get(NAMESPACE, 'no-existe') is None
+
+def test_llaves_compuestas_y_largas(backend):
+    llave = ('/api/ruta', (('page', '2'),), 'Administrador', None)
+    backend.set(NAMESPACE, llave, 1, 60)
+    backend.set(NAMESPACE, ('x' * 300,), 2, 60)
+    assert backend.get(NAMESPACE, llave) == 1
+    assert backend.get(NAMESPACE, ('x' * 300,)) == 2
+
+def test_get_many(backend):
+    backend.set(NAMESPACE, 'a', 1, 60)
+    backend.set(NAMESPACE, 'c', 3, 60)
+    assert backend.get_many(NAMESPACE, ['a', 'b', 'c']) == [1, None, 3]
+    assert backend.get_many(NAMESPACE, []) == []
+
+def test_expiracion(backend):
+    backend.set(NAMESPACE, 'efimero', 1, 0.2)
+    backend.set(NAMESPACE, 'permanente', 1, None)
+    time.sleep(0.3)
+    assert backend.get(NAMESPACE, 'efimero') is None
+    assert backend.get(NAMESPACE, 'permanente') == 1
+
+def test_delete(backend):
+    backend.set(NAMESPACE, 'borrar', 1, 60)
+    backend.delete(NAMESPACE, 'borrar')
+    backend.delete(NAMESPACE, 'borrar')
+    assert backend.get(NAMESPACE, 'borrar') is None
+
+def test_add_solo_guarda_si_no_hay_valor_vigente(backend):
+    assert backend.add(NAMESPACE, 'unico', 1, 0.2)
+    assert not backend.add(NAMESPACE, 'unico', 2, 60)
+    assert backend.get(NAMESPACE, 'unico') == 1
+    time.sleep(0.3)
+    assert backend.add(NAMESPACE, 'unico', 3, 60)
+    assert backend.get(NAMESPACE, 'unico') == 3
+
+def test_add_simultaneos_guardan_una_sola_vez(backend):
+    hilos = 16
+    barrera = threading.Barrier(hilos)
+    guardados = []
+    
+    def agregar(i):
+        barrera.wait()
+        if backend.add(NAMESPACE, 'carrera', i, 60):
+            guardados.append(i)
+    
+    trabajadores = [threading.Thread(target=agregar, args=(i,)) for i in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    
+    assert len(guardados) == 1
+    assert backend.get(NAMESPACE, 'carrera') == guardados[0]
+
+def test_espacios_de_nombres_independientes(backend):
+    backend.set(NAMESPACE, 'llave', 1, 60)
+    backend.set(OTRO, 'llave', 2, 60)
+    backend.clear(NAMESPACE)
+    assert backend.get(NAMESPACE, 'llave') is None
+    assert backend.get(OTRO, 'llave') == 2
+
+def test_limite_de_entradas(backend):
+    if not backend.enforces_limits:
+        pytest.skip(f'{backend.name} delega los límites en el servidor')
+    backend.configure(NAMESPACE, 3)
+    for i in range(5):
+        backend.set(NAMESPACE, f'lim{i}', i, 60 + i)
+    conservadas = backend.get_many(NAMESPACE, [f'lim{i}' for i in range(5)])
+    assert conservadas[-1] == 4
+    assert conservadas.count(None) == 2
+
+def test_visibilidad_entre_procesos(backend):
+    backend.set(NAMESPACE, 'compartido', 1, 60)
+    assert backend.reopen().get(NAMESPACE, 'compartido') == (1 if backend.shared else None)
+
+def test_ttlcache_add_atomico_entre_hilos():
+    cache = TTLCache(maxsize=10, ttl=60)
+    intervalo = sys.getswitchinterval()
+    # Cambios de hilo muy frecuentes para que una carrera entre comprobar y guardar aparezca
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(500):
+            cache.delete('llave')
+            barrera = threading.Barrier(3)
+            resultados = []
+            
+            def agregar(valor):
+                barrera.wait()
+                resultados.append((valor, cache.add('llave', valor)))
+            
+            trabajadores = [threading.Thread(target=agregar, args=(v,)) for v in ('a', 'b', 'c')]
+            for t in trabajadores:
+                t.start()
+            for t in trabajadores:
+                t.join()
+            ganadores = [valor for valor, guardado in resultados if guardado]
+            assert len(ganadores) == 1
+            assert cache.get('llave') == ganadores[0]
+    finally:
+        sys.setswitchinterval(intervalo)
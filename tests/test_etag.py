@@ -0,0 +1,57 @@
+import threading
+
+from app.extensions import db
+from app.models import Cliente
+from app.models.version import VersionTabla
+
+def crear_cliente(n=1):
+    db.session.add(Cliente(nombre=f'Cliente {n}', apellidos='Pruebas', documento_identidad=f'DOC-{n}'))
+    db.session.commit()
+
+def test_commit_incrementa_la_version_y_rollback_no(app):
+    crear_cliente(1)
+    version = VersionTabla.obtener(('clientes',))
+    
+    crear_cliente(2)
+    assert VersionTabla.obtener(('clientes',)) == (version[0] + 1,)
+    
+    db.session.add(Cliente(nombre='Revertido', apellidos='Pruebas', documento_identidad='DOC-3'))
+    db.session.flush()
+    db.session.rollback()
+    assert VersionTabla.obtener(('clientes',)) == (version[0] + 1,)
+
+def test_listado_responde_304_hasta_que_cambian_los_datos(client, auth_headers):
+    crear_cliente(1)
+    primera = client.get('/api/clients', headers=auth_headers)
+    etag = primera.headers['ETag']
+    
+    assert client.get('/api/clients', headers={**auth_headers, 'If-None-Match': etag}).status_code == 304
+    
+    crear_cliente(2)
+    segunda = client.get('/api/clients', headers={**auth_headers, 'If-None-Match': etag})
+    assert segunda.status_code == 200
+    assert segunda.headers['ETag'] != etag
+
+def test_incremento_no_espera_filas_bloqueadas(app_pg):
+    crear_cliente(1)
+    version = VersionTabla.obtener(('clientes',))[0]
+    bloqueo = db.engine.connect()
+    transaccion = bloqueo.begin()
+    bloqueo.exec_driver_sql("SELECT version FROM versiones_tablas WHERE tabla = 'clientes' FOR UPDATE")
+    
+    terminado = threading.Event()
+    def incrementar():
+        with app_pg.app_context():
+            VersionTabla.incrementar({'clientes'})
+        terminado.set()
+    hilo = threading.Thread(target=incrementar)
+    hilo.start()
+    try:
+        assert terminado.wait(timeout=5)
+    finally:
+        transaccion.rollback()
+        bloqueo.close()
+        hilo.join()
+    
+    db.session.rollback()
+    assert VersionTabla.obtener(('clientes',)) == (version,)
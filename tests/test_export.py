@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from datetime import date, time
+
+import pytest
+
+from app.extensions import db
+from app.models import (Cliente, Consulta, Factura, HistoriaClinica, Mascota, MovimientoInventario,
+                        Producto, Veterinario)
+
+EXPORTACIONES = {
+    '/api/billing/export': 'total',
+    '/api/inventory/movimientos/export': 'cantidad',
+    '/api/medical/consultas/export': 'motivo_consulta',
+}
+
+def leer_csv(response):
+    assert response.status_code == 200
+    assert response.content_type == 'text/csv; charset=utf-8'
+    return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+@pytest.fixture
+def datos(admin):
+    cliente = Cliente(nombre='Cliente', apellidos='Pruebas', documento_identidad='DOC-1')
+    veterinarios = [Veterinario(nombre='Ana', apellidos='Pérez'), Veterinario(nombre='Luis', apellidos='Ruiz')]
+    productos = [Producto(nombre=f'Producto {i}', codigo_producto=f'P-{i}', precio_venta=10) for i in range(2)]
+    db.session.add_all([cliente, *veterinarios, *productos])
+    db.session.flush()
+    mascota = Mascota(cliente_id=cliente.cliente_id, nombre='Firulais', especie='Perro',
+                      sexo='Macho', fecha_nacimiento=date(2020, 1, 1))
+    db.session.add(mascota)
+    db.session.flush()
+    historia = HistoriaClinica(mascota_id=mascota.mascota_id)
+    db.session.add(historia)
+    db.session.flush()
+    for i, estado in enumerate(('Pagada', 'Pendiente', 'Pagada')):
+        db.session.add(Factura(
+            cliente_id=cliente.cliente_id, numero_factura=f'FAC-{i + 1:06d}', fecha_factura=date(2024, 6, i + 1),
+            subtotal=100, impuestos=19, total=119, metodo_pago='Efectivo', estado=estado
+        ))
+        db.session.add(MovimientoInventario(
+            producto_id=productos[i % 2].producto_id, tipo_movimiento='Entrada', cantidad=i + 1,
+            motivo='Compra', usuario_id=admin.usuario_id
+        ))
+        db.session.add(Consulta(
+            historia_id=historia.historia_id, veterinario_id=veterinarios[i % 2].veterinario_id,
+            fecha_consulta=date(2024, 6, i + 1), hora_consulta=time(9), motivo_consulta='Control',
+            diagnostico='Sano'
+        ))
+    db.session.commit()
+    return productos, veterinarios
+
+def test_exportar_facturas_reutiliza_filtros_y_campos(client, auth_headers, datos):
+    response = client.get('/api/billing/export?estado=Pagada&fields=numero_factura,total', headers=auth_headers)
+    
+    assert leer_csv(response) == [
+        ['numero_factura', 'total'],
+        ['FAC-000003', '119.0'],
+        ['FAC-000001', '119.0'],
+    ]
+
+def test_exportar_movimientos_ndjson_filtrados(client, auth_headers, datos):
+    productos, _ = datos
+    response = client.get(
+        f'/api/inventory/movimientos/export?format=ndjson&producto_id={productos[0].producto_id}'
+        '&fields=cantidad,producto',
+        headers=auth_headers
+    )
+    
+    assert response.status_code == 200
+    assert response.content_type == 'application/x-ndjson; charset=utf-8'
+    filas = [json.loads(linea) for linea in response.get_data(as_text=True).splitlines()]
+    assert filas == [{'producto': 'Producto 0', 'cantidad': 3}, {'producto': 'Producto 0', 'cantidad': 1}]
+
+def test_exportar_consultas_filtradas(client, auth_headers, datos):
+    _, veterinarios = datos
+    response = client.get(
+        f'/api/medical/consultas/export?veterinario_id={veterinarios[1].veterinario_id}'
+        '&fields=fecha_consulta,veterinario_id',
+        headers=auth_headers
+    )
+    
+    assert leer_csv(response) == [
+        ['veterinario_id', 'fecha_consulta'],
+        [str(veterinarios[1].veterinario_id), '2024-06-02'],
+    ]
+
+@pytest.mark.parametrize('url, campo', EXPORTACIONES.items())
+def test_exportacion_vacia_tiene_encabezado(client, auth_headers, url, campo):
+    filas = leer_csv(client.get(url, headers=auth_headers))
+    assert len(filas) == 1
+    assert campo in filas[0]
+    
+    assert leer_csv(client.get(f'{url}?fields={campo}', headers=auth_headers)) == [[campo]]
+
+@pytest.mark.parametrize('url', EXPORTACIONES)
+def test_formato_invalido(client, auth_headers, url):
+    response = client.get(f'{url}?format=xlsx', headers=auth_headers)
+    
+    assert response.status_code == 400
+    assert 'xlsx' in response.get_json()['message']
+
+@pytest.mark.parametrize('url', EXPORTACIONES)
+def test_encabezado_coincide_con_las_filas(client, auth_headers, datos, url):
+    encabezado = leer_csv(client.get(url, headers=auth_headers))[0]
+    ndjson = client.get(f'{url}?format=ndjson', headers=auth_headers).get_data(as_text=True)
+    
+    assert all(list(json.loads(linea)) == encabezado for linea in ndjson.splitlines())
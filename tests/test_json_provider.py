@@ -0,0 +1,40 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import pytest
+
+from app.utils import json_provider
+
+DATOS = {
+    'precio': Decimal('10.50'),
+    'fecha': date(2024, 5, 1),
+    'hora': time(9, 30),
+    'creado': datetime(2024, 5, 1, 9, 30, 15),
+    'nombre': 'Ñandú'
+}
+
+@pytest.mark.parametrize('fast', [False, True], ids=['stdlib', 'orjson'])
+def test_codifica_decimal_como_texto_y_fechas_iso(app, fast):
+    if fast and json_provider.orjson is None:
+        pytest.skip('orjson no está instalado')
+    app.json.fast = fast
+    
+    response = app.json.response(DATOS)
+    
+    assert response.get_json() == {
+        'precio': '10.50',
+        'fecha': '2024-05-01',
+        'hora': '09:30:00',
+        'creado': '2024-05-01T09:30:15',
+        'nombre': 'Ñandú'
+    }
+    assert 'Ñandú'.encode('utf-8') in response.data
+
+def test_orjson_y_stdlib_producen_los_mismos_bytes(app):
+    if json_provider.orjson is None:
+        pytest.skip('orjson no está instalado')
+    app.json.fast = False
+    stdlib = app.json.response(DATOS).data
+    app.json.fast = True
+    
+    assert app.json.response(DATOS).data == stdlib
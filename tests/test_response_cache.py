@@ -0,0 +1,103 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db, response_cache
+from app.models import CategoriaProducto, Cliente, User, Veterinario
+
+VETERINARIOS = '/api/medical/veterinarios'
+CATEGORIAS = '/api/inventory/categorias'
+
+@pytest.fixture(autouse=True)
+def cache_vacia(app):
+    # La caché es del proceso: una base recién creada repite las versiones de las tablas
+    response_cache.clear()
+
+@pytest.fixture
+def veterinarios(app):
+    db.session.add_all([Veterinario(nombre=f'Vet {i}', apellidos='Pruebas') for i in range(3)])
+    db.session.commit()
+
+def encabezados(rol):
+    user = User(username=rol.lower(), email=f'{rol.lower()}@zoopecas.test', nombre=rol,
+                apellidos='Pruebas', rol=rol)
+    user.set_password('Clave123!')
+    db.session.add(user)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.usuario_id))}'}
+
+def obtener(client, url, headers):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response
+
+def test_primera_peticion_falla_y_la_siguiente_acierta(client, auth_headers, veterinarios):
+    primera = obtener(client, VETERINARIOS, auth_headers)
+    segunda = obtener(client, VETERINARIOS, auth_headers)
+    
+    assert primera.headers['X-Cache'] == 'MISS'
+    assert segunda.headers['X-Cache'] == 'HIT'
+    assert segunda.get_json() == primera.get_json()
+    assert segunda.headers['ETag'] == primera.headers['ETag']
+    
+    # Otros argumentos son otra entrada
+    assert obtener(client, f'{VETERINARIOS}?fields=nombre', auth_headers).headers['X-Cache'] == 'MISS'
+
+def test_commit_en_una_tabla_etiquetada_invalida(client, auth_headers, veterinarios):
+    obtener(client, VETERINARIOS, auth_headers)
+    
+    db.session.add(Cliente(nombre='Otro', apellidos='Pruebas', documento_identidad='DOC-1'))
+    db.session.commit()
+    assert obtener(client, VETERINARIOS, auth_headers).headers['X-Cache'] == 'HIT'
+    
+    db.session.add(Veterinario(nombre='Nuevo', apellidos='Pruebas'))
+    db.session.commit()
+    response = obtener(client, VETERINARIOS, auth_headers)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Nuevo' in [v['nombre'] for v in response.get_json()['data']]
+
+def test_entradas_separadas_por_rol(client, auth_headers, veterinarios):
+    recepcionista = encabezados('Recepcionista')
+    
+    assert obtener(client, VETERINARIOS, auth_headers).headers['X-Cache'] == 'MISS'
+    assert obtener(client, VETERINARIOS, recepcionista).headers['X-Cache'] == 'MISS'
+    assert obtener(client, VETERINARIOS, auth_headers).headers['X-Cache'] == 'HIT'
+    assert obtener(client, VETERINARIOS, recepcionista).headers['X-Cache'] == 'HIT'
+
+def test_limite_de_bytes_desaloja_las_mas_antiguas(client, auth_headers, veterinarios):
+    db.session.add_all([CategoriaProducto(nombre_categoria=f'Categoría {i}') for i in range(3)])
+    db.session.commit()
+    tamano = len(obtener(client, VETERINARIOS, auth_headers).get_data())
+    response_cache.clear()
+    response_cache.configure(maxbytes=tamano + 10)
+    desalojos = response_cache.stats()['evictions']
+    
+    obtener(client, VETERINARIOS, auth_headers)
+    obtener(client, CATEGORIAS, auth_headers)
+    stats = response_cache.stats()
+    
+    assert stats['bytes'] <= tamano + 10
+    assert stats['evictions'] == desalojos + 1
+    assert obtener(client, CATEGORIAS, auth_headers).headers['X-Cache'] == 'HIT'
+    assert obtener(client, VETERINARIOS, auth_headers).headers['X-Cache'] == 'MISS'
+
+def test_estadisticas(client, auth_headers, veterinarios):
+    antes = client.get('/api/auth/cache/responses/stats', headers=auth_headers).get_json()['data']
+    anterior = antes['endpoints'].get('medical.list_veterinarios', {'hits': 0, 'misses': 0})
+    
+    for _ in range(3):
+        obtener(client, VETERINARIOS, auth_headers)
+    db.session.add(Veterinario(nombre='Nuevo', apellidos='Pruebas'))
+    db.session.commit()
+    obtener(client, VETERINARIOS, auth_headers)
+    
+    stats = client.get('/api/auth/cache/responses/stats', headers=auth_headers).get_json()['data']
+    assert stats['endpoints']['medical.list_veterinarios'] == {
+        'hits': anterior['hits'] + 2,
+        'misses': anterior['misses'] + 2,
+        'hit_ratio': round((anterior['hits'] + 2) / (anterior['hits'] + anterior['misses'] + 4), 4)
+    }
+    assert stats['hits'] == antes['hits'] + 2
+    assert stats['misses'] == antes['misses'] + 2
+    assert stats['invalidations'] > antes['invalidations']
+    # La entrada anterior (otro ETag) queda hasta que el LRU la desaloje
+    assert stats['size'] == 2
@@ -0,0 +1,51 @@
+from app.api.search import routes
+from app.extensions import db
+from app.models import Cliente, Producto
+
+def buscar(client, auth_headers, q, tipos):
+    response = client.get(f'/api/search?q={q}&tipos={tipos}', headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+def test_busqueda_omite_productos_inactivos(client, auth_headers):
+    db.session.add_all([
+        Producto(nombre='Amoxicilina 500', codigo_producto='AMX-1', precio_venta=10, activo=True),
+        Producto(nombre='Amoxicilina 250', codigo_producto='AMX-2', precio_venta=8, activo=False),
+    ])
+    db.session.commit()
+    
+    data = buscar(client, auth_headers, 'amoxicilina', 'producto')
+    
+    assert [r['subtitulo'] for r in data['resultados']] == ['AMX-1']
+
+def test_busqueda_con_pool_saturado_no_encola(client, auth_headers):
+    ocupados = 0
+    while routes._cupos.acquire(blocking=False):
+        ocupados += 1
+    try:
+        data = buscar(client, auth_headers, 'amoxicilina', 'producto,factura')
+    finally:
+        for _ in range(ocupados):
+            routes._cupos.release()
+    
+    assert data['resultados'] == []
+    assert data['fuentes'] == {
+        'producto': {'estado': 'ocupado', 'total': 0},
+        'factura': {'estado': 'ocupado', 'total': 0},
+    }
+
+def test_busqueda_ordenada_pagina_sin_repetir_ni_saltar(client, auth_headers):
+    # Mismo nombre y fecha de registro: solo el id desempata el orden
+    db.session.add_all([
+        Cliente(nombre='Laura', apellidos='Gómez', documento_identidad=f'DOC-{i}') for i in range(25)
+    ])
+    db.session.commit()
+    
+    vistos = []
+    for page in range(1, 5):
+        response = client.get(f'/api/clients?search=laura&page={page}&per_page=7', headers=auth_headers)
+        assert response.status_code == 200
+        vistos += [c['cliente_id'] for c in response.get_json()['data']['clientes']]
+    
+    assert sorted(vistos) == list(range(1, 26))
+    assert vistos == sorted(vistos, reverse=True)